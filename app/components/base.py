@@ -198,17 +198,30 @@ def data_table(
 
 
 def friendly_table(
-    data: pd.DataFrame,
+    data: Any,
     use_container_width: bool = True
 ) -> None:
     """
     Display a table with user-friendly column names.
 
     Args:
-        data: DataFrame to display
+        data: DataFrame or QueryResult to display (QueryResult tables are
+            handed to Streamlit as Arrow, without a pandas copy)
         use_container_width: Whether to use full container width
     """
     from ..utils.formatting import COLUMN_FRIENDLY_NAMES
+    from src.utils.result import QueryResult
+
+    if isinstance(data, QueryResult):
+        if not data:
+            info_box("Sem Dados", "Nenhum dado disponível para exibir.", "warning")
+            return
+        st.dataframe(
+            data.with_labels(COLUMN_FRIENDLY_NAMES).to_arrow(use_labels=True),
+            use_container_width=use_container_width,
+            hide_index=True
+        )
+        return
 
     # Filter column mapping to only include columns that exist in the data
     columns_map = {
@@ -3,14 +3,13 @@ Chat Tab Component - AI agent interface with clean UX.
 No technical SQL exposed to user by default.
 Optimized for memory - stores only metadata, not full dataframes.
 """
-import asyncio
 import logging
 import re
 from typing import Optional, Dict, Any
 import streamlit as st
 
 from ..utils.session import SessionManager
-from ..components.base import info_box, empty_state, loading_spinner
+from ..components.base import info_box, empty_state, loading_spinner, friendly_table
 from ..components.styles import Icons
 
 
@@ -26,13 +25,17 @@ def get_results_cache() -> Dict[str, Any]:
     return st.session_state.get(QUERY_RESULTS_CACHE_KEY, {})
 
 
-def save_result_to_cache(message_idx: int, results: Any, sql: str = "") -> None:
+def save_result_to_cache(message_idx: int, results_handle: str, row_count: int, sql: str = "") -> None:
     """
-    Save query results to a separate cache to avoid storing dataframes in chat history.
+    Save a query result reference to a separate cache to avoid storing dataframes in chat history.
+
+    Only the result store handle is kept in the session; rows are resolved
+    when the message is rendered.
 
     Args:
         message_idx: Index of the message in chat history
-        results: Query results (dataframe or list)
+        results_handle: Handle of the rows in the agent result store
+        row_count: Number of rows returned
         sql: SQL query that generated the results
     """
     cache = get_results_cache()
@@ -44,18 +47,24 @@ def save_result_to_cache(message_idx: int, results: Any, sql: str = "") -> None:
         for key in sorted_keys[:len(cache) - MAX_CACHED_RESULTS + 1]:
             del cache[key]
 
-    # Store only metadata if results are too large
-    row_count = len(results) if results else 0
     cache[str(message_idx)] = {
-        "results": results if row_count <= 1000 else None,  # Don't cache large results
+        "results_handle": results_handle,
         "row_count": row_count,
         "sql": sql,
-        "truncated": row_count > 1000
+        "truncated": row_count > 1000  # Too large to display
     }
 
     st.session_state[QUERY_RESULTS_CACHE_KEY] = cache
 
 
+def _load_cached_rows(cached: Dict[str, Any]) -> Optional[Any]:
+    """Resolve the QueryResult of a cached entry (None when expired or too large)."""
+    if cached.get("truncated"):
+        return None
+    from src.agent.artifacts import get_result_store
+    return get_result_store().get(cached.get("results_handle"))
+
+
 def get_cached_result(message_idx: int) -> Optional[Dict[str, Any]]:
     """Get cached result for a message."""
     cache = get_results_cache()
@@ -94,6 +103,49 @@ def _expand_year_only_prompt(prompt: str, messages: list[Dict[str, Any]]) -> str
     return f"{last_user} em {year}"
 
 
+def _run_streaming_query(
+    question: str,
+    thread_id: str,
+    status: Any,
+    answer_placeholder: Any
+) -> Dict[str, Any]:
+    """
+    Run the agent with streaming, updating the UI as events arrive.
+
+    Node transitions are written to the status box and final-answer tokens
+    are rendered progressively in the answer placeholder. The agent runs on
+    the shared AgentRuntime loop, so the checkpointer and clients are reused
+    across reruns; UI updates stay in the Streamlit script thread.
+
+    Args:
+        question: User question
+        thread_id: Conversation thread ID
+        status: st.status container for progress updates
+        answer_placeholder: st.empty placeholder for the streamed answer
+
+    Returns:
+        Final agent state
+    """
+    from src.agent.graph import stream_query_agente
+    from src.agent.runtime import get_agent_runtime
+
+    result: Dict[str, Any] = {}
+    draft = ""
+
+    events = stream_query_agente(question=question, thread_id=thread_id)
+    for event in get_agent_runtime().iterate(events):
+        if event["type"] == "node":
+            status.update(label=f"{event['label']}...")
+            status.write(event["label"])
+        elif event["type"] == "token":
+            draft += event["content"]
+            answer_placeholder.markdown(draft + "▌")
+        elif event["type"] == "result":
+            result = event["result"]
+
+    return result
+
+
 def show_chat_tab():
     """
     Entry point for the Chat tab.
@@ -167,13 +219,16 @@ def show_chat_tab():
                                 title += " [muitos resultados para exibir]"
 
                             with st.expander(title):
-                                if cached["results"] is not None:
-                                    st.dataframe(cached["results"])
-                                else:
+                                rows = _load_cached_rows(cached)
+                                if rows is not None:
+                                    friendly_table(rows)
+                                elif cached.get("truncated"):
                                     st.info(
                                         f"Query retornou {row_count} linhas. "
                                         "Resultado muito grande para exibir em cache."
                                     )
+                                else:
+                                    st.info("Resultado expirado. Refaça a pergunta para consultá-lo novamente.")
 
         # Chat input
         prompt = st.text_area(
@@ -208,125 +263,130 @@ def show_chat_tab():
 
             # Generate response
             with st.chat_message("assistant"):
-                with st.spinner("Consultando dados..."):
-                    try:
-                        # Run async query
-                        from src.agent.graph import query_agente
-
-                        # Get unique session ID for conversation memory
-                        session_id = SessionManager.get_or_create_session_id()
-
-                        result = asyncio.run(query_agente(
-                            question=prompt,
-                            thread_id=session_id
-                        ))
-
-                        sql = result.get("validated_sql", "")
-                        results = result.get("query_results", [])
-                        row_count = len(results) if results else 0
-                        sql_error = result.get("sql_error")
-                        answer = result.get("final_answer", "") or ""
-
-                        if sql_error:
-                            error_message = (
-                                "Ocorreu um erro ao consultar os dados. "
-                                "Tente novamente ou ajuste o período/porto."
-                            )
-                            info_box("Erro", error_message, "error")
-
-                            detail_text = sql_error
-                            if sql:
-                                detail_text = f"{sql_error}\n\nSQL:\n{sql}"
-
-                            with st.expander("Ver detalhes do erro"):
-                                st.code(detail_text, language="text")
-
-                            messages = SessionManager.get_chat_messages()
-                            message_idx = len(messages)
-
-                            assistant_message = {
-                                "role": "assistant",
-                                "content": error_message,
-                                "has_results": False,
-                                "row_count": 0,
-                                "error_detail": sql_error,
-                                "error_trace": sql or ""
-                            }
-
-                            SessionManager.add_chat_message("assistant", error_message)
-                            st.session_state[SessionManager.CHAT_MESSAGES_KEY][-1] = assistant_message
-                        else:
-                            if not answer.strip():
-                                if results:
-                                    answer = f"Encontrei {row_count} resultados para sua consulta."
-                                else:
-                                    answer = "Nenhum dado encontrado para o critério informado."
-
-                            # Display answer
-                            st.markdown(answer)
-
-                            # Display SQL only in debug mode
-                            if sql and SessionManager.is_debug_mode():
-                                with st.expander(f"{Icons.SEARCH} SQL Gerado"):
-                                    st.code(sql, language="sql")
-
-                            # Display results if enabled
-                            if results and SessionManager.show_results():
-                                with st.expander(f"{Icons.CHART} Resultados ({row_count} linhas)"):
-                                    st.dataframe(results)
-
-                            # Get current message index
-                            messages = SessionManager.get_chat_messages()
-                            message_idx = len(messages)  # Index of the message we're about to add
-
-                            # Add assistant message to history (without full results)
-                            assistant_message = {
-                                "role": "assistant",
-                                "content": answer,
-                                "has_results": bool(results),
-                                "row_count": row_count
-                            }
-
-                            if sql:
-                                assistant_message["sql"] = sql
-
-                            SessionManager.add_chat_message("assistant", answer)
-                            # Update with full message data
-                            st.session_state[SessionManager.CHAT_MESSAGES_KEY][-1] = assistant_message
-
-                            # Save results to separate cache
-                            if results:
-                                save_result_to_cache(message_idx, results, sql)
-
-                    except Exception as e:
-                        import traceback
-                        error_detail = str(e)
-                        error_trace = traceback.format_exc()
-                        logging.exception(
-                            "Erro ao executar consulta no chat",
-                            extra={
-                                "prompt_len": len(prompt) if prompt else 0
-                            }
-                        )
-                        print(f"[chat] erro: {error_detail}\n{error_trace}")
+                status = st.status("Consultando dados...", expanded=False)
+                answer_placeholder = st.empty()
+                try:
+                    # Get unique session ID for conversation memory
+                    session_id = SessionManager.get_or_create_session_id()
+
+                    result = _run_streaming_query(
+                        question=prompt,
+                        thread_id=session_id,
+                        status=status,
+                        answer_placeholder=answer_placeholder
+                    )
+                    status.update(label="Consulta concluída", state="complete")
+
+                    sql = result.get("validated_sql", "")
+                    results_handle = result.get("results_handle")
+                    row_count = result.get("row_count") or 0
+                    sql_error = result.get("sql_error")
+                    answer = result.get("final_answer", "") or ""
+
+                    if sql_error:
+                        answer_placeholder.empty()
                         error_message = (
                             "Ocorreu um erro ao consultar os dados. "
                             "Tente novamente ou ajuste o período/porto."
                         )
-
-                        # Show user-friendly error
                         info_box("Erro", error_message, "error")
 
-                        # Show error details in expander
+                        detail_text = sql_error
+                        if sql:
+                            detail_text = f"{sql_error}\n\nSQL:\n{sql}"
+
                         with st.expander("Ver detalhes do erro"):
-                            st.code(f"{error_detail}\n\n{error_trace}", language="text")
+                            st.code(detail_text, language="text")
+
+                        messages = SessionManager.get_chat_messages()
+                        message_idx = len(messages)
+
+                        assistant_message = {
+                            "role": "assistant",
+                            "content": error_message,
+                            "has_results": False,
+                            "row_count": 0,
+                            "error_detail": sql_error,
+                            "error_trace": sql or ""
+                        }
 
-                        # Add error to history
                         SessionManager.add_chat_message("assistant", error_message)
-                        st.session_state[SessionManager.CHAT_MESSAGES_KEY][-1].update({
-                            "error_detail": error_detail,
-                            "error_trace": error_trace
-                        })
+                        st.session_state[SessionManager.CHAT_MESSAGES_KEY][-1] = assistant_message
+                    else:
+                        if not answer.strip():
+                            if row_count:
+                                answer = f"Encontrei {row_count} resultados para sua consulta."
+                            else:
+                                answer = "Nenhum dado encontrado para o critério informado."
+
+                        # Display answer (replaces the streamed draft)
+                        answer_placeholder.markdown(answer)
+
+                        # Display SQL only in debug mode
+                        if sql and SessionManager.is_debug_mode():
+                            with st.expander(f"{Icons.SEARCH} SQL Gerado"):
+                                st.code(sql, language="sql")
+
+                        # Display results if enabled
+                        if row_count and SessionManager.show_results():
+                            with st.expander(f"{Icons.CHART} Resultados ({row_count} linhas)"):
+                                from src.agent.artifacts import get_result_store
+                                friendly_table(get_result_store().get(results_handle))
+
+                        # Get current message index
+                        messages = SessionManager.get_chat_messages()
+                        message_idx = len(messages)  # Index of the message we're about to add
+
+                        # Add assistant message to history (without full results)
+                        assistant_message = {
+                            "role": "assistant",
+                            "content": answer,
+                            "has_results": bool(row_count),
+                            "row_count": row_count
+                        }
+
+                        if sql:
+                            assistant_message["sql"] = sql
+
+                        SessionManager.add_chat_message("assistant", answer)
+                        # Update with full message data
+                        st.session_state[SessionManager.CHAT_MESSAGES_KEY][-1] = assistant_message
+
+                        # Save results to separate cache
+                        if results_handle and row_count:
+                            save_result_to_cache(message_idx, results_handle, row_count, sql)
+
+                except Exception as e:
+                    import traceback
+                    error_detail = str(e)
+                    error_trace = traceback.format_exc()
+                    logging.exception(
+                        "Erro ao executar consulta no chat",
+                        extra={
+                            "prompt_len": len(prompt) if prompt else 0
+                        }
+                    )
+                    print(f"[chat] erro: {error_detail}\n{error_trace}")
+                    error_message = (
+                        "Ocorreu um erro ao consultar os dados. "
+                        "Tente novamente ou ajuste o período/porto."
+                    )
+
+                    # Show user-friendly error
+                    status.update(label="Falha na consulta", state="error")
+                    answer_placeholder.empty()
+                    info_box("Erro", error_message, "error")
+
+                    # Show error details in expander
+                    with st.expander("Ver detalhes do erro"):
+                        st.code(f"{error_detail}\n\n{error_trace}", language="text")
+
+                    # Add error to history
+                    SessionManager.add_chat_message("assistant", error_message)
+                    st.session_state[SessionManager.CHAT_MESSAGES_KEY][-1].update({
+                        "error_detail": error_detail,
+                        "error_trace": error_trace
+                    })
 
             st.session_state["_clear_pergunta"] = True
             st.rerun()
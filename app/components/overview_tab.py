@@ -2,13 +2,11 @@
 Overview Tab Component - Porto analysis with persistent state.
 User-friendly interface without technical details exposed.
 """
-import os
 import logging
 import traceback
 from typing import Dict, List, Optional, Tuple
 import streamlit as st
 import pandas as pd
-from google.cloud import bigquery
 
 from ..utils.session import SessionManager
 from ..utils.formatting import format_number, format_percentage, format_month
@@ -17,6 +15,10 @@ from ..components.base import (
     friendly_table, empty_state, loading_spinner, info_box
 )
 from ..components.styles import Icons
+from src.bigquery.backend import get_query_backend
+from src.bigquery.cube import get_cargo_cube
+from src.bigquery.freshness import get_freshness_service
+from src.bigquery.overview import get_overview_cache, overview_data_version, query_overview_sections
 from src.bigquery.referential_helper import get_referential_helper
 
 
@@ -26,35 +28,13 @@ from src.bigquery.referential_helper import get_referential_helper
 
 def get_latest_data_period() -> Optional[Dict[str, int]]:
     """
-    Busca o último ano e mês disponível no BigQuery.
+    Último ano e mês publicados, pelo serviço de atualização dos dados.
 
     Returns:
         Dict com 'ano', 'mes', 'mes_nome', ou None em caso de erro
     """
     try:
-        client = bigquery.Client(project=os.getenv("GOOGLE_CLOUD_PROJECT", "saasimpacto"))
-
-        query = """
-        SELECT ano, mes, MAX(data_referencia) as ultima_data
-        FROM `antaqdados.br_antaq_estatistico_aquaviario.v_carga_metodologia_oficial`
-        WHERE isValidoMetodologiaANTAQ = 1
-        GROUP BY ano, mes
-        ORDER BY ano DESC, mes DESC
-        LIMIT 1
-        """
-
-        result = client.query(query).to_dataframe()
-
-        if not result.empty:
-            meses = ["Janeiro", "Fevereiro", "Março", "Abril", "Maio", "Junho",
-                     "Julho", "Agosto", "Setembro", "Outubro", "Novembro", "Dezembro"]
-
-            return {
-                "ano": int(result.iloc[0]['ano']),
-                "mes": int(result.iloc[0]['mes']),
-                "mes_nome": meses[int(result.iloc[0]['mes']) - 1],
-                "ultima_data": str(result.iloc[0]['ultima_data'])
-            }
+        return get_freshness_service().latest_period()
     except Exception:
         logging.exception("Erro ao buscar periodo mais recente do overview")
 
@@ -70,7 +50,7 @@ def get_available_portos() -> List[str]:
         Lista de nomes de portos
     """
     try:
-        client = bigquery.Client(project=os.getenv("GOOGLE_CLOUD_PROJECT", "saasimpacto"))
+        backend = get_query_backend()
 
         query = """
         SELECT DISTINCT porto_atracacao
@@ -80,7 +60,7 @@ def get_available_portos() -> List[str]:
         ORDER BY porto_atracacao
         """
 
-        result = client.query(query).to_dataframe()
+        result = backend.query_dataframe(query)
         if not result.empty:
             portos = result['porto_atracacao'].tolist()
             # Add "Brasil" as first option for aggregated analysis
@@ -95,6 +75,9 @@ def fetch_overview_data(porto: str, ano: int, mes: int) -> Optional[Dict]:
     """
     Busca todos os dados para o overview do porto ou do Brasil (todos os portos).
 
+    O resultado é compartilhado entre sessões pelo cache de overview do
+    processo e invalidado quando um novo mês de dados é publicado.
+
     Args:
         porto: Nome do porto ou "Brasil" para análise agregada
         ano: Ano
@@ -103,123 +86,51 @@ def fetch_overview_data(porto: str, ano: int, mes: int) -> Optional[Dict]:
     Returns:
         Dicionário com todos os dados do overview, ou None em caso de erro
     """
-    try:
-        client = bigquery.Client(project=os.getenv("GOOGLE_CLOUD_PROJECT", "saasimpacto"))
-        ref_helper = get_referential_helper(client)
-
-        # Filtros oficiais ANTAQ
-        tipo_operacao_oficial = (
-            "'movimentação de carga', 'apoio', 'longo curso exportação', "
-            "'longo curso importação', 'cabotagem', 'interior', "
-            "'baldeação de carga nacional', 'baldeação de carga estrangeira de passagem'"
-        )
-
-        # Port filter: only apply if not "Brasil"
-        is_brasil = porto == "Brasil"
-        porto_filter = f"LOWER(c.porto_atracacao) LIKE '%{porto.lower()}%'" if not is_brasil else "1=1"
-
-        # 1. Dados atuais por sentido
-        query_atual = f"""
-        SELECT c.sentido, SUM(c.vlpesocargabruta_oficial) as carga_total
-        FROM `antaqdados.br_antaq_estatistico_aquaviario.v_carga_metodologia_oficial` c
-        WHERE c.isValidoMetodologiaANTAQ = 1
-          AND c.vlpesocargabruta_oficial > 0
-          AND LOWER(c.tipo_operacao_da_carga) IN ({tipo_operacao_oficial})
-          AND c.ano = {ano}
-          AND c.mes = {mes}
-          AND {porto_filter}
-        GROUP BY c.sentido
-        """
-
-        resultado_atual = client.query(query_atual).to_dataframe()
+    backend = get_query_backend()
+    cache = get_overview_cache()
+    if cache is None:
+        return _load_overview_data(backend, porto, ano, mes)
 
-        # 2. Dados do mesmo mês do ano anterior para comparação
-        ano_anterior = ano - 1  # Mesmo mês, ano anterior
-
-        query_anterior = f"""
-        SELECT c.sentido, SUM(c.vlpesocargabruta_oficial) as carga_total
-        FROM `antaqdados.br_antaq_estatistico_aquaviario.v_carga_metodologia_oficial` c
-        WHERE c.isValidoMetodologiaANTAQ = 1
-          AND c.vlpesocargabruta_oficial > 0
-          AND LOWER(c.tipo_operacao_da_carga) IN ({tipo_operacao_oficial})
-          AND c.ano = {ano_anterior}
-          AND c.mes = {mes}
-          AND {porto_filter}
-        GROUP BY c.sentido
-        """
+    try:
+        version = overview_data_version(backend)
+    except Exception:
+        logging.warning("Não foi possível obter a versão dos dados do overview", exc_info=True)
+        version = None
+    return cache.get_or_fetch(
+        porto, ano, mes, version,
+        lambda: _load_overview_data(backend, porto, ano, mes)
+    )
 
-        resultado_anterior = client.query(query_anterior).to_dataframe()
-
-        # 3. Top mercadorias exportadas
-        query_merc_exp = f"""
-        SELECT c.cdmercadoria, SUM(c.vlpesocargabruta_oficial) as carga_total
-        FROM `antaqdados.br_antaq_estatistico_aquaviario.v_carga_metodologia_oficial` c
-        WHERE c.isValidoMetodologiaANTAQ = 1
-          AND c.vlpesocargabruta_oficial > 0
-          AND LOWER(c.tipo_operacao_da_carga) IN ({tipo_operacao_oficial})
-          AND c.ano = {ano}
-          AND c.mes = {mes}
-          AND {porto_filter}
-          AND c.sentido = 'Embarcados'
-        GROUP BY c.cdmercadoria
-        ORDER BY carga_total DESC
-        LIMIT 5
-        """
 
-        mercadorias_exp = client.query(query_merc_exp).to_dataframe()
-
-        # 4. Top mercadorias importadas
-        query_merc_imp = f"""
-        SELECT c.cdmercadoria, SUM(c.vlpesocargabruta_oficial) as carga_total
-        FROM `antaqdados.br_antaq_estatistico_aquaviario.v_carga_metodologia_oficial` c
-        WHERE c.isValidoMetodologiaANTAQ = 1
-          AND c.vlpesocargabruta_oficial > 0
-          AND LOWER(c.tipo_operacao_da_carga) IN ({tipo_operacao_oficial})
-          AND c.ano = {ano}
-          AND c.mes = {mes}
-          AND {porto_filter}
-          AND c.sentido = 'Desembarcados'
-        GROUP BY c.cdmercadoria
-        ORDER BY carga_total DESC
-        LIMIT 5
-        """
+def _load_overview_data(backend, porto: str, ano: int, mes: int) -> Optional[Dict]:
+    """
+    Consulta e monta os dados do overview (sem cache).
 
-        mercadorias_imp = client.query(query_merc_imp).to_dataframe()
-
-        # 5. Top destinos das exportações
-        query_destinos = f"""
-        SELECT COALESCE(c.destino, 'Não informado') as destino,
-               SUM(c.vlpesocargabruta_oficial) as carga_total
-        FROM `antaqdados.br_antaq_estatistico_aquaviario.v_carga_metodologia_oficial` c
-        WHERE c.isValidoMetodologiaANTAQ = 1
-          AND c.vlpesocargabruta_oficial > 0
-          AND LOWER(c.tipo_operacao_da_carga) IN ({tipo_operacao_oficial})
-          AND c.ano = {ano}
-          AND c.mes = {mes}
-          AND {porto_filter}
-          AND c.sentido = 'Embarcados'
-        GROUP BY c.destino
-        ORDER BY carga_total DESC
-        LIMIT 5
-        """
+    Args:
+        backend: QueryBackend
+        porto: Nome do porto ou "Brasil" para análise agregada
+        ano: Ano
+        mes: Mês (1-12)
 
-        destinos = client.query(query_destinos).to_dataframe()
+    Returns:
+        Dicionário com todos os dados do overview, ou None em caso de erro
+    """
+    try:
+        ref_helper = get_referential_helper(backend)
+        ano_anterior = ano - 1  # Mesmo mês, ano anterior
 
-        # 6. UF do porto (não aplicável para Brasil)
-        if is_brasil:
-            uf = "BR"
-        else:
-            query_uf = f"""
-            SELECT DISTINCT c.uf
-            FROM `antaqdados.br_antaq_estatistico_aquaviario.v_carga_metodologia_oficial` c
-            WHERE {porto_filter}
-              AND c.ano = {ano}
-              AND c.isValidoMetodologiaANTAQ = 1
-            LIMIT 1
-            """
+        # Pre-aggregated cube when both months are built; one live scan otherwise
+        cube = get_cargo_cube()
+        sections = cube.overview(porto, ano, mes) if cube is not None else None
+        if sections is None:
+            sections = query_overview_sections(backend, porto, ano, mes)
 
-            resultado_uf = client.query(query_uf).to_dataframe()
-            uf = resultado_uf.iloc[0]['uf'] if not resultado_uf.empty else 'SP'
+        resultado_atual = sections["resultado_atual"]
+        resultado_anterior = sections["resultado_anterior"]
+        mercadorias_exp = sections["mercadorias_exp"]
+        mercadorias_imp = sections["mercadorias_imp"]
+        destinos = sections["destinos"]
+        uf = sections["uf"]
 
         # Processar resultados
         total_atual = 0
@@ -267,9 +178,11 @@ def fetch_overview_data(porto: str, ano: int, mes: int) -> Optional[Dict]:
         # Enriquecer destinos
         destinos_enriquecidos = []
         if not destinos.empty:
+            # Todos os destinos resolvidos de uma vez (no máximo uma consulta)
+            nomes_destinos = ref_helper.batch_enrich_destinos(destinos['destino'].tolist())
             for _, row in destinos.iterrows():
                 pct = (row['carga_total'] / exportacao_atual * 100) if exportacao_atual > 0 else 0
-                destino_nome = ref_helper.enrich_destino_with_info(row['destino'])
+                destino_nome = nomes_destinos.get(str(row['destino']), row['destino'])
                 destinos_enriquecidos.append({
                     "nome": destino_nome,
                     "carga": row['carga_total'],
@@ -430,9 +343,6 @@ def show_overview_form():
     # Get available portos
     portos = get_available_portos()
 
-    # Get latest period
-    latest = get_latest_data_period()
-
     with st.form("overview_form"):
         col1, col2 = st.columns(2)
 
@@ -60,33 +60,11 @@ def init_session_state():
 
 
 def get_latest_data_period():
-    """Busca o último ano e mês disponível no BigQuery."""
+    """Busca o último ano e mês publicados (sem varrer a view)."""
     try:
-        from google.cloud import bigquery
-
-        client = bigquery.Client(project=os.getenv("GOOGLE_CLOUD_PROJECT", "saasimpacto"))
-
-        query = """
-        SELECT ano, mes, MAX(data_referencia) as ultima_data
-        FROM `antaqdados.br_antaq_estatistico_aquaviario.v_carga_metodologia_oficial`
-        WHERE isValidoMetodologiaANTAQ = 1
-        GROUP BY ano, mes
-        ORDER BY ano DESC, mes DESC
-        LIMIT 1
-        """
-
-        result = client.query(query).to_dataframe()
-
-        if not result.empty:
-            meses = ["Janeiro", "Fevereiro", "Março", "Abril", "Maio", "Junho",
-                     "Julho", "Agosto", "Setembro", "Outubro", "Novembro", "Dezembro"]
-
-            return {
-                "ano": int(result.iloc[0]['ano']),
-                "mes": int(result.iloc[0]['mes']),
-                "mes_nome": meses[int(result.iloc[0]['mes']) - 1],
-                "ultima_data": str(result.iloc[0]['ultima_data'])
-            }
+        from src.bigquery.freshness import get_freshness_service
+
+        return get_freshness_service().latest_period()
     except Exception:
         pass
 
@@ -1,15 +1,28 @@
 """Agent module for LangGraph workflow."""
 from .state import AgentState, ValidationResult
-from .graph import create_graph, query_agente
+from .graph import create_graph, get_graph, close_graph, query_agente, stream_query_agente, checkpoint_size_report
+from .checkpoint import CheckpointStore
+from .runtime import AgentRuntime, get_agent_runtime
 from .nodes import (
     setup_schema_node,
+    check_question_cache_node,
+    route_intent_node,
     retrieve_examples_node,
     generate_sql_node,
     validate_sql_node,
+    estimate_cost_node,
     execute_sql_node,
     generate_final_answer_node,
     should_continue_to_execute,
+    route_after_question_cache,
+    route_after_cost_estimate,
+    route_after_intent,
 )
+from .intent_router import route_question, build_template_sql
+from .question_cache import QuestionCache, get_question_cache, normalize_question
+from .artifacts import ResultStore, get_result_store, resolve_query_results
+from .timing import build_timing_report, format_timing_report
+from .batch import run_batch, load_questions
 from .prompts import get_system_prompt, get_sql_generation_prompt, get_final_answer_prompt
 from .tools import execute_bigquery_query, get_table_info, list_available_tables
 
@@ -17,14 +30,39 @@ __all__ = [
     "AgentState",
     "ValidationResult",
     "create_graph",
+    "get_graph",
+    "close_graph",
+    "checkpoint_size_report",
+    "CheckpointStore",
+    "AgentRuntime",
+    "get_agent_runtime",
     "query_agente",
+    "stream_query_agente",
     "setup_schema_node",
+    "check_question_cache_node",
+    "route_intent_node",
     "retrieve_examples_node",
     "generate_sql_node",
     "validate_sql_node",
+    "estimate_cost_node",
     "execute_sql_node",
     "generate_final_answer_node",
     "should_continue_to_execute",
+    "route_after_question_cache",
+    "route_after_cost_estimate",
+    "route_after_intent",
+    "route_question",
+    "build_template_sql",
+    "QuestionCache",
+    "get_question_cache",
+    "normalize_question",
+    "ResultStore",
+    "get_result_store",
+    "resolve_query_results",
+    "build_timing_report",
+    "run_batch",
+    "load_questions",
+    "format_timing_report",
     "get_system_prompt",
     "get_sql_generation_prompt",
     "get_final_answer_prompt",
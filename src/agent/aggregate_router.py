@@ -0,0 +1,224 @@
+"""
+Aggregate navigation: answer SUM-by-dimension queries from the cargo cube.
+
+Most agent questions are "tonnage by port / commodity / direction / period".
+When the validated SQL only reads v_carga_metodologia_oficial, filters and
+groups on dimensions that the monthly cargo cube keeps (see
+src/bigquery/cube.py) and aggregates vlpesocargabruta_oficial with SUM (or
+counts rows), it is rewritten to read the cube:
+
+- SUM(vlpesocargabruta_oficial) -> SUM(carga_total)
+- COUNT(*)                      -> COALESCE(SUM(registros), 0)
+- the official filters baked into the cube (isValidoMetodologiaANTAQ = 1 and
+  vlpesocargabruta_oficial > 0) are removed from WHERE
+
+Anything else (joins, subqueries, other columns or aggregates, queries without
+the baked filters) is left untouched and runs on the view.
+"""
+import logging
+import os
+from typing import Any, Dict, List, Optional
+
+from ..bigquery.cube import CUBE_DIMENSIONS, CUBE_TABLE
+from ..bigquery.replica import PARTITIONED_TABLE
+from ..utils.cache import LRUCache
+
+
+MEASURE_COLUMN = "vlpesocargabruta_oficial"
+VALID_FLAG_COLUMN = "isvalidometodologiaantaq"
+
+_DIMENSIONS = {name.lower() for name in CUBE_DIMENSIONS}
+
+# Backend -> whether it can read the cube (list_tables may be an API call)
+_availability = LRUCache(max_size=8, ttl_seconds=600)
+
+
+def aggregate_router_enabled() -> bool:
+    """Whether the aggregate router is enabled (AGGREGATE_ROUTER_ENABLED)."""
+    return os.getenv("AGGREGATE_ROUTER_ENABLED", "true").lower() == "true"
+
+
+def cube_available(backend) -> bool:
+    """
+    Whether a backend exposes the cargo cube table.
+
+    Args:
+        backend: QueryBackend
+
+    Returns:
+        True if the cube is listed among the backend tables
+    """
+    key = id(backend)
+    available = _availability.get(key)
+    if available is None:
+        try:
+            available = CUBE_TABLE in backend.list_tables()
+        except Exception:
+            logging.warning("Could not list backend tables for the aggregate router", exc_info=True)
+            available = False
+        _availability.set(key, available)
+    return available
+
+
+def _conjuncts(condition) -> List[Any]:
+    """Top-level AND terms of a condition (parentheses removed)."""
+    from sqlglot import exp
+
+    condition = condition.unnest()
+    if isinstance(condition, exp.And):
+        return _conjuncts(condition.this) + _conjuncts(condition.expression)
+    return [condition]
+
+
+def _is_column(node, name: str) -> bool:
+    from sqlglot import exp
+    return isinstance(node, exp.Column) and node.name.lower() == name
+
+
+def _is_number(node, value: int) -> bool:
+    from sqlglot import exp
+    return isinstance(node, exp.Literal) and not node.is_string and node.this == str(value)
+
+
+def _is_baked_filter(condition) -> bool:
+    """isValidoMetodologiaANTAQ = 1 or vlpesocargabruta_oficial > 0."""
+    from sqlglot import exp
+
+    if isinstance(condition, exp.EQ):
+        sides = (condition.this, condition.expression)
+        return any(
+            _is_column(a, VALID_FLAG_COLUMN) and _is_number(b, 1)
+            for a, b in (sides, sides[::-1])
+        )
+    if isinstance(condition, exp.GT):
+        return _is_column(condition.this, MEASURE_COLUMN) and _is_number(condition.expression, 0)
+    if isinstance(condition, exp.LT):
+        return _is_column(condition.expression, MEASURE_COLUMN) and _is_number(condition.this, 0)
+    return False
+
+
+def _summed_measure(column) -> bool:
+    """Whether a measure column only feeds a SUM (directly or through CASE/IF)."""
+    from sqlglot import exp
+
+    node = column.parent
+    while isinstance(node, (exp.Paren, exp.If, exp.Case)):
+        node = node.parent
+    return isinstance(node, exp.Sum)
+
+
+def rewrite_for_cube(sql: str) -> Optional[Dict[str, str]]:
+    """
+    Rewrite a query on v_carga_metodologia_oficial to read the cargo cube.
+
+    Args:
+        sql: Validated SQL (BigQuery dialect)
+
+    Returns:
+        {"table": cube table reference, "sql": rewritten SQL}, or None when
+        the cube does not cover the query
+    """
+    try:
+        import sqlglot
+        from sqlglot import exp
+    except ImportError:
+        return None
+
+    try:
+        statements = [s for s in sqlglot.parse(sql, read="bigquery") if s is not None]
+    except Exception:
+        return None
+    if len(statements) != 1 or not isinstance(statements[0], exp.Select):
+        return None
+    tree = statements[0].copy()
+
+    # One SELECT on the view: no joins, CTEs, subqueries, set operations or windows
+    if any(tree.find(node) for node in (exp.Join, exp.With, exp.Subquery, exp.Union, exp.Window)):
+        return None
+    if any(select is not tree for select in tree.find_all(exp.Select)):
+        return None
+    tables = list(tree.find_all(exp.Table))
+    if len(tables) != 1 or tables[0].name.lower() != PARTITIONED_TABLE:
+        return None
+    source = tables[0]
+
+    # The cube only has rows that pass the baked filters, so the query must apply both
+    where = tree.args.get("where")
+    conjuncts = _conjuncts(where.this) if where is not None else []
+    baked = [c for c in conjuncts if _is_baked_filter(c)]
+    if not any(c.find(exp.Column).name.lower() == VALID_FLAG_COLUMN for c in baked):
+        return None
+    if not any(c.find(exp.Column).name.lower() == MEASURE_COLUMN for c in baked):
+        return None
+    remaining = [c for c in conjuncts if not _is_baked_filter(c)]
+    if remaining:
+        tree.set("where", exp.Where(this=exp.and_(*remaining)))
+    else:
+        tree.set("where", None)
+
+    aggregates = list(tree.find_all(exp.AggFunc))
+    if not aggregates and not tree.args.get("distinct") and not tree.args.get("group"):
+        return None  # Row-level query
+
+    qualifiers = {"", source.name.lower(), (source.alias or "").lower()}
+    aliases = {e.alias.lower() for e in tree.expressions if e.alias}
+
+    # COUNT(*) / COUNT(1) count view rows: the cube keeps them in registros
+    for count in [a for a in aggregates if isinstance(a, exp.Count)]:
+        argument = count.this
+        if isinstance(argument, exp.Star) or _is_number(argument, 1):
+            qualifier = source.alias_or_name
+            count.replace(sqlglot.parse_one(f"COALESCE(SUM({qualifier}.registros), 0)", read="bigquery"))
+        elif not isinstance(argument, exp.Distinct):
+            return None  # COUNT(col) counts non-null view rows
+
+    for aggregate in tree.find_all(exp.AggFunc):
+        if not isinstance(aggregate, (exp.Sum, exp.Count, exp.Min, exp.Max)):
+            return None
+    if any(not isinstance(star.parent, exp.Count) for star in tree.find_all(exp.Star)):
+        return None  # SELECT *
+
+    for column in list(tree.find_all(exp.Column)):
+        name = column.name.lower()
+        if column.table.lower() not in qualifiers:
+            return None
+        if name == "registros" and isinstance(column.parent, exp.Sum):
+            continue  # Inserted above
+        if name in _DIMENSIONS:
+            continue
+        if name == MEASURE_COLUMN and _summed_measure(column):
+            column.set("this", exp.to_identifier("carga_total"))
+            continue
+        if not column.table and name in aliases:
+            continue  # ORDER BY / HAVING on a select alias
+        return None
+
+    if not source.alias:
+        # Columns qualified with the view name keep resolving
+        source.set("alias", exp.TableAlias(this=exp.to_identifier(source.name)))
+    source.set("this", exp.to_identifier(CUBE_TABLE))
+
+    return {
+        "table": ".".join(part for part in (source.catalog, source.db, CUBE_TABLE) if part),
+        "sql": tree.sql(dialect="bigquery"),
+    }
+
+
+def route_to_aggregate(sql: Optional[str], backend) -> Optional[Dict[str, str]]:
+    """
+    Cube rewrite of a validated query, when enabled and available.
+
+    Args:
+        sql: Validated SQL
+        backend: QueryBackend that will run the query
+
+    Returns:
+        Same as rewrite_for_cube, or None
+    """
+    if not sql or not aggregate_router_enabled() or not cube_available(backend):
+        return None
+    try:
+        return rewrite_for_cube(sql)
+    except Exception:
+        logging.warning("Aggregate rewrite failed, using the view", exc_info=True)
+        return None
@@ -0,0 +1,179 @@
+"""
+Result artifact store that keeps query rows out of the checkpointed AgentState.
+
+Every node update is serialized by the checkpointer, so carrying up to 1000 rows
+in the state made each checkpoint write large. execute_sql_node stores the rows
+here and the state only carries a handle, the row count and the result schema.
+Consumers (final answer, chat UI, batch) resolve the handle when they need rows.
+
+Results are kept as QueryResult (Arrow) in an in-memory LRU. When
+RESULT_STORE_DIR is set they are also written as Parquet files, so handles
+restored from a persistent checkpoint still resolve after a restart.
+"""
+import logging
+import os
+import threading
+import uuid
+from typing import Any, Dict, List, Optional
+
+from ..utils.cache import LRUCache
+from ..utils.result import QueryResult
+
+
+def infer_result_schema(result: Any) -> List[Dict[str, str]]:
+    """
+    Column names and Arrow types of a result.
+
+    Args:
+        result: QueryResult, pyarrow.Table or list of dictionaries
+
+    Returns:
+        List of {"name", "type"} in column order
+    """
+    return [
+        {"name": column["name"], "type": column["type"]}
+        for column in QueryResult.coerce(result).columns
+    ]
+
+
+class ResultStore:
+    """
+    Handle -> QueryResult store with an in-memory LRU and optional Parquet spill.
+    """
+
+    def __init__(self, max_entries: int = 64, directory: Optional[str] = None):
+        """
+        Initialize the store.
+
+        Args:
+            max_entries: Results kept in memory (and on disk, when enabled)
+            directory: Optional directory for Parquet copies of the results
+        """
+        self.max_entries = max_entries
+        self.directory = directory or None
+        self._memory = LRUCache(max_size=max_entries)
+        self._lock = threading.Lock()
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+
+    def put(self, result: Any) -> Dict[str, Any]:
+        """
+        Store a result.
+
+        Args:
+            result: QueryResult, pyarrow.Table or list of dictionaries
+
+        Returns:
+            Dictionary with results_handle, row_count and result_schema
+        """
+        result = QueryResult.coerce(result)
+        handle = uuid.uuid4().hex
+        self._memory.set(handle, result)
+        if self.directory:
+            self._write_parquet(handle, result)
+        return {
+            "results_handle": handle,
+            "row_count": len(result),
+            "result_schema": infer_result_schema(result),
+        }
+
+    def get(self, handle: Optional[str]) -> Optional[QueryResult]:
+        """
+        Resolve a handle.
+
+        Args:
+            handle: Handle returned by put
+
+        Returns:
+            QueryResult, or None when the handle is unknown or expired
+        """
+        if not handle:
+            return None
+
+        result = self._memory.get(handle)
+        if result is None and self.directory:
+            result = self._read_parquet(handle)
+            if result is not None:
+                self._memory.set(handle, result)
+        return result
+
+    def _path(self, handle: str) -> str:
+        return os.path.join(self.directory, f"{handle}.parquet")
+
+    def _write_parquet(self, handle: str, result: QueryResult) -> None:
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            logging.warning("pyarrow not installed, results kept in memory only")
+            self.directory = None
+            return
+
+        path = self._path(handle)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            pq.write_table(result.to_arrow(), tmp_path)
+            os.replace(tmp_path, path)
+        except Exception:
+            logging.warning("Could not write result artifact %s", path, exc_info=True)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        self._prune()
+
+    def _read_parquet(self, handle: str) -> Optional[QueryResult]:
+        path = self._path(handle)
+        if not os.path.exists(path):
+            return None
+        try:
+            import pyarrow.parquet as pq
+            return QueryResult(pq.read_table(path))
+        except Exception:
+            logging.warning("Could not read result artifact %s", path, exc_info=True)
+            return None
+
+    def _prune(self) -> None:
+        with self._lock:
+            files = [
+                os.path.join(self.directory, name)
+                for name in os.listdir(self.directory)
+                if name.endswith(".parquet")
+            ]
+            if len(files) <= self.max_entries:
+                return
+            files.sort(key=lambda p: os.path.getmtime(p))
+            for path in files[:len(files) - self.max_entries]:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+def resolve_query_results(state: Dict[str, Any]) -> Optional[QueryResult]:
+    """
+    Result referenced by a state or by a query_agente result.
+
+    Args:
+        state: AgentState (or the dictionary returned by query_agente)
+
+    Returns:
+        QueryResult, or None when there is no result or the handle expired
+    """
+    handle = state.get("results_handle")
+    if not handle:
+        return None
+    return get_result_store().get(handle)
+
+
+# Singleton instance
+_result_store: Optional[ResultStore] = None
+
+
+def get_result_store() -> ResultStore:
+    """Get the process-wide result store configured from environment."""
+    global _result_store
+    if _result_store is None:
+        _result_store = ResultStore(
+            max_entries=int(os.getenv("RESULT_STORE_MAX_ENTRIES", "64")),
+            directory=os.getenv("RESULT_STORE_DIR") or None,
+        )
+    return _result_store
@@ -0,0 +1,255 @@
+"""
+Batch execution of many questions through the agent graph.
+
+Questions run concurrently (bounded by a semaphore), each in its own
+conversation thread. Every result is appended to a JSONL file as soon as it is
+ready, so an interrupted run can be resumed: questions already answered
+successfully are skipped.
+
+Usage:
+    antaq-batch perguntas.csv -o boletim.jsonl --concurrency 8
+    python -m src.agent.batch perguntas.txt
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import sys
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Union
+
+from ..utils.formatting import result_rows
+from .artifacts import resolve_query_results
+
+
+QueryFn = Callable[..., Awaitable[Dict[str, Any]]]
+
+
+def load_questions(path: str) -> List[Dict[str, str]]:
+    """
+    Load questions from a CSV or a plain text file.
+
+    CSV files must have a "question" (or "pergunta") column and may have an
+    "id" column. Text files have one question per line; blank lines and lines
+    starting with "#" are ignored.
+
+    Args:
+        path: Input file path
+
+    Returns:
+        List of {"id", "question"} dictionaries
+    """
+    items: List[Dict[str, str]] = []
+    if path.lower().endswith(".csv"):
+        with open(path, newline="", encoding="utf-8-sig") as fh:
+            for row in csv.DictReader(fh):
+                question = (row.get("question") or row.get("pergunta") or "").strip()
+                if question:
+                    items.append({"id": (row.get("id") or "").strip(), "question": question})
+    else:
+        with open(path, encoding="utf-8") as fh:
+            for line in fh:
+                question = line.strip()
+                if question and not question.startswith("#"):
+                    items.append({"id": "", "question": question})
+
+    return _assign_ids(items)
+
+
+def _assign_ids(items: Iterable[Union[str, Dict[str, str]]]) -> List[Dict[str, str]]:
+    """Normalize questions to dictionaries with stable, unique ids."""
+    normalized = []
+    for index, item in enumerate(items, start=1):
+        if isinstance(item, str):
+            item = {"id": "", "question": item}
+        normalized.append({
+            "id": str(item.get("id") or f"q{index:04d}"),
+            "question": item["question"],
+        })
+
+    ids = [item["id"] for item in normalized]
+    if len(set(ids)) != len(ids):
+        raise ValueError("Question ids must be unique")
+    return normalized
+
+
+def load_completed_ids(output_path: str) -> Set[str]:
+    """
+    Ids of questions already answered successfully in a previous run.
+
+    Args:
+        output_path: JSONL results file
+
+    Returns:
+        Set of ids with status "ok"
+    """
+    completed: Set[str] = set()
+    if not os.path.exists(output_path):
+        return completed
+
+    with open(output_path, encoding="utf-8") as fh:
+        for line in fh:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # Partial line from an interrupted run
+                continue
+            if record.get("status") == "ok":
+                completed.add(str(record.get("id")))
+    return completed
+
+
+def _result_record(item: Dict[str, str], thread_id: str, result: Dict[str, Any],
+                   include_rows: bool) -> Dict[str, Any]:
+    record = {
+        "id": item["id"],
+        "question": item["question"],
+        "thread_id": thread_id,
+        # SQL errors are retried on resume, like exceptions
+        "status": "error" if result.get("sql_error") else "ok",
+        "final_answer": result.get("final_answer"),
+        "sql": result.get("validated_sql") or result.get("generated_sql"),
+        "sql_source": result.get("sql_source"),
+        "row_count": result.get("row_count"),
+        "error": result.get("sql_error"),
+    }
+    if include_rows:
+        record["query_results"] = result_rows(resolve_query_results(result)) or None
+    return record
+
+
+async def run_batch(
+    questions: Iterable[Union[str, Dict[str, str]]],
+    output_path: str,
+    concurrency: int = 4,
+    max_attempts: int = 3,
+    resume: bool = True,
+    include_rows: bool = True,
+    thread_prefix: str = "batch",
+    query_fn: Optional[QueryFn] = None,
+    on_result: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> Dict[str, Any]:
+    """
+    Run many questions through the agent with bounded concurrency.
+
+    Args:
+        questions: Question strings or {"id", "question"} dictionaries
+        output_path: JSONL file where results are appended
+        concurrency: Maximum number of questions in flight
+        max_attempts: Maximum SQL generation attempts per question
+        resume: Skip questions already answered successfully in output_path
+        include_rows: Whether query_results are written to the output
+        thread_prefix: Prefix of the per-question conversation thread ids
+        query_fn: Coroutine with the query_agente signature (defaults to it)
+        on_result: Optional callback invoked with every written record
+
+    Returns:
+        Summary with total, skipped, ok, error and elapsed_seconds
+    """
+    # The agent's checkpoint database is opened for this run and closed at
+    # the end, so the loop (and the CLI process) can finish
+    owns_graph = query_fn is None
+    if owns_graph:
+        from .graph import query_agente
+        query_fn = query_agente
+
+    items = _assign_ids(questions)
+    completed = load_completed_ids(output_path) if resume else set()
+    pending = [item for item in items if item["id"] not in completed]
+
+    # A fresh run id keeps retried questions out of the history of failed attempts
+    run_id = uuid.uuid4().hex[:8]
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    write_lock = asyncio.Lock()
+    summary = {"total": len(items), "skipped": len(items) - len(pending), "ok": 0, "error": 0}
+    started = time.perf_counter()
+
+    output_dir = os.path.dirname(os.path.abspath(output_path))
+    os.makedirs(output_dir, exist_ok=True)
+
+    try:
+        with open(output_path, "a" if resume else "w", encoding="utf-8") as out:
+
+            async def run_one(item: Dict[str, str]) -> None:
+                thread_id = f"{thread_prefix}-{run_id}-{item['id']}"
+                async with semaphore:
+                    question_started = time.perf_counter()
+                    try:
+                        result = await query_fn(
+                            question=item["question"],
+                            thread_id=thread_id,
+                            max_attempts=max_attempts
+                        )
+                        record = _result_record(item, thread_id, result, include_rows)
+                    except Exception as e:
+                        record = {
+                            "id": item["id"],
+                            "question": item["question"],
+                            "thread_id": thread_id,
+                            "status": "error",
+                            "error": str(e),
+                        }
+                    record["elapsed_seconds"] = round(time.perf_counter() - question_started, 3)
+
+                async with write_lock:
+                    out.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+                    out.flush()
+                    summary[record["status"]] += 1
+                    if on_result:
+                        on_result(record)
+
+            await asyncio.gather(*(run_one(item) for item in pending))
+    finally:
+        if owns_graph:
+            from .graph import close_graph
+            await close_graph()
+
+    summary["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+    return summary
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point (antaq-batch)."""
+    parser = argparse.ArgumentParser(
+        description="Executa um lote de perguntas no agente ANTAQ e grava os resultados em JSONL."
+    )
+    parser.add_argument("input", help="Arquivo .csv (coluna 'question') ou .txt (uma pergunta por linha)")
+    parser.add_argument("-o", "--output", help="Arquivo JSONL de saída (padrão: <input>.results.jsonl)")
+    parser.add_argument(
+        "-c", "--concurrency", type=int,
+        default=int(os.getenv("BATCH_CONCURRENCY", "4")),
+        help="Perguntas executadas em paralelo"
+    )
+    parser.add_argument("--max-attempts", type=int, default=3, help="Tentativas de geração de SQL")
+    parser.add_argument("--no-resume", action="store_true", help="Reexecuta tudo e sobrescreve a saída")
+    parser.add_argument("--no-rows", action="store_true", help="Não grava as linhas retornadas")
+    args = parser.parse_args(argv)
+
+    output = args.output or f"{os.path.splitext(args.input)[0]}.results.jsonl"
+    questions = load_questions(args.input)
+
+    def report(record: Dict[str, Any]) -> None:
+        mark = "✓" if record["status"] == "ok" else "✗"
+        print(f"{mark} [{record['id']}] {record['question'][:80]} ({record['elapsed_seconds']}s)")
+
+    summary = asyncio.run(run_batch(
+        questions,
+        output,
+        concurrency=args.concurrency,
+        max_attempts=args.max_attempts,
+        resume=not args.no_resume,
+        include_rows=not args.no_rows,
+        on_result=report
+    ))
+
+    print(
+        f"\n{summary['ok']} ok, {summary['error']} com erro, {summary['skipped']} já concluídas "
+        f"de {summary['total']} em {summary['elapsed_seconds']}s -> {output}"
+    )
+    return 1 if summary["error"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,276 @@
+"""
+Async SQLite checkpoint storage with bounded retention.
+
+The LangGraph checkpointer keeps every intermediate state of every thread. This
+module wraps AsyncSqliteSaver (aiosqlite, so writes never block the event loop)
+and keeps the database bounded:
+
+- WAL journal and incremental auto-vacuum, so deletes give space back;
+- per-thread compaction that keeps only the latest N checkpoints;
+- TTL garbage collection of threads idle for longer than a configured time;
+- a size report for monitoring.
+"""
+import logging
+import os
+import time
+from typing import Any, Dict, Optional
+
+
+# Tracks the last activity of each thread for TTL-based garbage collection
+ACTIVITY_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS thread_activity (
+    thread_id TEXT PRIMARY KEY,
+    last_seen REAL NOT NULL
+)
+"""
+
+
+class CheckpointStore:
+    """
+    AsyncSqliteSaver plus retention management for one SQLite database.
+
+    Must be created (via create) and used on the same event loop.
+    """
+
+    def __init__(
+        self,
+        saver,
+        conn,
+        path: str,
+        keep_per_thread: int = 20,
+        thread_ttl_seconds: Optional[float] = 72 * 3600,
+        gc_interval_seconds: float = 600
+    ):
+        """
+        Initialize the store (use CheckpointStore.create instead).
+
+        Args:
+            saver: AsyncSqliteSaver instance
+            conn: aiosqlite connection used by the saver
+            path: Database file path
+            keep_per_thread: Checkpoints kept per thread and namespace
+            thread_ttl_seconds: Idle time after which a thread is deleted (None = never)
+            gc_interval_seconds: Minimum time between garbage collections
+        """
+        self.saver = saver
+        self.conn = conn
+        self.path = path
+        self.keep_per_thread = max(1, keep_per_thread)
+        self.thread_ttl_seconds = thread_ttl_seconds
+        self.gc_interval_seconds = gc_interval_seconds
+        self._last_gc = 0.0
+
+    @classmethod
+    async def create(cls, path: str, **kwargs) -> "CheckpointStore":
+        """
+        Open the database, configure it and create the checkpoint tables.
+
+        Args:
+            path: Database file path
+            **kwargs: Retention settings (see __init__)
+
+        Returns:
+            CheckpointStore instance
+        """
+        import aiosqlite
+        from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+        conn = aiosqlite.connect(path)
+        # The worker thread would keep the interpreter alive if the owning loop
+        # ends without close() (e.g. a one-shot asyncio.run); every write is
+        # committed and awaited, so nothing is pending when the loop is gone
+        getattr(conn, "_thread", conn).daemon = True
+        await conn
+
+        # auto_vacuum must be set before tables exist; older databases are
+        # migrated once with a full VACUUM
+        cursor = await conn.execute("PRAGMA auto_vacuum")
+        (auto_vacuum,) = await cursor.fetchone()
+        if auto_vacuum != 2:
+            await conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            await conn.execute("VACUUM")
+
+        await conn.execute("PRAGMA journal_mode = WAL")
+        await conn.execute("PRAGMA synchronous = NORMAL")
+        await conn.execute("PRAGMA busy_timeout = 5000")
+
+        saver = AsyncSqliteSaver(conn)
+        await saver.setup()
+        await conn.execute(ACTIVITY_TABLE_SQL)
+        await conn.commit()
+
+        return cls(saver, conn, path, **kwargs)
+
+    async def touch(self, thread_id: str) -> None:
+        """Record activity on a thread."""
+        # The saver's lock keeps housekeeping from interleaving with checkpoint writes
+        async with self.saver.lock:
+            await self.conn.execute(
+                "INSERT INTO thread_activity (thread_id, last_seen) VALUES (?, ?) "
+                "ON CONFLICT(thread_id) DO UPDATE SET last_seen = excluded.last_seen",
+                (thread_id, time.time())
+            )
+            await self.conn.commit()
+
+    async def compact_thread(self, thread_id: str) -> int:
+        """
+        Keep only the latest keep_per_thread checkpoints of a thread.
+
+        Checkpoint ids are time-ordered, and the latest checkpoint holds the
+        full channel values (including message history), so older ones are
+        only needed for time travel.
+
+        Args:
+            thread_id: Conversation thread ID
+
+        Returns:
+            Number of deleted checkpoints
+        """
+        async with self.saver.lock:
+            cursor = await self.conn.execute(
+                """
+                DELETE FROM checkpoints WHERE rowid IN (
+                    SELECT rowid FROM (
+                        SELECT rowid, ROW_NUMBER() OVER (
+                            PARTITION BY checkpoint_ns ORDER BY checkpoint_id DESC
+                        ) AS position
+                        FROM checkpoints WHERE thread_id = ?
+                    ) WHERE position > ?
+                )
+                """,
+                (thread_id, self.keep_per_thread)
+            )
+            deleted = cursor.rowcount
+            if deleted:
+                await self.conn.execute(
+                    """
+                    DELETE FROM writes WHERE thread_id = ? AND NOT EXISTS (
+                        SELECT 1 FROM checkpoints c
+                        WHERE c.thread_id = writes.thread_id
+                          AND c.checkpoint_ns = writes.checkpoint_ns
+                          AND c.checkpoint_id = writes.checkpoint_id
+                    )
+                    """,
+                    (thread_id,)
+                )
+            await self.conn.commit()
+        return deleted
+
+    async def delete_thread(self, thread_id: str) -> None:
+        """Delete every checkpoint of a thread."""
+        async with self.saver.lock:
+            await self._delete_thread(thread_id)
+            await self.conn.commit()
+
+    async def _delete_thread(self, thread_id: str) -> None:
+        await self.conn.execute("DELETE FROM checkpoints WHERE thread_id = ?", (thread_id,))
+        await self.conn.execute("DELETE FROM writes WHERE thread_id = ?", (thread_id,))
+        await self.conn.execute("DELETE FROM thread_activity WHERE thread_id = ?", (thread_id,))
+
+    async def collect_garbage(self) -> int:
+        """
+        Delete threads idle for longer than thread_ttl_seconds and reclaim space.
+
+        Threads written before activity tracking existed start their TTL now.
+
+        Returns:
+            Number of deleted threads
+        """
+        now = time.time()
+        self._last_gc = now
+
+        async with self.saver.lock:
+            await self.conn.execute(
+                "INSERT OR IGNORE INTO thread_activity (thread_id, last_seen) "
+                "SELECT DISTINCT thread_id, ? FROM checkpoints",
+                (now,)
+            )
+
+            expired = []
+            if self.thread_ttl_seconds is not None:
+                cursor = await self.conn.execute(
+                    "SELECT thread_id FROM thread_activity WHERE last_seen < ?",
+                    (now - self.thread_ttl_seconds,)
+                )
+                expired = [row[0] for row in await cursor.fetchall()]
+            for thread_id in expired:
+                await self._delete_thread(thread_id)
+
+            await self.conn.commit()
+            # incremental_vacuum only frees pages while its rows are consumed
+            cursor = await self.conn.execute("PRAGMA incremental_vacuum")
+            await cursor.fetchall()
+            await self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+        if expired:
+            logging.info("Checkpoint GC removed %d idle threads", len(expired))
+        return len(expired)
+
+    async def after_run(self, thread_id: str) -> None:
+        """
+        Housekeeping after a graph run: activity, compaction and periodic GC.
+
+        Args:
+            thread_id: Thread that just ran
+        """
+        try:
+            await self.touch(thread_id)
+            await self.compact_thread(thread_id)
+            if time.time() - self._last_gc >= self.gc_interval_seconds:
+                await self.collect_garbage()
+        except Exception:
+            logging.warning("Checkpoint housekeeping failed", exc_info=True)
+
+    async def size_report(self) -> Dict[str, Any]:
+        """
+        Size of the checkpoint database.
+
+        Returns:
+            Dictionary with path, file_bytes, wal_bytes, threads, checkpoints and writes
+        """
+        report: Dict[str, Any] = {"path": self.path}
+        for key, suffix in (("file_bytes", ""), ("wal_bytes", "-wal")):
+            try:
+                report[key] = os.path.getsize(self.path + suffix)
+            except OSError:
+                report[key] = 0
+        for key, sql in (
+            ("threads", "SELECT COUNT(DISTINCT thread_id) FROM checkpoints"),
+            ("checkpoints", "SELECT COUNT(*) FROM checkpoints"),
+            ("writes", "SELECT COUNT(*) FROM writes"),
+        ):
+            cursor = await self.conn.execute(sql)
+            (report[key],) = await cursor.fetchone()
+        return report
+
+    async def close(self) -> None:
+        """Close the database connection."""
+        await self.conn.close()
+
+
+async def create_checkpoint_store_from_env() -> Optional[CheckpointStore]:
+    """
+    Build the checkpoint store from environment settings.
+
+    Returns:
+        CheckpointStore, or None when LANGCHAIN_CHECKPOINT_PATH is empty or the
+        async SQLite saver is not installed (callers fall back to MemorySaver)
+    """
+    path = os.getenv("LANGCHAIN_CHECKPOINT_PATH", os.path.join(os.getcwd(), ".langchain_checkpoint.db"))
+    if not path:
+        return None
+
+    ttl_hours = os.getenv("CHECKPOINT_THREAD_TTL_HOURS", "72")
+    try:
+        return await CheckpointStore.create(
+            path,
+            keep_per_thread=int(os.getenv("CHECKPOINT_KEEP_PER_THREAD", "20")),
+            thread_ttl_seconds=float(ttl_hours) * 3600 if ttl_hours else None,
+            gc_interval_seconds=float(os.getenv("CHECKPOINT_GC_INTERVAL_SECONDS", "600")),
+        )
+    except ImportError:
+        logging.warning("aiosqlite / langgraph-checkpoint-sqlite not installed, using MemorySaver")
+        return None
+    except Exception:
+        logging.warning("Could not open checkpoint database %s, using MemorySaver", path, exc_info=True)
+        return None
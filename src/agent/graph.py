@@ -1,10 +1,12 @@
 """
 LangGraph state machine definition for ANTAQ SQL Agent.
 """
-from typing import Literal, Optional
-from langgraph.graph import StateGraph, END
+from typing import Any, AsyncIterator, Dict, Literal, Optional
+from langgraph.graph import StateGraph, START, END
 from langgraph.checkpoint.memory import MemorySaver
-import os
+import asyncio
+import logging
+import weakref
 
 # Optional Sentry integration
 try:
@@ -14,47 +16,163 @@ except ImportError:
     SENTRY_AVAILABLE = False
 
 from .state import AgentState
+from .checkpoint import create_checkpoint_store_from_env
+from .timing import timed_node, build_timing_report, format_timing_report
 from .nodes import (
     setup_schema_node,
+    check_question_cache_node,
     retrieve_examples_node,
     generate_sql_node,
     validate_sql_node,
     execute_sql_node,
     generate_final_answer_node,
     should_continue_to_execute,
+    route_after_question_cache,
+    estimate_cost_node,
+    route_after_cost_estimate,
+    route_intent_node,
+    route_after_intent,
 )
 
 # Cache for compiled graph to avoid recreating it on every query
 _cached_graph = None
 
-
-def _get_checkpointer():
+# Graph compiled with the async SQLite checkpointer of a given event loop
+_bound_graph = None
+_bound_store = None
+_bound_loop = None
+_bind_locks: "weakref.WeakKeyDictionary" = weakref.WeakKeyDictionary()
+
+# User-facing progress labels for each node (shown while streaming)
+NODE_LABELS = {
+    "setup_schema": "Carregando schema",
+    "check_question_cache": "Verificando consultas anteriores",
+    "retrieve_examples": "Buscando exemplos similares",
+    "route_intent": "Identificando o tipo de pergunta",
+    "generate_sql": "Gerando SQL",
+    "validate_sql": "Validando SQL",
+    "estimate_cost": "Estimando custo da consulta",
+    "execute_sql": "Executando no BigQuery",
+    "generate_final_answer": "Redigindo resposta",
+}
+
+# Node whose LLM tokens are streamed to the user
+ANSWER_NODE = "generate_final_answer"
+
+# Independent preparation work. These nodes start together from START and join
+# at check_question_cache, so the first question pays max() instead of sum()
+# of their latencies. New catalog lookups should be registered here.
+PREPARATION_NODES = {
+    "setup_schema": setup_schema_node,
+    "retrieve_examples": retrieve_examples_node,
+}
+
+
+async def get_checkpoint_store():
     """
-    Get the appropriate checkpointer based on configuration.
+    Get the checkpoint store bound to the running event loop.
 
     Returns:
-        MemorySaver or a disk-based checkpointer if available
+        CheckpointStore, or None when the async SQLite checkpointer is unavailable
     """
-    # Try to use disk-based checkpointer for better memory management
-    try:
-        from langgraph.checkpoint.sqlite import SqliteSaver
+    await get_graph()
+    return _bound_store
+
+
+async def get_graph():
+    """
+    Get the compiled graph with an async SQLite checkpointer for the running loop.
+
+    The checkpointer connection belongs to the loop it was opened on, so the
+    graph is rebuilt when called from a different loop (use AgentRuntime for a
+    long-lived one).
 
-        # Use a temporary SQLite database for checkpoint storage
-        # This persists conversation history to disk instead of memory
-        checkpoint_path = os.getenv(
-            "LANGCHAIN_CHECKPOINT_PATH",
-            os.path.join(os.getcwd(), ".langchain_checkpoint.db")
+    Returns:
+        Compiled LangGraph
+    """
+    global _bound_graph, _bound_store, _bound_loop
+
+    loop = asyncio.get_running_loop()
+    if _bound_graph is not None and _bound_loop is loop:
+        return _bound_graph
+
+    async with _bind_lock(loop):
+        if _bound_graph is not None and _bound_loop is loop:
+            return _bound_graph
+
+        previous_store, previous_loop = _bound_store, _bound_loop
+        if previous_store is not None:
+            if previous_loop is not None and previous_loop.is_running():
+                asyncio.run_coroutine_threadsafe(previous_store.close(), previous_loop)
+            else:
+                # The loop that opened it is gone; the connection's worker
+                # thread does not depend on it, so close it from here
+                await _close_store(previous_store)
+
+        store = await create_checkpoint_store_from_env()
+        _bound_graph = create_graph(
+            use_cache=False,
+            checkpointer=store.saver if store else MemorySaver()
         )
-        return SqliteSaver.from_conn_string(checkpoint_path)
-    except ImportError:
-        # Fallback to memory-based checkpointer
-        return MemorySaver()
+        _bound_store = store
+        _bound_loop = loop
+        return _bound_graph
+
+
+async def _close_store(store) -> None:
+    try:
+        await store.close()
     except Exception:
-        # If anything goes wrong, fallback to memory
-        return MemorySaver()
+        logging.warning("Could not close checkpoint database %s", store.path, exc_info=True)
+
+
+async def close_graph() -> None:
+    """
+    Close the checkpoint database bound by get_graph().
+
+    One-shot callers (asyncio.run, CLI scripts) should await it before their
+    loop ends; the next get_graph() opens the database again.
+    """
+    global _bound_graph, _bound_store, _bound_loop
+
+    loop = asyncio.get_running_loop()
+    async with _bind_lock(loop):
+        store = _bound_store
+        _bound_graph = _bound_store = _bound_loop = None
+        if store is not None:
+            await _close_store(store)
+
+
+def _bind_lock(loop) -> asyncio.Lock:
+    """Per-loop lock so concurrent first calls open a single checkpointer."""
+    lock = _bind_locks.get(loop)
+    if lock is None:
+        lock = _bind_locks[loop] = asyncio.Lock()
+    return lock
+
+
+async def _after_run(thread_id: str) -> None:
+    """Checkpoint housekeeping (activity, compaction, periodic GC) after a run."""
+    if _bound_store is not None:
+        await _bound_store.after_run(thread_id)
+
+
+async def checkpoint_size_report() -> Optional[Dict[str, Any]]:
+    """
+    Size of the checkpoint database (file, WAL, threads, checkpoints, writes).
+
+    Returns:
+        Report dictionary, or None when checkpoints are kept in memory
+    """
+    store = await get_checkpoint_store()
+    return await store.size_report() if store else None
 
 
-def create_graph(model_name: str = "gemini-1.5-flash", use_cache: bool = True) -> StateGraph:
+def create_graph(
+    model_name: str = "gemini-1.5-flash",
+    use_cache: bool = True,
+    checkpointer=None
+) -> StateGraph:
     """
     Create and compile the LangGraph state machine.
     Uses caching to avoid recreating the graph on every call.
@@ -62,6 +180,8 @@ def create_graph(model_name: str = "gemini-1.5-flash", use_cache: bool = True) -
     Args:
         model_name: Vertex AI model to use (not directly used here, nodes use env var)
         use_cache: Whether to use cached graph (default: True)
+        checkpointer: Checkpointer to compile with (default: MemorySaver).
+            Async callers should use get_graph(), which uses the SQLite store.
 
     Returns:
         Compiled LangGraph ready for invocation
@@ -75,20 +195,46 @@ def create_graph(model_name: str = "gemini-1.5-flash", use_cache: bool = True) -
     # Initialize the state graph
     workflow = StateGraph(AgentState)
 
-    # Add all nodes
-    workflow.add_node("setup_schema", setup_schema_node)
-    workflow.add_node("retrieve_examples", retrieve_examples_node)
-    workflow.add_node("generate_sql", generate_sql_node)
-    workflow.add_node("validate_sql", validate_sql_node)
-    workflow.add_node("execute_sql", execute_sql_node)
-    workflow.add_node("generate_final_answer", generate_final_answer_node)
+    # Add all nodes (each one reports its duration into node_timings)
+    nodes = {
+        **PREPARATION_NODES,
+        "check_question_cache": check_question_cache_node,
+        "route_intent": route_intent_node,
+        "generate_sql": generate_sql_node,
+        "validate_sql": validate_sql_node,
+        "estimate_cost": estimate_cost_node,
+        "execute_sql": execute_sql_node,
+        "generate_final_answer": generate_final_answer_node,
+    }
+    for name, node in nodes.items():
+        workflow.add_node(name, timed_node(name, node))
+
+    # Fan out the preparation nodes and join them before the cache check
+    for name in PREPARATION_NODES:
+        workflow.add_edge(START, name)
+    workflow.add_edge(list(PREPARATION_NODES), "check_question_cache")
+
+    # Cached SQL skips generation; a cached answer ends the run
+    workflow.add_conditional_edges(
+        "check_question_cache",
+        route_after_question_cache,
+        {
+            "miss": "route_intent",
+            "execute": "execute_sql",
+            "answer": END
+        }
+    )
 
-    # Define entry point
-    workflow.set_entry_point("setup_schema")
+    # Common questions are answered from SQL templates without the LLM
+    workflow.add_conditional_edges(
+        "route_intent",
+        route_after_intent,
+        {
+            "template": "validate_sql",
+            "llm": "generate_sql"
+        }
+    )
 
-    # Add edges
-    workflow.add_edge("setup_schema", "retrieve_examples")
-    workflow.add_edge("retrieve_examples", "generate_sql")
     workflow.add_edge("generate_sql", "validate_sql")
 
     # Conditional routing from validation
@@ -96,20 +242,28 @@ def create_graph(model_name: str = "gemini-1.5-flash", use_cache: bool = True) -
         "validate_sql",
         should_continue_to_execute,
         {
-            "execute": "execute_sql",
+            "execute": "estimate_cost",
             "retry": "generate_sql",
             "end": END
         }
     )
 
+    # Dry-run cost gate: run, ask for a cheaper rewrite, or refuse
+    workflow.add_conditional_edges(
+        "estimate_cost",
+        route_after_cost_estimate,
+        {
+            "execute": "execute_sql",
+            "retry": "generate_sql",
+            "refuse": "generate_final_answer"
+        }
+    )
+
     workflow.add_edge("execute_sql", "generate_final_answer")
     workflow.add_edge("generate_final_answer", END)
 
-    # Compile with checkpointer (disk-based if available, otherwise memory)
-    checkpointer = _get_checkpointer()
-
     compiled = workflow.compile(
-        checkpointer=checkpointer,
+        checkpointer=checkpointer or MemorySaver(),
         interrupt_before=None,
         interrupt_after=None
     )
@@ -152,41 +306,134 @@ async def query_agente(
         raise
 
 
-async def _query_agente_impl(
-    question: str,
-    thread_id: str,
-    max_attempts: int
-) -> dict:
-    """
-    Internal implementation of query execution.
-    """
+def _build_initial_state(question: str, max_attempts: int, thread_id: Optional[str] = None) -> AgentState:
+    """Build the initial state for a new question."""
     from langchain_core.messages import HumanMessage
 
-    graph = create_graph()
-
     # Initial state - include the user's question as a message for conversation history
     # Don't set empty messages[] to allow checkpoint to restore history
-    initial_state: AgentState = {
+    return {
         "messages": [HumanMessage(content=question)],  # Add user question to history
         "question": question,
+        "thread_id": thread_id,
         "dataset_schema": None,  # Will be loaded by setup_schema_node
+        "schema_version": None,
+        "schema_selection": None,
         "generated_sql": None,
         "validated_sql": None,
         "sql_error": None,
-        "query_results": None,
+        "sql_source": None,
+        "question_cache_hit": None,
+        "intent": None,
+        "aggregate_rewrite": None,
+        "estimated_bytes": None,
+        "referenced_tables": None,
+        "cost_decision": None,
+        "results_handle": None,
         "row_count": None,
+        "result_schema": None,
         "retrieved_examples": None,
         "final_answer": None,
         "attempt_count": 0,
-        "max_attempts": max_attempts
+        "max_attempts": max_attempts,
+        "node_timings": None  # Reset timings from the previous turn
     }
 
-    config = {
+
+def _build_config(thread_id: str) -> dict:
+    """Build the run configuration for a conversation thread."""
+    return {
         "configurable": {
             "thread_id": thread_id
         }
     }
 
+
+async def _query_agente_impl(
+    question: str,
+    thread_id: str,
+    max_attempts: int
+) -> dict:
+    """
+    Internal implementation of query execution.
+    """
+    graph = await get_graph()
+
+    initial_state = _build_initial_state(question, max_attempts, thread_id)
+    config = _build_config(thread_id)
+
     result = await graph.ainvoke(initial_state, config=config)
 
+    _log_timing_report(result)
+    await _after_run(thread_id)
+
     return result
+
+
+def _log_timing_report(result: dict) -> None:
+    """Log per-node timings of a finished run."""
+    report = build_timing_report(result.get("node_timings"))
+    if report["nodes"]:
+        logging.info("Agent node timings:\n%s", format_timing_report(report))
+
+
+async def stream_query_agente(
+    question: str,
+    thread_id: str = "session1",
+    max_attempts: int = 3
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Execute a query through the agent, streaming progress as it happens.
+
+    Yields dictionaries with a "type" key:
+        - {"type": "node", "node": name, "label": label} when a node starts
+        - {"type": "token", "content": text} for each final-answer token
+        - {"type": "result", "result": state} once, with the final state
+
+    Args:
+        question: User's question in natural language
+        thread_id: Thread ID for conversation memory
+        max_attempts: Maximum SQL generation attempts
+    """
+    try:
+        graph = await get_graph()
+        config = _build_config(thread_id)
+
+        async for event in graph.astream_events(
+            _build_initial_state(question, max_attempts, thread_id),
+            config=config,
+            version="v2"
+        ):
+            kind = event["event"]
+            node = event.get("metadata", {}).get("langgraph_node")
+
+            if kind == "on_chain_start" and event["name"] in NODE_LABELS and node == event["name"]:
+                yield {"type": "node", "node": node, "label": NODE_LABELS[node]}
+
+            elif kind == "on_chat_model_stream" and node == ANSWER_NODE:
+                content = event["data"]["chunk"].content
+                if isinstance(content, list):
+                    # Some providers stream content blocks instead of plain text
+                    content = "".join(
+                        block.get("text", "") if isinstance(block, dict) else str(block)
+                        for block in content
+                    )
+                if content:
+                    yield {"type": "token", "content": content}
+
+        snapshot = await graph.aget_state(config)
+        result = dict(snapshot.values)
+        _log_timing_report(result)
+        await _after_run(thread_id)
+        yield {"type": "result", "result": result}
+
+    except Exception as e:
+        if SENTRY_AVAILABLE:
+            sentry_sdk.capture_exception(e)
+            sentry_sdk.set_context("agent_query", {
+                "question": question[:200],
+                "thread_id": thread_id,
+                "max_attempts": max_attempts,
+                "streaming": True,
+            })
+        raise
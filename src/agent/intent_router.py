@@ -0,0 +1,315 @@
+"""
+Rule/slot-filling intent router for common questions.
+
+Most traffic is "total / ranking / evolução by port and period". Those questions
+are answered from the parameterized templates in metadata_helper.QUERY_TEMPLATES
+without calling the LLM. A question is only routed when every word is explained
+by a slot or by known filler words; anything else goes to SQL generation.
+"""
+import os
+import re
+from typing import Any, Dict, List, Optional
+
+from .metadata_helper import QUERY_TEMPLATES
+from .question_cache import GENERIC_WORDS, STOPWORDS, normalize_question
+
+
+DATASET = "antaqdados.br_antaq_estatistico_aquaviario"
+
+# Normalized port name -> display name (matched as whole words)
+KNOWN_PORTS = {
+    "santos": "Santos",
+    "paranagua": "Paranaguá",
+    "antonina": "Antonina",
+    "itaguai": "Itaguaí",
+    "rio grande": "Rio Grande",
+    "sao francisco do sul": "São Francisco do Sul",
+    "itajai": "Itajaí",
+    "imbituba": "Imbituba",
+    "suape": "Suape",
+    "itaqui": "Itaqui",
+    "vila do conde": "Vila do Conde",
+    "pecem": "Pecém",
+    "rio de janeiro": "Rio de Janeiro",
+    "vitoria": "Vitória",
+    "salvador": "Salvador",
+    "aratu": "Aratu",
+    "manaus": "Manaus",
+    "santarem": "Santarém",
+    "belem": "Belém",
+    "fortaleza": "Fortaleza",
+    "recife": "Recife",
+    "maceio": "Maceió",
+    "cabedelo": "Cabedelo",
+    "natal": "Natal",
+    "sao sebastiao": "São Sebastião",
+    "angra dos reis": "Angra dos Reis",
+    "niteroi": "Niterói",
+    "porto alegre": "Porto Alegre",
+    "ilheus": "Ilhéus",
+    "santana": "Santana",
+}
+
+# Normalized commodity name -> (display name, SH4 cdmercadoria codes)
+COMMODITIES = {
+    "minerio de ferro": ("minério de ferro", ["2601"]),
+    "farelo de soja": ("farelo de soja", ["2304"]),
+    "soja": ("soja", ["1201"]),
+    "milho": ("milho", ["1005"]),
+    "trigo": ("trigo", ["1001"]),
+    "petroleo": ("petróleo", ["2709"]),
+    "acucar": ("açúcar", ["1701"]),
+    "cafe": ("café", ["0901"]),
+    "celulose": ("celulose", ["4703"]),
+    "carvao": ("carvão", ["2701"]),
+}
+
+# Plural nouns that name the ranking dimension -> (column, display label)
+RANKING_DIMENSIONS = {
+    "portos": ("c.porto_atracacao", "portos"),
+    "mercadorias": ("c.cdmercadoria", "mercadorias"),
+    "produtos": ("c.cdmercadoria", "mercadorias"),
+    "estados": ("c.uf", "estados"),
+    "ufs": ("c.uf", "estados"),
+    "regioes": ("c.regiao_geografica", "regiões"),
+}
+
+RANKING_WORDS = {"ranking", "top", "maiores", "principais", "mais"}
+EVOLUTION_WORDS = {"evolucao", "mensal", "mensalmente", "tendencia", "serie", "historico", "temporal"}
+
+# Extra words that carry no filter (on top of question_cache.GENERIC_WORDS)
+FILLER_WORDS = {
+    "todos", "todas", "ate", "lista", "liste", "listar", "cada", "houve", "teve",
+    "tiveram", "registrado", "registrada", "registrados", "registradas", "movimentaram",
+    "quantidade",
+}
+
+MONTH_NAMES = [
+    "janeiro", "fevereiro", "março", "abril", "maio", "junho", "julho",
+    "agosto", "setembro", "outubro", "novembro", "dezembro",
+]
+
+SENTIDO_VALUES = {"exportacao": "Embarcados", "importacao": "Desembarcados"}
+
+
+def _sentido_of(token: str) -> Optional[str]:
+    if token.startswith(("desembarc", "import")):
+        return "importacao"
+    if token.startswith(("embarc", "export")):
+        return "exportacao"
+    return None
+
+
+def extract_slots(question: str) -> Dict[str, Any]:
+    """
+    Extract years, month, sentido, ports and commodity from a question.
+
+    Args:
+        question: Question in natural language
+
+    Returns:
+        Dictionary with the slots, the detected intent words and the list of
+        unexplained tokens (used for confidence)
+    """
+    text = f" {normalize_question(question)} "
+    slots: Dict[str, Any] = {
+        "years": [], "month": None, "sentido": None, "ports": [], "commodity": None,
+        "ranking_dimension": None, "limit": None, "intent_words": set(), "unknown": [],
+    }
+
+    # Multi-word entities first (longest match wins)
+    for name in sorted(COMMODITIES, key=len, reverse=True):
+        if re.search(rf"\b{name}\b", text):
+            slots["commodity"] = slots["commodity"] or name
+            text = re.sub(rf"\b{name}\b", " ", text)
+    for name in sorted(KNOWN_PORTS, key=len, reverse=True):
+        if re.search(rf"\b{name}\b", text):
+            slots["ports"].append(name)
+            text = re.sub(rf"\b{name}\b", " ", text)
+
+    sentidos = set()
+    for token in text.split():
+        if token.startswith("mes_"):
+            slots["month"] = int(token[4:])
+        elif token.isdigit() and 2010 <= int(token) <= 2035:
+            slots["years"].append(int(token))
+        elif token.isdigit() and int(token) <= 100:
+            slots["limit"] = int(token)
+        elif _sentido_of(token):
+            sentidos.add(_sentido_of(token))
+        elif token in RANKING_DIMENSIONS:
+            slots["ranking_dimension"] = token
+        elif token in RANKING_WORDS:
+            slots["intent_words"].add("ranking")
+        elif token in EVOLUTION_WORDS:
+            slots["intent_words"].add("evolucao")
+        elif token in STOPWORDS or token in GENERIC_WORDS or token in FILLER_WORDS:
+            continue
+        else:
+            slots["unknown"].append(token)
+
+    # "importação e exportação" is a comparison, not a filter
+    if len(sentidos) == 1:
+        slots["sentido"] = sentidos.pop()
+    elif sentidos:
+        slots["unknown"].append("sentido")
+
+    slots["years"] = sorted(set(slots["years"]))
+    return slots
+
+
+def route_question(question: str) -> Optional[Dict[str, Any]]:
+    """
+    Classify a question into a template intent.
+
+    Args:
+        question: Question in natural language
+
+    Returns:
+        Dictionary with name ("total", "ranking" or "evolucao"), slots and
+        confidence, or None when no template applies
+    """
+    slots = extract_slots(question)
+    years = slots["years"]
+
+    if "evolucao" in slots["intent_words"]:
+        name = "evolucao"
+        valid = 1 <= len(years) <= 2 and slots["month"] is None and slots["ranking_dimension"] is None
+    elif "ranking" in slots["intent_words"] or slots["ranking_dimension"]:
+        name = "ranking"
+        valid = len(years) == 1 and slots["ranking_dimension"] is not None
+    else:
+        name = "total"
+        valid = len(years) == 1 and slots["limit"] is None
+
+    if not valid:
+        return None
+
+    word_count = len(question.split()) or 1
+    confidence = max(0.0, 1.0 - len(slots["unknown"]) / word_count)
+    slots.pop("intent_words")
+    return {"name": name, "slots": slots, "confidence": round(confidence, 3)}
+
+
+def get_min_confidence() -> float:
+    """Minimum confidence to answer from a template (INTENT_ROUTER_MIN_CONFIDENCE)."""
+    return float(os.getenv("INTENT_ROUTER_MIN_CONFIDENCE", "1.0"))
+
+
+def _additional_filters(slots: Dict[str, Any]) -> str:
+    filters = []
+    if slots["month"]:
+        filters.append(f"AND c.mes = {slots['month']}")
+    if slots["sentido"]:
+        filters.append(f"AND c.sentido = '{SENTIDO_VALUES[slots['sentido']]}'")
+    if slots["ports"]:
+        likes = [f"LOWER(c.porto_atracacao) LIKE '%{port}%'" for port in slots["ports"]]
+        filters.append("AND " + (likes[0] if len(likes) == 1 else f"({' OR '.join(likes)})"))
+    if slots["commodity"]:
+        codes = ", ".join(f"'{code}'" for code in COMMODITIES[slots["commodity"]][1])
+        filters.append(f"AND c.cdmercadoria IN ({codes})")
+    return "\n  ".join(filters)
+
+
+def _fill(template: str, params: Dict[str, Any]) -> str:
+    sql = QUERY_TEMPLATES[template]["sql_pattern"].format(**params)
+    # Drop the blank line left when there are no additional filters
+    return "\n".join(line for line in sql.splitlines() if line.strip())
+
+
+def build_template_sql(intent: Dict[str, Any], official_filters: str) -> str:
+    """
+    Fill the SQL template for a routed intent.
+
+    Args:
+        intent: Output of route_question
+        official_filters: Official ANTAQ methodology filters for alias "c"
+
+    Returns:
+        SQL query
+    """
+    slots = intent["slots"]
+    params = {
+        "dataset": DATASET,
+        "official_filters": official_filters,
+        "additional_filters": _additional_filters(slots),
+    }
+
+    if intent["name"] == "evolucao":
+        years = slots["years"]
+        params["ano_inicio"] = years[0]
+        params["additional_filters"] = "\n  ".join(
+            f for f in [f"AND c.ano <= {years[-1]}", params["additional_filters"]] if f
+        )
+        return _fill("temporal_analysis", params)
+
+    params["ano"] = slots["years"][0]
+    if intent["name"] == "ranking":
+        params["ranking_column"] = RANKING_DIMENSIONS[slots["ranking_dimension"]][0]
+        params["limit"] = slots["limit"] or 10
+        return _fill("ranking", params)
+
+    params["group_by_columns"] = "c.ano"
+    return _fill("weight_analysis", params)
+
+
+def _format_tons(value: Any) -> str:
+    return f"{float(value or 0):,.0f}".replace(",", ".") + " toneladas"
+
+
+def _describe(slots: Dict[str, Any]) -> str:
+    parts = []
+    if slots["commodity"]:
+        parts.append(f"de {COMMODITIES[slots['commodity']][0]}")
+    if slots["ports"]:
+        names = " e ".join(KNOWN_PORTS[p] for p in slots["ports"])
+        parts.append(f"no porto de {names}" if len(slots["ports"]) == 1 else f"nos portos de {names}")
+    return " ".join(parts)
+
+
+def _period(slots: Dict[str, Any]) -> str:
+    years = slots["years"]
+    if slots["month"]:
+        return f"{MONTH_NAMES[slots['month'] - 1]} de {years[0]}"
+    if len(years) == 2:
+        return f"{years[0]} a {years[1]}"
+    return str(years[0])
+
+
+def format_template_answer(intent: Dict[str, Any], results: List[Dict[str, Any]]) -> str:
+    """
+    Deterministic answer for template results (no LLM call).
+
+    Args:
+        intent: Output of route_question
+        results: Query results
+
+    Returns:
+        Answer in Portuguese
+    """
+    slots = intent["slots"]
+    verb = {"exportacao": "exportadas", "importacao": "importadas"}.get(slots["sentido"], "movimentadas")
+    cargo = {"exportacao": "exportada", "importacao": "importada"}.get(slots["sentido"], "movimentada")
+    scope = " ".join(p for p in [_describe(slots), f"em {_period(slots)}"] if p)
+
+    if not results:
+        return f"Não foram encontradas cargas {verb} {scope}."
+
+    if intent["name"] == "total":
+        total = sum(row.get("peso_total_toneladas") or 0 for row in results)
+        return f"Foram {verb} **{_format_tons(total)}** {scope} (metodologia oficial ANTAQ)."
+
+    if intent["name"] == "ranking":
+        column, label = RANKING_DIMENSIONS[slots["ranking_dimension"]]
+        column = column.split(".")[-1]
+        lines = [f"Principais {label} por carga {cargo} {scope}:", ""]
+        for position, row in enumerate(results, start=1):
+            name = row.get("mercadoria_nome") or row.get(column) or "-"
+            lines.append(f"{position}. {name}: {_format_tons(row.get('total_toneladas'))}")
+        return "\n".join(lines)
+
+    lines = [f"Evolução mensal da carga {cargo} {scope}:", ""]
+    for row in results:
+        month = MONTH_NAMES[int(row["mes"]) - 1].capitalize()
+        lines.append(f"- {month}/{row['ano']}: {_format_tons(row.get('peso_total_toneladas'))}")
+    return "\n".join(lines)
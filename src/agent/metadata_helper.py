@@ -2,11 +2,69 @@
 Metadata Helper for ANTAQ AI Agent
 Integrates with BigQuery metadata dictionary for enhanced SQL generation
 """
+import hashlib
 import os
 from typing import Dict, List, Optional, Any
 from datetime import datetime, timedelta, date
 import pandas as pd
 
+from ..bigquery.backend import QueryBackend, get_query_backend
+from .schema_selector import SchemaSelector, estimate_tokens
+
+
+# Parameterized SQL templates (also filled directly by the intent router)
+QUERY_TEMPLATES: Dict[str, Dict[str, str]] = {
+    'weight_analysis': {
+        'template': 'weight_analysis',
+        'description': 'Análise de peso/volume de cargas',
+        'sql_pattern': '''
+SELECT
+    {group_by_columns},
+    SUM(c.vlpesocargabruta_oficial) AS peso_total_toneladas,
+    COUNT(*) AS total_operacoes
+FROM `{dataset}.v_carga_metodologia_oficial` c
+WHERE {official_filters}
+  AND c.ano = {ano}
+  {additional_filters}
+GROUP BY {group_by_columns}
+ORDER BY peso_total_toneladas DESC
+LIMIT 100
+        '''.strip()
+    },
+    'temporal_analysis': {
+        'template': 'temporal_analysis',
+        'description': 'Análise temporal/evolução',
+        'sql_pattern': '''
+SELECT
+    c.ano,
+    c.mes,
+    SUM(c.vlpesocargabruta_oficial) AS peso_total_toneladas
+FROM `{dataset}.v_carga_metodologia_oficial` c
+WHERE {official_filters}
+  AND c.ano >= {ano_inicio}
+  {additional_filters}
+GROUP BY c.ano, c.mes
+ORDER BY c.ano, c.mes
+        '''.strip()
+    },
+    'ranking': {
+        'template': 'ranking',
+        'description': 'Ranking por métrica',
+        'sql_pattern': '''
+SELECT
+    {ranking_column},
+    SUM(c.vlpesocargabruta_oficial) AS total_toneladas
+FROM `{dataset}.v_carga_metodologia_oficial` c
+WHERE {official_filters}
+  AND c.ano = {ano}
+  {additional_filters}
+GROUP BY {ranking_column}
+ORDER BY total_toneladas DESC
+LIMIT {limit}
+        '''.strip()
+    },
+}
+
 
 class MetadataHelper:
     """
@@ -19,14 +77,20 @@ class MetadataHelper:
         Initialize the metadata helper
 
         Args:
-            client: BigQuery client (optional, will create if not provided)
+            client: QueryBackend or google.cloud.bigquery.Client (optional,
+                defaults to the backend selected by QUERY_BACKEND)
         """
+        # Local backends (DuckDB) answer metadata queries from the replica
+        self.backend = None
         if client is None:
-            from google.cloud import bigquery
-            project_id = os.getenv("GOOGLE_CLOUD_PROJECT", "saasimpacto")
-            self.client = bigquery.Client(project=project_id)
-        else:
-            self.client = client
+            client = get_query_backend()
+        if isinstance(client, QueryBackend):
+            if client.dialect == "bigquery":
+                client = client.client
+            else:
+                self.backend = client
+
+        self.client = None if self.backend is not None else client
 
         self.dataset_id = "antaqdados.br_antaq_estatistico_aquaviario"
         # Use the same dataset for metadata when available (dicionario_dados exists there)
@@ -43,6 +107,8 @@ class MetadataHelper:
 
         # Cached metadata
         self._metadata_df: Optional[pd.DataFrame] = None
+        self._records: Optional[List[Dict[str, Any]]] = None
+        self._selector: Optional[SchemaSelector] = None
 
     def has_column(self, table: str, column: str) -> bool:
         """
@@ -67,6 +133,15 @@ class MetadataHelper:
             LIMIT 1
         """
 
+        if self.backend is not None:
+            try:
+                columns = self.backend.get_schema(table)["columns"]
+                exists = any(c["name"].lower() == column.lower() for c in columns)
+            except Exception:
+                exists = False
+            self._column_cache[key] = exists
+            return exists
+
         try:
             job_config = {
                 "query_parameters": [
@@ -158,7 +233,10 @@ class MetadataHelper:
         """
 
         try:
-            df = self.client.query(query).to_dataframe()
+            if self.backend is not None:
+                df = self.backend.query_dataframe(query)
+            else:
+                df = self.client.query(query).to_dataframe()
             self._metadata_df = df
             return df
         except Exception as e:
@@ -240,62 +318,124 @@ class MetadataHelper:
             'tags': row['tags']
         }
 
-    def get_schema_for_prompt(self) -> str:
+    @staticmethod
+    def _tags_list(tags_val) -> List[str]:
+        """Normalize the tags column (list, numpy array or NULL) to a list of strings."""
+        if tags_val is None:
+            return []
+        # Handle tags: check if None or empty, avoiding array ambiguity
+        try:
+            if pd.notna(tags_val) and hasattr(tags_val, '__len__') and len(tags_val) > 0:
+                return list(tags_val) if isinstance(tags_val, (list, tuple)) else tags_val.tolist()
+        except (ValueError, TypeError):
+            # Fallback for array-like values that cause issues with pd.notna
+            if hasattr(tags_val, '__len__') and len(tags_val) > 0:
+                try:
+                    return list(tags_val) if isinstance(tags_val, (list, tuple)) else tags_val.tolist()
+                except Exception:
+                    pass
+        return []
+
+    def _column_records(self) -> List[Dict[str, Any]]:
+        """
+        One record per dicionario_dados column, with its rendered prompt line
+
+        Returns:
+            List of dictionaries (empty when the metadata table is unavailable)
+        """
+        if self._records is not None:
+            return self._records
+
+        df = self.load_metadata()
+        records = []
+        for _, row in df.iterrows():
+            tags_list = self._tags_list(row['tags'])
+            tags_str = f" [{', '.join(tags_list)}]" if tags_list else ""
+
+            # Handle valores_possiveis
+            valores_val = row['valores_possiveis']
+            valores_str = ""
+            try:
+                if valores_val is not None and pd.notna(valores_val) and valores_val:
+                    valores_str = f" - Valores: {valores_val}"
+            except (ValueError, TypeError):
+                if valores_val:
+                    valores_str = f" - Valores: {valores_val}"
+
+            records.append({
+                'tabela': row['tabela'],
+                'coluna': row['coluna'],
+                'categoria': row['categoria'],
+                'descricao': row['descricao'],
+                'tags': tags_list,
+                'line': f"- {row['coluna']}: {row['descricao']}{tags_str}{valores_str}",
+            })
+
+        self._records = records
+        return records
+
+    def _get_selector(self) -> Optional[SchemaSelector]:
+        """Column relevance index, built once per loaded dictionary"""
+        if self._selector is None:
+            records = self._column_records()
+            if records:
+                self._selector = SchemaSelector(records)
+        return self._selector
+
+    def get_schema_for_prompt(self, question: Optional[str] = None,
+                              token_budget: Optional[int] = None) -> str:
         """
         Generate schema description for use in LLM prompts
 
+        Args:
+            question: Optional question; when given, only relevant columns plus
+                the core set are included (see select_schema)
+            token_budget: Optional token budget for the pruned schema
+
         Returns:
             Formatted string with schema information
         """
-        df = self.load_metadata()
+        if question is not None:
+            return self.select_schema(question, token_budget)["schema"]
 
-        if df.empty:
+        selector = self._get_selector()
+        if selector is None:
             # Fallback to hardcoded schema
             return self._get_fallback_schema()
+        return selector.full_schema
 
-        # Group by table
-        result = []
-        for table in sorted(df['tabela'].unique()):
-            table_df = df[df['tabela'] == table]
-            result.append(f"\n## Tabela: {table}\n")
-
-            for category in sorted(table_df['categoria'].unique()):
-                cat_df = table_df[table_df['categoria'] == category]
-                result.append(f"\n### {category}\n")
-
-                for _, row in cat_df.iterrows():
-                    # Handle tags: check if None or empty, avoiding array ambiguity
-                    tags_val = row['tags']
-                    tags_str = ""
-                    if tags_val is not None:
-                        # Use scalar check for single values
-                        try:
-                            if pd.notna(tags_val):
-                                if hasattr(tags_val, '__len__') and len(tags_val) > 0:
-                                    tags_list = list(tags_val) if isinstance(tags_val, (list, tuple)) else tags_val.tolist()
-                                    tags_str = f" [{', '.join(tags_list)}]"
-                        except (ValueError, TypeError):
-                            # Fallback for array-like values that cause issues with pd.notna
-                            if hasattr(tags_val, '__len__') and len(tags_val) > 0:
-                                try:
-                                    tags_list = list(tags_val) if isinstance(tags_val, (list, tuple)) else tags_val.tolist()
-                                    tags_str = f" [{', '.join(tags_list)}]"
-                                except:
-                                    pass
-
-                    # Handle valores_possiveis
-                    valores_val = row['valores_possiveis']
-                    valores_str = ""
-                    try:
-                        if valores_val is not None and pd.notna(valores_val) and valores_val:
-                            valores_str = f" - Valores: {valores_val}"
-                    except (ValueError, TypeError):
-                        if valores_val:
-                            valores_str = f" - Valores: {valores_val}"
-
-                    result.append(f"- {row['coluna']}: {row['descricao']}{tags_str}{valores_str}")
-
-        return "\n".join(result)
+    def select_schema(self, question: str, token_budget: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Select the schema columns relevant to a question
+
+        Args:
+            question: User question
+            token_budget: Optional token budget for the schema section
+
+        Returns:
+            Dictionary with schema, columns, full_tokens, prompt_tokens and saved_tokens
+        """
+        selector = self._get_selector()
+        if selector is None:
+            schema = self._get_fallback_schema()
+            tokens = estimate_tokens(schema)
+            return {
+                "schema": schema,
+                "columns": [],
+                "full_tokens": tokens,
+                "prompt_tokens": tokens,
+                "saved_tokens": 0,
+            }
+        return selector.select(question, token_budget)
+
+    def get_schema_version(self) -> str:
+        """
+        Short hash of the full schema, stable across questions
+
+        Returns:
+            12-character hex digest
+        """
+        return hashlib.sha1(self.get_schema_for_prompt().encode("utf-8")).hexdigest()[:12]
 
     def _get_fallback_schema(self) -> str:
         """
@@ -349,61 +489,15 @@ class MetadataHelper:
 
         # Weight/volume analysis
         if any(word in intent_lower for word in ['peso', 'tonelada', 'carga', 'volume', 'total']):
-            return {
-                'template': 'weight_analysis',
-                'description': 'Análise de peso/volume de cargas',
-                'sql_pattern': '''
-SELECT
-    {group_by_columns},
-    SUM(c.vlpesocargabruta_oficial) AS peso_total_toneladas,
-    COUNT(*) AS total_operacoes
-FROM `{dataset}.v_carga_metodologia_oficial` c
-WHERE {official_filters}
-  AND c.ano = {ano}
-  {additional_filters}
-GROUP BY {group_by_columns}
-ORDER BY peso_total_toneladas DESC
-LIMIT 100
-                '''.strip()
-            }
+            return dict(QUERY_TEMPLATES['weight_analysis'])
 
         # Temporal analysis
         if any(word in intent_lower for word in ['evolução', 'tendência', 'mensal', 'série temporal', 'histórico']):
-            return {
-                'template': 'temporal_analysis',
-                'description': 'Análise temporal/evolução',
-                'sql_pattern': '''
-SELECT
-    c.ano,
-    c.mes,
-    SUM(c.vlpesocargabruta_oficial) AS peso_total_toneladas
-FROM `{dataset}.v_carga_metodologia_oficial` c
-WHERE {official_filters}
-  AND c.ano >= {ano_inicio}
-  {additional_filters}
-GROUP BY c.ano, c.mes
-ORDER BY c.ano, c.mes
-                '''.strip()
-            }
+            return dict(QUERY_TEMPLATES['temporal_analysis'])
 
         # Ranking
         if any(word in intent_lower for word in ['ranking', 'top', 'maiores', 'principais']):
-            return {
-                'template': 'ranking',
-                'description': 'Ranking por métrica',
-                'sql_pattern': '''
-SELECT
-    {ranking_column},
-    SUM(c.vlpesocargabruta_oficial) AS total_toneladas
-FROM `{dataset}.v_carga_metodologia_oficial` c
-WHERE {official_filters}
-  AND c.ano = {ano}
-  {additional_filters}
-GROUP BY {ranking_column}
-ORDER BY total_toneladas DESC
-LIMIT {limit}
-                '''.strip()
-            }
+            return dict(QUERY_TEMPLATES['ranking'])
 
         return None
 
@@ -417,7 +511,7 @@ def get_metadata_helper(client=None) -> MetadataHelper:
     Get cached MetadataHelper instance
 
     Args:
-        client: BigQuery client (optional)
+        client: QueryBackend or BigQuery client (optional)
 
     Returns:
         MetadataHelper instance
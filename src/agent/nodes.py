@@ -1,33 +1,67 @@
 """
 Node implementations for the LangGraph workflow.
 """
+import asyncio
 import json
+import logging
 import re
 import os
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple
 
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 
-from ..bigquery.client import get_bigquery_client
+from ..bigquery.backend import get_query_backend
 from ..rag.retriever import ExampleRetriever
 from ..utils.validation import get_sql_validator
-from ..utils.formatting import format_results_for_llm
+from ..utils.formatting import format_results_for_llm, format_bytes, enrich_results_with_mercadoria_names, result_rows
+from ..utils.result import QueryResult
 from .state import AgentState
 from .prompts import get_system_prompt, get_sql_generation_prompt, get_final_answer_prompt
 from .metadata_helper import get_metadata_helper
+from .question_cache import get_question_cache
+from .aggregate_router import route_to_aggregate
+from .intent_router import route_question, build_template_sql, format_template_answer, get_min_confidence
+from .schema_selector import estimate_tokens, get_schema_token_budget, schema_pruning_enabled
+from .artifacts import get_result_store, resolve_query_results
 
 
 # Initialize dependencies (lazy to avoid credential issues at import time)
-bq_client = None
+query_backend = None
 sql_validator = get_sql_validator()
 metadata_helper = None  # Lazy initialization
 
 
-def _get_bq_client():
-    global bq_client
-    if bq_client is None:
-        bq_client = get_bigquery_client()
-    return bq_client
+def _get_backend():
+    """Query backend selected by QUERY_BACKEND (BigQuery or local DuckDB)."""
+    global query_backend
+    if query_backend is None:
+        query_backend = get_query_backend()
+    return query_backend
+
+
+def _get_metadata_helper():
+    global metadata_helper
+    if metadata_helper is None:
+        metadata_helper = get_metadata_helper(_get_backend())
+    return metadata_helper
+
+
+def _sql_to_execute(state: AgentState) -> str:
+    """Validated SQL, or its cargo cube rewrite when the aggregate router chose one."""
+    rewrite = state.get("aggregate_rewrite")
+    return rewrite["sql"] if rewrite else state["validated_sql"]
+
+
+def _recent_questions(state: AgentState, turns: int = 3) -> str:
+    """Text of the last human turns, so follow-ups keep the columns of earlier questions."""
+    human_messages = [m.content for m in state.get("messages", []) if m.type == "human"]
+    return "\n".join(human_messages[-turns:]) or (state.get("question") or "")
+
+
+def _is_first_turn(state: AgentState) -> bool:
+    """True when the current question is the first human message of the thread."""
+    human_messages = [m for m in state.get("messages", []) if m.type == "human"]
+    return len(human_messages) <= 1
 
 
 def get_llm():
@@ -38,28 +72,78 @@ def get_llm():
 
 async def setup_schema_node(state: AgentState) -> Dict[str, Any]:
     """
-    Initialize: Retrieve and cache BigQuery schema.
-    Uses MetadataHelper to get schema from dicionario_dados table or fallback.
-    Only runs once per conversation.
+    Initialize: Retrieve the BigQuery schema for the current question.
+    Uses MetadataHelper to get schema from dicionario_dados table or fallback,
+    pruned to the columns relevant to the recent questions of the thread.
     """
-    global metadata_helper
+    # Initialize metadata helper with BigQuery client
+    metadata_helper = _get_metadata_helper()
+
+    # Runs in a worker thread so the parallel preparation branches are not
+    # blocked by the BigQuery round trip (dictionary loading is cached).
+    if schema_pruning_enabled():
+        selection = await asyncio.to_thread(
+            metadata_helper.select_schema,
+            _recent_questions(state),
+            get_schema_token_budget()
+        )
+    else:
+        schema = await asyncio.to_thread(metadata_helper.get_schema_for_prompt)
+        tokens = estimate_tokens(schema)
+        selection = {
+            "schema": schema,
+            "columns": [],
+            "full_tokens": tokens,
+            "prompt_tokens": tokens,
+            "saved_tokens": 0,
+        }
 
-    if state.get("dataset_schema") is None:
-        # Initialize metadata helper with BigQuery client
-        if metadata_helper is None:
-            metadata_helper = get_metadata_helper(_get_bq_client().client)
+    report = {key: value for key, value in selection.items() if key != "schema"}
+    logging.info(
+        "Schema prompt: %d tokens (full %d, saved %d)",
+        report["prompt_tokens"], report["full_tokens"], report["saved_tokens"]
+    )
 
-        # Get schema from metadata helper (tries dicionario_dados first, then fallback)
-        schema = metadata_helper.get_schema_for_prompt()
+    return {
+        "dataset_schema": selection["schema"],
+        "schema_version": metadata_helper.get_schema_version(),
+        "schema_selection": report,
+        "messages": [AIMessage(
+            content=f"Schema carregado ({report['prompt_tokens']} tokens, "
+                    f"{report['saved_tokens']} economizados)."
+        )]
+    }
 
-        return {
-            "dataset_schema": schema,
-            "messages": [AIMessage(content="Schema BigQuery carregado (usando MetadataHelper).")]
-        }
 
-    return {
-        "messages": [AIMessage(content="Schema já em memória.")]
+async def check_question_cache_node(state: AgentState) -> Dict[str, Any]:
+    """
+    Look up previously validated SQL for an equivalent question.
+    On a hit the SQL (and, if enabled, the final answer) is reused and
+    SQL generation is skipped. Only first turns are looked up, as only
+    first turns are stored: follow-ups depend on earlier context.
+    """
+    cache = get_question_cache()
+    if cache is None or not _is_first_turn(state):
+        return {"question_cache_hit": False, "sql_source": "llm"}
+
+    question = state.get("question") or state["messages"][-1].content
+    hit = cache.lookup(question, state.get("schema_version"))
+    if hit is None:
+        return {"question_cache_hit": False, "sql_source": "llm"}
+
+    update = {
+        "generated_sql": hit["sql"],
+        "validated_sql": hit["sql"],
+        "aggregate_rewrite": route_to_aggregate(hit["sql"], _get_backend()),
+        "sql_error": None,
+        "question_cache_hit": True,
+        "sql_source": "cache",
+        "messages": [AIMessage(content=f"SQL recuperado do cache ({hit['match']}).")]
     }
+    if hit.get("answer"):
+        update["final_answer"] = hit["answer"]
+        update["messages"].append(AIMessage(content=hit["answer"]))
+    return update
 
 
 async def retrieve_examples_node(state: AgentState) -> Dict[str, Any]:
@@ -86,6 +170,32 @@ async def retrieve_examples_node(state: AgentState) -> Dict[str, Any]:
     }
 
 
+async def route_intent_node(state: AgentState) -> Dict[str, Any]:
+    """
+    Build SQL from a parameterized template for common questions
+    (total / ranking / evolução by port and period), skipping the LLM.
+    Only self-contained questions with full confidence are routed.
+    """
+    question = state.get("question") or state["messages"][-1].content
+
+    intent = None
+    if os.getenv("INTENT_ROUTER_ENABLED", "true").lower() == "true" and _is_first_turn(state):
+        intent = route_question(question)
+
+    if intent is None or intent["confidence"] < get_min_confidence():
+        return {"intent": intent, "sql_source": "llm"}
+
+    official_filters = await asyncio.to_thread(
+        _get_metadata_helper().get_official_methodology_filters_sql, "c"
+    )
+    return {
+        "intent": intent,
+        "generated_sql": build_template_sql(intent, official_filters),
+        "sql_source": "template",
+        "messages": [AIMessage(content=f"SQL gerado pelo modelo '{intent['name']}'.")]
+    }
+
+
 async def generate_sql_node(state: AgentState) -> Dict[str, Any]:
     """
     Generate SQL query using LLM with schema and examples.
@@ -126,6 +236,7 @@ async def generate_sql_node(state: AgentState) -> Dict[str, Any]:
 
     return {
         "generated_sql": sql_query,
+        "sql_source": "llm",
         "attempt_count": attempt_count,
         "messages": [response]
     }
@@ -162,38 +273,117 @@ async def validate_sql_node(state: AgentState) -> Dict[str, Any]:
             "messages": [AIMessage(content="Maximum retry limit reached.")]
         }
 
+    validated_sql = validation_result.get("sanitized_query", sql_query)
     return {
-        "validated_sql": validation_result.get("sanitized_query", sql_query),
+        "validated_sql": validated_sql,
+        # Read the cargo cube instead of the view when it covers the query
+        "aggregate_rewrite": route_to_aggregate(validated_sql, _get_backend()),
         "sql_error": None
     }
 
 
+def _cost_limits() -> Tuple[int, int]:
+    """Byte thresholds (rewrite, refuse) of the dry-run cost gate."""
+    max_bytes = int(os.getenv("AGENT_MAX_BYTES_PROCESSED", "10000000000"))
+    rewrite_bytes = int(os.getenv("AGENT_REWRITE_BYTES_THRESHOLD", "2000000000"))
+    return min(rewrite_bytes, max_bytes), max_bytes
+
+
+async def estimate_cost_node(state: AgentState) -> Dict[str, Any]:
+    """
+    Dry-run the validated SQL and decide whether it is cheap enough to execute.
+
+    Queries above AGENT_REWRITE_BYTES_THRESHOLD are sent back for a cheaper
+    rewrite while another attempt remains. On the last attempt they run if
+    they are under AGENT_MAX_BYTES_PROCESSED and are refused otherwise,
+    instead of failing late on maximum_bytes_billed.
+    """
+    sql_query = _sql_to_execute(state)
+
+    try:
+        estimate = await _get_backend().adry_run(sql_query)
+    except Exception:
+        # Fail open: execution reports the real error (e.g. invalid SQL)
+        logging.warning("Dry run failed, skipping cost gate", exc_info=True)
+        return {
+            "estimated_bytes": None,
+            "referenced_tables": None,
+            "cost_decision": "execute"
+        }
+
+    estimated_bytes = estimate["total_bytes_processed"]
+    rewrite_bytes, max_bytes = _cost_limits()
+    update = {
+        "estimated_bytes": estimated_bytes,
+        "referenced_tables": estimate["referenced_tables"],
+    }
+
+    if estimated_bytes <= rewrite_bytes:
+        update["cost_decision"] = "execute"
+    elif state.get("attempt_count", 0) + 1 < state.get("max_attempts", 3):
+        # validate_sql_node rejects the generation that reaches max_attempts,
+        # so the last usable attempt is decided here
+        # Long enough to be kept in the history seen by generate_sql_node
+        hint = (
+            f"A consulta anterior processaria {format_bytes(estimated_bytes)} no BigQuery "
+            f"(limite recomendado: {format_bytes(rewrite_bytes)}). Reescreva a SQL de forma "
+            "mais barata: filtre por ano e mes, selecione apenas as colunas necessárias "
+            "e evite SELECT *."
+        )
+        update.update({
+            "cost_decision": "retry",
+            "validated_sql": None,
+            "messages": [AIMessage(content=hint)]
+        })
+    elif estimated_bytes <= max_bytes:
+        update["cost_decision"] = "execute"
+    else:
+        update["cost_decision"] = "refuse"
+
+    return update
+
+
 async def execute_sql_node(state: AgentState) -> Dict[str, Any]:
     """
     Execute validated SQL against BigQuery.
     """
-    sql_query = state["validated_sql"]
+    sql_query = _sql_to_execute(state)
+    update: Dict[str, Any] = {}
 
     try:
-        results = await _get_bq_client().aquery(sql_query)
-        row_count = len(results) if results else 0
-
-        result_message = f"Query executado com sucesso. {row_count} linhas retornadas."
+        # A newer question on the same thread cancels this BigQuery job
+        # Columnar result: no per-row dict conversion; formatters read only the rows they show
+        try:
+            table = await _get_backend().aquery_arrow(sql_query, key=state.get("thread_id"))
+        except Exception:
+            if not state.get("aggregate_rewrite"):
+                raise
+            # Cube rewrite failed (e.g. cube removed): run the validated SQL on the view
+            logging.warning("Cargo cube query failed, falling back to the view", exc_info=True)
+            sql_query = state["validated_sql"]
+            update["aggregate_rewrite"] = None
+            table = await _get_backend().aquery_arrow(sql_query, key=state.get("thread_id"))
+
+        results = QueryResult(table)
+        # Only the handle goes into the (checkpointed) state
+        artifact = get_result_store().put(results)
+
+        result_message = f"Query executado com sucesso. {artifact['row_count']} linhas retornadas."
 
         return {
-            "query_results": results,
-            "row_count": row_count,
+            **update,
+            **artifact,
             "messages": [AIMessage(content=result_message)]
         }
 
     except Exception as e:
         error_message = f"Erro ao executar query: {str(e)}"
-        import logging
         logging.error("SQL com erro no BigQuery: %s", sql_query)
         logging.exception("Erro ao executar query no BigQuery")
         return {
-            "query_results": None,
+            "results_handle": None,
             "row_count": 0,
+            "result_schema": None,
             "sql_error": error_message,
             "messages": [AIMessage(content=error_message)]
         }
@@ -203,6 +393,18 @@ async def generate_final_answer_node(state: AgentState) -> Dict[str, Any]:
     """
     Generate natural language answer from query results.
     """
+    if state.get("cost_decision") == "refuse":
+        _, max_bytes = _cost_limits()
+        refusal = (
+            f"Esta consulta processaria cerca de {format_bytes(state.get('estimated_bytes'))} "
+            f"no BigQuery, acima do limite de {format_bytes(max_bytes)}. "
+            "Refine a pergunta com um período (ano/mês), porto ou mercadoria específicos."
+        )
+        return {
+            "final_answer": refusal,
+            "messages": [AIMessage(content=refusal)]
+        }
+
     if state.get("sql_error"):
         friendly_error = (
             "Ocorreu um erro ao consultar os dados. "
@@ -214,9 +416,19 @@ async def generate_final_answer_node(state: AgentState) -> Dict[str, Any]:
         }
 
     question = state.get("question") or state["messages"][-1].content
-    results = state.get("query_results", [])
+    results = resolve_query_results(state)
     sql_query = state.get("validated_sql", "")
 
+    # Template SQL has a known result shape: answer without the LLM
+    if state.get("sql_source") == "template" and state.get("intent"):
+        if state["intent"]["slots"].get("ranking_dimension") in ("mercadorias", "produtos"):
+            results = enrich_results_with_mercadoria_names(results)
+        answer_content = format_template_answer(state["intent"], result_rows(results))
+        return {
+            "final_answer": answer_content,
+            "messages": [AIMessage(content=answer_content)]
+        }
+
     # Format results for LLM
     results_text = format_results_for_llm(results)
 
@@ -243,6 +455,11 @@ async def generate_final_answer_node(state: AgentState) -> Dict[str, Any]:
         else:
             answer_content = "Não foi possível processar sua solicitação. Tente reformular sua pergunta."
 
+    # Only self-contained questions are cached: follow-ups depend on thread history
+    cache = get_question_cache()
+    if cache and state.get("sql_source") == "llm" and sql_query and _is_first_turn(state):
+        cache.store(question, state.get("schema_version"), sql_query, answer_content)
+
     return {
         "final_answer": answer_content,
         "messages": [response]
@@ -251,6 +468,15 @@ async def generate_final_answer_node(state: AgentState) -> Dict[str, Any]:
 
 # Conditional edge functions
 
+def route_after_question_cache(state: AgentState) -> str:
+    """Decide next step after the question cache lookup."""
+    if not state.get("question_cache_hit"):
+        return "miss"
+    if state.get("final_answer"):
+        return "answer"
+    return "execute"
+
+
 def should_continue_to_execute(state: AgentState) -> str:
     """Decide next step after SQL validation."""
     if state.get("sql_error"):
@@ -265,6 +491,16 @@ def should_continue_to_execute(state: AgentState) -> str:
     return "end"
 
 
+def route_after_intent(state: AgentState) -> str:
+    """Decide whether the SQL comes from a template or from the LLM."""
+    return "template" if state.get("sql_source") == "template" else "llm"
+
+
+def route_after_cost_estimate(state: AgentState) -> str:
+    """Decide next step after the dry-run cost estimate."""
+    return state.get("cost_decision") or "execute"
+
+
 def extract_sql_from_response(response: str) -> str:
     """Extract SQL query from LLM response."""
     # Look for code blocks
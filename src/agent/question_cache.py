@@ -0,0 +1,310 @@
+"""
+Semantic question -> SQL cache placed in front of SQL generation.
+
+Questions are normalized (accents, month names, port aliases) and keyed together
+with the schema version. Near-duplicates are matched with a small local embedding
+(hashed character n-grams), guarded by an entity signature so that questions about
+different years, months, ports or commodities never share an entry.
+"""
+import math
+import os
+import re
+import time
+import unicodedata
+import zlib
+from typing import Dict, List, Optional, Any, Tuple
+
+from ..utils.cache import LRUCache
+
+
+# Month names (accents already stripped) -> month number
+MONTHS = {
+    "janeiro": 1, "jan": 1,
+    "fevereiro": 2, "fev": 2,
+    "marco": 3, "mar": 3,
+    "abril": 4, "abr": 4,
+    "maio": 5, "mai": 5,
+    "junho": 6, "jun": 6,
+    "julho": 7, "jul": 7,
+    "agosto": 8, "ago": 8,
+    "setembro": 9, "set": 9,
+    "outubro": 10, "out": 10,
+    "novembro": 11, "nov": 11,
+    "dezembro": 12, "dez": 12,
+}
+
+# Port aliases (normalized text) -> canonical port name used in LIKE filters
+PORT_ALIASES = {
+    "portos do parana": "paranagua antonina",
+    "porto de sepetiba": "itaguai",
+    "sepetiba": "itaguai",
+    "porto do rio": "rio de janeiro",
+    "sao francisco": "sao francisco do sul",
+}
+
+
+def _alias_pattern(alias: str) -> str:
+    # Whole words only, and not when the text already has the canonical name
+    # ("sao francisco do sul" must not become "sao francisco do sul do sul")
+    pattern = rf"\b{re.escape(alias)}\b"
+    canonical = PORT_ALIASES[alias]
+    if canonical.startswith(alias + " "):
+        pattern += rf"(?!{re.escape(canonical[len(alias):])}\b)"
+    return pattern
+
+
+# Longest aliases first, replaced in a single pass
+_PORT_ALIAS_RE = re.compile("|".join(
+    f"(?:{_alias_pattern(alias)})" for alias in sorted(PORT_ALIASES, key=len, reverse=True)
+))
+
+# Words that describe the question shape rather than the entities it filters on.
+# Any other word is treated as an entity and must match exactly for a near-duplicate.
+GENERIC_WORDS = {
+    "qual", "quais", "quanto", "quanta", "quantos", "quantas", "como", "foi", "foram",
+    "sao", "era", "eram", "esta", "estao", "total", "totais", "carga", "cargas",
+    "movimentacao", "movimentada", "movimentado", "movimentadas", "movimentados",
+    "movimentou", "movimentaram", "tonelada", "toneladas", "volume", "peso", "bruto",
+    "valor", "pelo", "pela", "pelos", "pelas", "porto", "portos", "terminal",
+    "terminais", "para", "mes", "ano", "durante", "periodo", "geral", "brasil",
+    "dados", "sobre", "quero", "saber", "mostre", "mostrar", "informe", "me", "diga",
+}
+
+# Direction synonyms -> canonical sentido token
+SENTIDO_WORDS = {
+    "exportacao": "exportacao", "exportacoes": "exportacao", "exportado": "exportacao",
+    "exportada": "exportacao", "exportados": "exportacao", "exportadas": "exportacao",
+    "exportou": "exportacao", "exportar": "exportacao", "embarcados": "exportacao",
+    "embarcada": "exportacao", "embarcadas": "exportacao", "embarque": "exportacao",
+    "importacao": "importacao", "importacoes": "importacao", "importado": "importacao",
+    "importada": "importacao", "importados": "importacao", "importadas": "importacao",
+    "importou": "importacao", "importar": "importacao", "desembarcados": "importacao",
+    "desembarcada": "importacao", "desembarcadas": "importacao", "desembarque": "importacao",
+}
+
+STOPWORDS = {"o", "a", "os", "as", "de", "do", "da", "dos", "das", "em", "no", "na",
+             "nos", "nas", "e", "por", "com", "um", "uma", "que", "ao", "aos"}
+
+EMBEDDING_DIM = 512
+
+
+def strip_accents(text: str) -> str:
+    """Remove diacritics from text."""
+    return "".join(
+        ch for ch in unicodedata.normalize("NFD", text)
+        if unicodedata.category(ch) != "Mn"
+    )
+
+
+def normalize_question(question: str) -> str:
+    """
+    Normalize a question for cache lookup.
+
+    Lowercases, strips accents and punctuation, converts month names to
+    ``mes_N`` tokens and canonicalizes port aliases and direction synonyms.
+
+    Args:
+        question: Question in natural language
+
+    Returns:
+        Normalized question text
+    """
+    text = strip_accents((question or "").lower())
+    text = re.sub(r"[^\w\s]", " ", text)
+    text = " ".join(text.split())
+
+    text = _PORT_ALIAS_RE.sub(lambda match: PORT_ALIASES[match.group(0)], text)
+
+    tokens = []
+    for token in text.split():
+        if token in MONTHS:
+            tokens.append(f"mes_{MONTHS[token]}")
+        elif token in SENTIDO_WORDS:
+            tokens.append(SENTIDO_WORDS[token])
+        else:
+            tokens.append(token)
+    return " ".join(tokens)
+
+
+def question_signature(normalized: str) -> Tuple[str, ...]:
+    """
+    Entity signature of a normalized question.
+
+    Contains numbers, month tokens, direction and every non-generic word, so two
+    questions only share it when they filter on the same entities.
+
+    Args:
+        normalized: Output of normalize_question
+
+    Returns:
+        Sorted tuple of entity tokens
+    """
+    entities = set()
+    for token in normalized.split():
+        if token in STOPWORDS or token in GENERIC_WORDS:
+            continue
+        entities.add(token)
+    return tuple(sorted(entities))
+
+
+def embed_question(normalized: str, dim: int = EMBEDDING_DIM) -> List[float]:
+    """
+    Local embedding based on hashed character trigrams (L2-normalized).
+
+    Args:
+        normalized: Output of normalize_question
+        dim: Vector dimension
+
+    Returns:
+        Embedding vector
+    """
+    vector = [0.0] * dim
+    for word in normalized.split():
+        if word in STOPWORDS:
+            continue
+        padded = f" {word} "
+        for i in range(len(padded) - 2):
+            bucket = zlib.crc32(padded[i:i + 3].encode("utf-8")) % dim
+            vector[bucket] += 1.0
+    norm = math.sqrt(sum(v * v for v in vector))
+    if norm == 0:
+        return vector
+    return [v / norm for v in vector]
+
+
+def cosine_similarity(a: List[float], b: List[float]) -> float:
+    """Cosine similarity of two L2-normalized vectors."""
+    return sum(x * y for x, y in zip(a, b))
+
+
+class QuestionCache:
+    """
+    Cache of validated SQL (and optionally final answers) per normalized question.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 512,
+        similarity_threshold: float = 0.85,
+        ttl_seconds: Optional[float] = None,
+        cache_answers: bool = False
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            max_size: Maximum number of cached questions
+            similarity_threshold: Minimum cosine similarity for near-duplicate hits
+            ttl_seconds: Optional entry lifetime
+            cache_answers: Whether final answers are cached along with the SQL
+        """
+        self.similarity_threshold = similarity_threshold
+        self.cache_answers = cache_answers
+        self._entries = LRUCache(max_size=max_size, ttl_seconds=ttl_seconds)
+
+    def lookup(self, question: str, schema_version: Optional[str]) -> Optional[Dict[str, Any]]:
+        """
+        Find a cached entry for a question.
+
+        Args:
+            question: Question in natural language
+            schema_version: Version of the schema used to generate the SQL
+
+        Returns:
+            Dictionary with sql, answer, match ("exact" or "similar") and
+            similarity, or None on miss
+        """
+        normalized = normalize_question(question)
+        if not normalized:
+            return None
+
+        entry = self._entries.get((schema_version, normalized))
+        if entry is not None:
+            return self._hit(entry, "exact", 1.0)
+
+        signature = question_signature(normalized)
+        vector = embed_question(normalized)
+        best: Optional[Dict[str, Any]] = None
+        best_score = self.similarity_threshold
+        for (version, _), candidate in self._entries.items():
+            if version != schema_version or candidate["signature"] != signature:
+                continue
+            score = cosine_similarity(vector, candidate["embedding"])
+            if score >= best_score:
+                best, best_score = candidate, score
+
+        if best is None:
+            return None
+        return self._hit(best, "similar", best_score)
+
+    def _hit(self, entry: Dict[str, Any], match: str, similarity: float) -> Dict[str, Any]:
+        return {
+            "sql": entry["sql"],
+            "answer": entry.get("answer") if self.cache_answers else None,
+            "question": entry["question"],
+            "match": match,
+            "similarity": similarity,
+        }
+
+    def store(
+        self,
+        question: str,
+        schema_version: Optional[str],
+        sql: str,
+        answer: Optional[str] = None
+    ) -> None:
+        """
+        Store validated SQL for a question.
+
+        Args:
+            question: Question in natural language
+            schema_version: Version of the schema used to generate the SQL
+            sql: Validated SQL
+            answer: Final answer (kept only when cache_answers is enabled)
+        """
+        normalized = normalize_question(question)
+        if not normalized or not sql:
+            return
+
+        self._entries.set((schema_version, normalized), {
+            "question": question,
+            "sql": sql,
+            "answer": answer if self.cache_answers else None,
+            "signature": question_signature(normalized),
+            "embedding": embed_question(normalized),
+            "stored_at": time.time(),
+        })
+
+    def clear(self) -> None:
+        """Remove all cached questions."""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# Singleton instance
+_question_cache: Optional[QuestionCache] = None
+
+
+def get_question_cache() -> Optional[QuestionCache]:
+    """
+    Get the process-wide question cache configured from environment.
+
+    Returns:
+        QuestionCache instance, or None when QUESTION_CACHE_ENABLED=false
+    """
+    global _question_cache
+
+    if os.getenv("QUESTION_CACHE_ENABLED", "true").lower() != "true":
+        return None
+
+    if _question_cache is None:
+        ttl = os.getenv("QUESTION_CACHE_TTL_SECONDS")
+        _question_cache = QuestionCache(
+            max_size=int(os.getenv("QUESTION_CACHE_MAX_SIZE", "512")),
+            similarity_threshold=float(os.getenv("QUESTION_CACHE_SIMILARITY", "0.85")),
+            ttl_seconds=float(ttl) if ttl else None,
+            cache_answers=os.getenv("QUESTION_CACHE_ANSWERS", "false").lower() == "true",
+        )
+    return _question_cache
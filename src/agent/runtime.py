@@ -0,0 +1,80 @@
+"""
+Persistent event loop for synchronous callers (Streamlit).
+
+asyncio.run() creates a new loop per call, but the async checkpointer (and its
+aiosqlite connection) is bound to the loop it was created on. The runtime keeps
+one loop alive in a background thread so the graph, the checkpointer and the
+BigQuery clients are reused across Streamlit reruns.
+"""
+import asyncio
+import threading
+from typing import Any, AsyncIterator, Awaitable, Iterator, Optional
+
+
+class AgentRuntime:
+    """
+    Background event loop with helpers to run coroutines from sync code.
+    """
+
+    def __init__(self):
+        """Start the loop thread."""
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self.loop.run_forever, name="agent-event-loop", daemon=True
+        )
+        self._thread.start()
+
+    def run(self, coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+        """
+        Run a coroutine on the runtime loop and wait for its result.
+
+        Args:
+            coro: Coroutine to run
+            timeout: Optional timeout in seconds
+
+        Returns:
+            Coroutine result
+        """
+        future = asyncio.run_coroutine_threadsafe(coro, self.loop)
+        try:
+            return future.result(timeout)
+        except BaseException:
+            # Timeout or caller interruption (e.g. Streamlit rerun)
+            future.cancel()
+            raise
+
+    def iterate(self, agen: AsyncIterator[Any]) -> Iterator[Any]:
+        """
+        Consume an async generator from sync code.
+
+        Each item is produced on the runtime loop and yielded in the calling
+        thread, so UI updates stay in the caller's thread.
+
+        Args:
+            agen: Async generator (e.g. stream_query_agente(...))
+
+        Yields:
+            Items of the async generator
+        """
+        try:
+            while True:
+                try:
+                    yield self.run(agen.__anext__())
+                except StopAsyncIteration:
+                    return
+        finally:
+            self.run(agen.aclose())
+
+
+# Singleton instance
+_runtime: Optional[AgentRuntime] = None
+_runtime_lock = threading.Lock()
+
+
+def get_agent_runtime() -> AgentRuntime:
+    """Get or create the shared AgentRuntime."""
+    global _runtime
+    with _runtime_lock:
+        if _runtime is None:
+            _runtime = AgentRuntime()
+        return _runtime
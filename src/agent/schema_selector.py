@@ -0,0 +1,229 @@
+"""
+Question-aware schema pruning for the SQL generation prompt.
+
+Instead of rendering every column of dicionario_dados into the system prompt,
+the selector keeps a fixed core set (period, port, direction, weight and the
+official methodology filters) and adds the columns whose name, tags or description best
+match the question, until a token budget is reached.
+"""
+import math
+import os
+import re
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from .question_cache import STOPWORDS, strip_accents
+
+
+# Main ANTAQ view; its core columns are always part of the prompt
+PRIMARY_TABLE = "v_carga_metodologia_oficial"
+
+# Columns always sent to the LLM (lowercase): period, port, direction, metric and
+# the columns used by the official methodology filters. Ports are usually named
+# without the word "porto" ("Quanto Santos movimentou?"), so they are not left
+# to term matching
+CORE_COLUMNS = {
+    "ano", "mes", "porto_atracacao", "uf", "sentido", "vlpesocargabruta_oficial",
+    "isvalidometodologiaantaq", "tipo_operacao_da_carga", "flagautorizacao",
+    "data_referencia",
+}
+
+# Question words -> column vocabulary they usually refer to
+DOMAIN_SYNONYMS = {
+    "estado": ["uf"],
+    "estados": ["uf"],
+    "regiao": ["regiao", "geografica"],
+    "produto": ["mercadoria", "cdmercadoria"],
+    "produtos": ["mercadoria", "cdmercadoria"],
+    "commodity": ["mercadoria", "cdmercadoria"],
+    "commodities": ["mercadoria", "cdmercadoria"],
+    "pais": ["destino", "origem", "pais"],
+    "paises": ["destino", "origem", "pais"],
+    "cabotagem": ["navegacao"],
+    "longo": ["navegacao"],
+    "curso": ["navegacao"],
+    "conteiner": ["conteinerizada", "teu"],
+    "conteineres": ["conteinerizada", "teu"],
+    "navio": ["embarcacao"],
+    "navios": ["embarcacao"],
+    "granel": ["natureza"],
+}
+
+# Weight of a match in each field of a column
+FIELD_WEIGHTS = {"name": 3.0, "tags": 2.0, "description": 1.0}
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_CAMEL_RE = re.compile(r"(?<=[a-z0-9])(?=[A-Z])")
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about 4 characters per token for Portuguese/SQL text)."""
+    return math.ceil(len(text or "") / 4)
+
+
+def _stem(word: str) -> str:
+    # Prefix stemming is enough to match exportação/exportações/exportado
+    return word[:5] if len(word) > 5 else word
+
+
+def tokenize(text: str) -> Set[str]:
+    """
+    Tokenize free text or identifiers into stemmed terms.
+
+    Args:
+        text: Question, description or column name (snake_case or camelCase)
+
+    Returns:
+        Set of stemmed tokens without stopwords
+    """
+    text = _CAMEL_RE.sub(" ", str(text or "")).replace("_", " ")
+    words = _WORD_RE.findall(strip_accents(text).lower())
+    return {_stem(w) for w in words if w not in STOPWORDS and len(w) > 1}
+
+
+def render_schema(records: Iterable[Dict[str, Any]]) -> str:
+    """
+    Render column records grouped by table and category.
+
+    Args:
+        records: Dictionaries with tabela, categoria and line
+
+    Returns:
+        Schema text in the format used by the system prompt
+    """
+    grouped: Dict[str, Dict[str, List[str]]] = {}
+    for record in records:
+        grouped.setdefault(record["tabela"], {}).setdefault(record["categoria"], []).append(record["line"])
+
+    result = []
+    for table in sorted(grouped):
+        result.append(f"\n## Tabela: {table}\n")
+        for category in sorted(grouped[table]):
+            result.append(f"\n### {category}\n")
+            result.extend(grouped[table][category])
+    return "\n".join(result)
+
+
+class SchemaSelector:
+    """
+    Local relevance index over dicionario_dados column descriptions and tags.
+    """
+
+    def __init__(self, records: List[Dict[str, Any]]):
+        """
+        Build the index.
+
+        Args:
+            records: One dictionary per column with tabela, coluna, categoria,
+                descricao, tags (list of strings) and line (rendered text)
+        """
+        self.records = records
+        self.full_schema = render_schema(records)
+        self.full_tokens = estimate_tokens(self.full_schema)
+
+        self._fields = [
+            {
+                "name": tokenize(r["coluna"]),
+                "tags": tokenize(" ".join(r.get("tags") or [])),
+                "description": tokenize(r.get("descricao") or ""),
+            }
+            for r in records
+        ]
+
+        # Inverse document frequency, so that words present in every
+        # description ("carga", "porto") weigh less than specific ones
+        document_frequency: Dict[str, int] = {}
+        for fields in self._fields:
+            for token in set().union(*fields.values()):
+                document_frequency[token] = document_frequency.get(token, 0) + 1
+        total = max(1, len(records))
+        self._idf = {
+            token: math.log(1 + total / count)
+            for token, count in document_frequency.items()
+        }
+
+    def _question_terms(self, question: str) -> Set[str]:
+        terms = tokenize(question)
+        for word in _WORD_RE.findall(strip_accents(question or "").lower()):
+            for synonym in DOMAIN_SYNONYMS.get(word, []):
+                terms.add(_stem(synonym))
+        return terms
+
+    def score(self, question: str) -> List[float]:
+        """
+        Relevance of every column for a question.
+
+        Args:
+            question: User question
+
+        Returns:
+            One score per record (0 = unrelated)
+        """
+        terms = self._question_terms(question)
+        scores = []
+        for fields in self._fields:
+            score = 0.0
+            for field, weight in FIELD_WEIGHTS.items():
+                for token in terms & fields[field]:
+                    score += weight * self._idf.get(token, 0.0)
+            scores.append(score)
+        return scores
+
+    def select(self, question: str, token_budget: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Select the columns to send to the LLM for a question.
+
+        Core columns are always kept (even above budget). Other columns are
+        added by decreasing relevance while the rendered schema fits the budget.
+
+        Args:
+            question: User question (may include recent conversation turns)
+            token_budget: Maximum prompt tokens for the schema section
+
+        Returns:
+            Dictionary with schema, columns, full_tokens, prompt_tokens and saved_tokens
+        """
+        scores = self.score(question)
+        relevant_tables = {
+            record["tabela"] for record, score in zip(self.records, scores) if score > 0
+        }
+        relevant_tables.add(PRIMARY_TABLE)
+
+        selected = [
+            index for index, record in enumerate(self.records)
+            if record["coluna"].lower() in CORE_COLUMNS and record["tabela"] in relevant_tables
+        ]
+        used_tokens = estimate_tokens(render_schema(self.records[i] for i in selected))
+
+        candidates = sorted(
+            (i for i, score in enumerate(scores) if score > 0 and i not in selected),
+            key=lambda i: -scores[i]
+        )
+        for index in candidates:
+            # Each extra line costs roughly its own length plus a newline
+            cost = estimate_tokens(self.records[index]["line"] + "\n")
+            if token_budget is not None and used_tokens + cost > token_budget:
+                continue
+            selected.append(index)
+            used_tokens += cost
+
+        chosen = [self.records[i] for i in sorted(selected)]
+        schema = render_schema(chosen)
+        prompt_tokens = estimate_tokens(schema)
+        return {
+            "schema": schema,
+            "columns": [f"{r['tabela']}.{r['coluna']}" for r in chosen],
+            "full_tokens": self.full_tokens,
+            "prompt_tokens": prompt_tokens,
+            "saved_tokens": max(0, self.full_tokens - prompt_tokens),
+        }
+
+
+def schema_pruning_enabled() -> bool:
+    """Whether question-aware pruning is enabled (SCHEMA_PRUNING_ENABLED)."""
+    return os.getenv("SCHEMA_PRUNING_ENABLED", "true").lower() == "true"
+
+
+def get_schema_token_budget() -> Optional[int]:
+    """Token budget for the schema section (SCHEMA_PROMPT_TOKEN_BUDGET, empty = none)."""
+    value = os.getenv("SCHEMA_PROMPT_TOKEN_BUDGET", "1500")
+    return int(value) if value else None
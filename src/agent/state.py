@@ -7,6 +7,8 @@ from langchain_core.messages import BaseMessage
 # Use add_messages from langgraph for message accumulation
 from langgraph.graph.message import add_messages
 
+from .timing import merge_node_timings
+
 
 class AgentState(TypedDict):
     """
@@ -19,6 +21,12 @@ class AgentState(TypedDict):
 
     # BigQuery schema (cached)
     dataset_schema: Optional[str]
+    schema_version: Optional[str]
+    # Schema pruning report: columns, full_tokens, prompt_tokens, saved_tokens
+    schema_selection: Optional[Dict[str, Any]]
+
+    # Conversation thread (owner of the BigQuery jobs of this turn)
+    thread_id: Optional[str]
 
     # Current query processing
     question: Optional[str]
@@ -26,9 +34,27 @@ class AgentState(TypedDict):
     validated_sql: Optional[str]
     sql_error: Optional[str]
 
-    # Query execution results
-    query_results: Optional[List[Dict[str, Any]]]
+    # Where the SQL came from ("cache", "template" or "llm")
+    sql_source: Optional[str]
+    question_cache_hit: Optional[bool]
+
+    # Intent router result: name, slots and confidence (see intent_router.py)
+    intent: Optional[Dict[str, Any]]
+
+    # Aggregate router: {"table", "sql"} when validated_sql is executed on the
+    # cargo cube instead of the view (see aggregate_router.py)
+    aggregate_rewrite: Optional[Dict[str, str]]
+
+    # Dry-run cost gate ("execute", "retry" or "refuse")
+    estimated_bytes: Optional[int]
+    referenced_tables: Optional[List[str]]
+    cost_decision: Optional[str]
+
+    # Query execution results: rows live in the result store (see artifacts.py),
+    # the state only carries the handle, row count and column schema
+    results_handle: Optional[str]
     row_count: Optional[int]
+    result_schema: Optional[List[Dict[str, str]]]
 
     # RAG examples
     retrieved_examples: Optional[List[Dict[str, str]]]
@@ -40,6 +66,9 @@ class AgentState(TypedDict):
     attempt_count: int
     max_attempts: int
 
+    # Per-node start/end/duration for the current question (see timing.py)
+    node_timings: Annotated[Optional[Dict[str, Dict[str, float]]], merge_node_timings]
+
 
 class ValidationResult(TypedDict):
     """Result of SQL validation."""
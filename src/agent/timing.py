@@ -0,0 +1,139 @@
+"""
+Per-node timing for the LangGraph workflow.
+
+Every node is wrapped so that its start/end times are merged into
+``AgentState["node_timings"]``. The report compares the serial cost (sum of
+node durations) with the wall-clock time, which shows how much the parallel
+branches shorten the critical path.
+"""
+import functools
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+def merge_node_timings(
+    left: Optional[Dict[str, Dict[str, float]]],
+    right: Optional[Dict[str, Dict[str, float]]]
+) -> Dict[str, Dict[str, float]]:
+    """
+    State reducer for node timings.
+
+    Passing None resets the timings (used at the start of every question).
+    Repeated nodes (e.g. SQL retries) accumulate duration and call count.
+
+    Args:
+        left: Current timings
+        right: Timings reported by a node
+
+    Returns:
+        Merged timings
+    """
+    if right is None:
+        return {}
+
+    merged = dict(left or {})
+    for name, timing in right.items():
+        previous = merged.get(name)
+        if previous is None:
+            merged[name] = dict(timing)
+            continue
+        merged[name] = {
+            "start": min(previous["start"], timing["start"]),
+            "end": max(previous["end"], timing["end"]),
+            "duration_ms": previous["duration_ms"] + timing["duration_ms"],
+            "calls": previous.get("calls", 1) + timing.get("calls", 1),
+        }
+    return merged
+
+
+def timed_node(
+    name: str,
+    node: Callable[[Any], Awaitable[Dict[str, Any]]]
+) -> Callable[[Any], Awaitable[Dict[str, Any]]]:
+    """
+    Wrap a node so that it reports its own timing.
+
+    Args:
+        name: Node name in the graph
+        node: Async node function
+
+    Returns:
+        Wrapped async node function
+    """
+    @functools.wraps(node)
+    async def wrapper(state):
+        start = time.perf_counter()
+        update = await node(state)
+        end = time.perf_counter()
+
+        update = dict(update or {})
+        update["node_timings"] = {
+            name: {
+                "start": start,
+                "end": end,
+                "duration_ms": (end - start) * 1000,
+                "calls": 1,
+            }
+        }
+        return update
+
+    return wrapper
+
+
+def build_timing_report(timings: Optional[Dict[str, Dict[str, float]]]) -> Dict[str, Any]:
+    """
+    Summarize node timings.
+
+    Args:
+        timings: AgentState["node_timings"]
+
+    Returns:
+        Dictionary with per-node rows (ordered by start), serial_ms, wall_ms
+        and parallel_saving_ms
+    """
+    if not timings:
+        return {"nodes": [], "serial_ms": 0.0, "wall_ms": 0.0, "parallel_saving_ms": 0.0}
+
+    origin = min(t["start"] for t in timings.values())
+    finish = max(t["end"] for t in timings.values())
+
+    nodes: List[Dict[str, Any]] = []
+    for name, timing in sorted(timings.items(), key=lambda item: item[1]["start"]):
+        nodes.append({
+            "node": name,
+            "offset_ms": (timing["start"] - origin) * 1000,
+            "duration_ms": timing["duration_ms"],
+            "calls": timing.get("calls", 1),
+        })
+
+    serial_ms = sum(n["duration_ms"] for n in nodes)
+    wall_ms = (finish - origin) * 1000
+    return {
+        "nodes": nodes,
+        "serial_ms": serial_ms,
+        "wall_ms": wall_ms,
+        "parallel_saving_ms": max(0.0, serial_ms - wall_ms),
+    }
+
+
+def format_timing_report(report: Dict[str, Any]) -> str:
+    """
+    Render a timing report as a small text table.
+
+    Args:
+        report: Output of build_timing_report
+
+    Returns:
+        Formatted report
+    """
+    lines = [f"{'node':<24}{'inicio (ms)':>12}{'duracao (ms)':>14}"]
+    for node in report["nodes"]:
+        calls = f" x{node['calls']}" if node["calls"] > 1 else ""
+        lines.append(
+            f"{node['node'] + calls:<24}{node['offset_ms']:>12.1f}{node['duration_ms']:>14.1f}"
+        )
+    lines.append(
+        f"serial: {report['serial_ms']:.1f} ms | wall: {report['wall_ms']:.1f} ms | "
+        f"economia paralela: {report['parallel_saving_ms']:.1f} ms"
+    )
+    return "\n".join(lines)
@@ -4,7 +4,7 @@ LangChain tools for the agent.
 import json
 from typing import Optional
 from langchain_core.tools import tool
-from ..bigquery.client import get_bigquery_client
+from ..bigquery.backend import get_query_backend
 from .metadata_helper import get_metadata_helper
 
 
@@ -19,7 +19,7 @@ async def execute_bigquery_query(query: str) -> str:
     Returns:
         JSON string with query results
     """
-    client = get_bigquery_client()
+    client = get_query_backend()
 
     try:
         results = client.query(query)
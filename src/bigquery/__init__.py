@@ -1,11 +1,29 @@
 """BigQuery integration module."""
+from .backend import QueryBackend, get_query_backend
 from .client import BigQueryClient, get_bigquery_client
+from .client_registry import ClientRegistry, get_client_registry
+from .jobs import BigQueryJobEngine, QueryTimeoutError, QueryCancelledError
+from .result_cache import ResultCache, canonicalize_sql
+from .freshness import DataVersionTracker, FreshnessService, get_data_version_tracker, get_freshness_service
 from .schema import SchemaRetriever, get_schema_retriever
 from .vector_store import create_vector_store, load_examples_to_vector_store, QA_EXAMPLES
 
 __all__ = [
+    "QueryBackend",
+    "get_query_backend",
     "BigQueryClient",
     "get_bigquery_client",
+    "ClientRegistry",
+    "get_client_registry",
+    "BigQueryJobEngine",
+    "QueryTimeoutError",
+    "QueryCancelledError",
+    "ResultCache",
+    "canonicalize_sql",
+    "DataVersionTracker",
+    "get_data_version_tracker",
+    "FreshnessService",
+    "get_freshness_service",
     "SchemaRetriever",
     "get_schema_retriever",
     "create_vector_store",
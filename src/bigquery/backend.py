@@ -0,0 +1,194 @@
+"""
+Query backend interface.
+
+The agent, the tools and the overview tab only need four operations from the
+warehouse: run a query, estimate it (dry run), describe a table and list the
+tables. BigQueryClient implements them against BigQuery; DuckDBBackend runs
+the same BigQuery-dialect SQL against local Parquet copies of the dataset.
+QUERY_BACKEND selects the implementation returned by get_query_backend().
+"""
+import asyncio
+import os
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+
+
+class QueryBackend(ABC):
+    """
+    Interface shared by the query backends.
+
+    SQL is always written in the BigQuery dialect (fully qualified
+    `antaqdados.br_antaq_estatistico_aquaviario.<table>` names); backends
+    translate it when needed.
+    """
+
+    # SQL dialect the backend executes natively
+    dialect: str = "bigquery"
+
+    @abstractmethod
+    def query(
+        self,
+        sql: str,
+        job_config: Any = None,
+        use_cache: bool = True,
+        result_format: str = "rows"
+    ) -> Any:
+        """
+        Execute a SQL query.
+
+        Args:
+            sql: SQL query string (BigQuery dialect)
+            job_config: Optional backend-specific configuration
+            use_cache: Whether a result cache may be used
+            result_format: "rows" (list of dictionaries) or "arrow" (pyarrow.Table)
+
+        Returns:
+            Query result in the requested format
+        """
+
+    async def aquery(
+        self,
+        sql: str,
+        job_config: Any = None,
+        timeout: Optional[float] = None,
+        key: Optional[str] = None,
+        result_format: str = "rows"
+    ) -> Any:
+        """
+        Execute a SQL query asynchronously (default: query() in a thread).
+
+        Args:
+            sql: SQL query string (BigQuery dialect)
+            job_config: Optional backend-specific configuration
+            timeout: Deadline in seconds
+            key: Optional owner of the query (e.g. conversation thread id)
+            result_format: "rows" (list of dictionaries) or "arrow" (pyarrow.Table)
+
+        Returns:
+            Query result in the requested format
+        """
+        return await asyncio.wait_for(
+            asyncio.to_thread(self.query, sql, job_config, True, result_format),
+            timeout
+        )
+
+    def query_arrow(self, sql: str, job_config: Any = None, use_cache: bool = True):
+        """
+        Execute a SQL query and return a pyarrow.Table.
+
+        Args:
+            sql: SQL query string (BigQuery dialect)
+            job_config: Optional backend-specific configuration
+            use_cache: Whether a result cache may be used
+
+        Returns:
+            pyarrow.Table
+        """
+        return self.query(sql, job_config, use_cache, result_format="arrow")
+
+    async def aquery_arrow(
+        self,
+        sql: str,
+        job_config: Any = None,
+        timeout: Optional[float] = None,
+        key: Optional[str] = None
+    ):
+        """
+        Execute a SQL query asynchronously and return a pyarrow.Table.
+
+        Args:
+            sql: SQL query string (BigQuery dialect)
+            job_config: Optional backend-specific configuration
+            timeout: Deadline in seconds
+            key: Optional owner of the query (e.g. conversation thread id)
+
+        Returns:
+            pyarrow.Table
+        """
+        return await self.aquery(sql, job_config, timeout=timeout, key=key, result_format="arrow")
+
+    def query_dataframe(self, sql: str, job_config: Any = None, use_cache: bool = True):
+        """
+        Execute a SQL query and return a pandas DataFrame.
+
+        Args:
+            sql: SQL query string (BigQuery dialect)
+            job_config: Optional backend-specific configuration (e.g. query parameters)
+            use_cache: Whether a result cache may be used
+
+        Returns:
+            pandas.DataFrame
+        """
+        return self.query_arrow(sql, job_config, use_cache).to_pandas()
+
+    @abstractmethod
+    def dry_run(self, sql: str) -> Dict[str, Any]:
+        """
+        Estimate a query without running it.
+
+        Args:
+            sql: SQL query string (BigQuery dialect)
+
+        Returns:
+            Dictionary with total_bytes_processed and referenced_tables
+            ("project.dataset.table" strings)
+        """
+
+    async def adry_run(self, sql: str) -> Dict[str, Any]:
+        """
+        Estimate a query asynchronously.
+
+        Args:
+            sql: SQL query string (BigQuery dialect)
+
+        Returns:
+            Same as dry_run
+        """
+        return await asyncio.to_thread(self.dry_run, sql)
+
+    @abstractmethod
+    def get_schema(self, table_name: str) -> Dict[str, Any]:
+        """
+        Describe a table.
+
+        Args:
+            table_name: Table name (without project and dataset)
+
+        Returns:
+            Dictionary with name, description and columns
+            (list of {"name", "type", "mode", "description"})
+        """
+
+    @abstractmethod
+    def list_tables(self) -> List[str]:
+        """
+        List the tables of the dataset.
+
+        Returns:
+            List of table names
+        """
+
+
+# Singleton instance
+_backend_instance: Optional[QueryBackend] = None
+
+
+def get_query_backend() -> QueryBackend:
+    """
+    Get or create the backend selected by QUERY_BACKEND.
+
+    QUERY_BACKEND=bigquery (default) returns the shared BigQueryClient;
+    QUERY_BACKEND=duckdb opens the Parquet replica in LOCAL_DATA_DIR.
+    """
+    global _backend_instance
+    if _backend_instance is None:
+        name = os.getenv("QUERY_BACKEND", "bigquery").strip().lower()
+        if name == "duckdb":
+            from .duckdb_backend import create_duckdb_backend_from_env
+            _backend_instance = create_duckdb_backend_from_env()
+        elif name == "bigquery":
+            from .client import get_bigquery_client
+            _backend_instance = get_bigquery_client()
+        else:
+            raise ValueError(f"Unknown QUERY_BACKEND: {name!r} (use 'bigquery' or 'duckdb')")
+    return _backend_instance
@@ -2,16 +2,22 @@
 BigQuery client wrapper with connection pooling and error handling.
 """
 import os
-import json
-import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional
-from google.cloud import bigquery
 from google.cloud.bigquery import QueryJobConfig
 
+from .backend import QueryBackend
+from .client_registry import get_client_registry
+from .freshness import get_data_version_tracker
+from .result_cache import create_result_cache_from_env
+from .jobs import QueryCancelledError, QueryTimeoutError, create_job_engine_from_env
 
-class BigQueryClient:
+
+class BigQueryClient(QueryBackend):
     """
-    Wrapper for Google Cloud BigQuery client.
+    Wrapper for Google Cloud BigQuery client (the default QueryBackend).
     """
 
     def __init__(
@@ -35,13 +41,9 @@ class BigQueryClient:
         self.location = location
         self.data_project_id = data_project_id
 
-        # Initialize client with credentials from env or Streamlit secrets when available
-        credentials = self._get_credentials()
-        self.client = bigquery.Client(
-            project=self.project_id,
-            location=self.location,
-            credentials=credentials
-        )
+        # Shared client (credentials from env or Streamlit secrets when available,
+        # pooled HTTP session) from the process-wide registry
+        self.client = get_client_registry().get_client(self.project_id, self.location)
 
         # Default job config for safety
         self.default_job_config = QueryJobConfig(
@@ -50,79 +52,258 @@ class BigQueryClient:
             use_legacy_sql=False
         )
 
-    def _get_credentials(self):
+        # In-process result cache keyed on canonical SQL + data version
+        self.result_cache = create_result_cache_from_env()
+        self._revalidate_executor: Optional[ThreadPoolExecutor] = None
+        self._revalidating: set = set()
+        self._revalidate_lock = threading.Lock()
+
+        # Async job engine: own thread pool, deadlines and job cancellation
+        self.jobs = create_job_engine_from_env(self.client)
+
+    def query(
+        self,
+        sql: str,
+        job_config: Optional[QueryJobConfig] = None,
+        use_cache: bool = True,
+        result_format: str = "rows"
+    ) -> Any:
         """
-        Try to load credentials from env or Streamlit secrets.
-        Falls back to ADC when none are provided.
+        Execute a SQL query.
+
+        Results of queries run with the default job config are cached per
+        canonical SQL and invalidated when a new ANTAQ month is published.
+
+        Args:
+            sql: SQL query string
+            job_config: Optional job configuration
+            use_cache: Whether the result cache may be used
+            result_format: "rows" (list of dictionaries) or "arrow" (pyarrow.Table)
+
+        Returns:
+            Query result in the requested format
         """
-        creds_json = os.getenv("GOOGLE_APPLICATION_CREDENTIALS_JSON")
-        if creds_json:
-            try:
-                from google.oauth2 import service_account
-                info = json.loads(creds_json)
-                return service_account.Credentials.from_service_account_info(info)
-            except Exception:
-                pass
+        cache = self.result_cache if (use_cache and job_config is None) else None
+        if cache is None:
+            return self._run_query(sql, job_config, result_format)
 
-        try:
-            import streamlit as st
-            if hasattr(st, "secrets") and "gcp_service_account" in st.secrets:
-                from google.oauth2 import service_account
-                return service_account.Credentials.from_service_account_info(
-                    st.secrets["gcp_service_account"]
-                )
-        except Exception:
-            pass
+        version = get_data_version_tracker(self.client).current()
+        if version is None:
+            return self._run_query(sql, job_config, result_format)
+
+        cached = cache.get(sql, version, result_format)
+        if cached is not None:
+            rows, is_stale = cached
+            if is_stale:
+                self._revalidate_in_background(sql, version, result_format)
+            return rows
 
-        return None
+        rows = self._run_query(sql, job_config, result_format)
+        cache.set(sql, version, rows, result_format)
+        return rows
 
-    def query(
+    def query_arrow(
         self,
         sql: str,
-        job_config: Optional[QueryJobConfig] = None
-    ) -> List[Dict[str, Any]]:
+        job_config: Optional[QueryJobConfig] = None,
+        use_cache: bool = True
+    ):
         """
-        Execute a SQL query.
+        Execute a SQL query and return a pyarrow.Table.
+
+        Skips the per-row dictionary conversion; large results are downloaded
+        with the BigQuery Storage Read API (see BQ_STORAGE_API_MIN_ROWS).
 
         Args:
             sql: SQL query string
             job_config: Optional job configuration
+            use_cache: Whether the result cache may be used
 
         Returns:
-            List of dictionaries representing rows
+            pyarrow.Table
         """
+        return self.query(sql, job_config, use_cache, result_format="arrow")
+
+    def _run_query(
+        self,
+        sql: str,
+        job_config: Optional[QueryJobConfig] = None,
+        result_format: str = "rows"
+    ) -> Any:
+        """Submit a query job and convert the result to the requested format."""
         config = job_config or self.default_job_config
 
         try:
             # Run query
             query_job = self.client.query(sql, job_config=config)
-            results = query_job.result()
+
+            if result_format == "arrow":
+                return self.jobs.to_arrow(query_job)
 
             # Convert to list of dicts
-            rows = [dict(row) for row in results]
+            rows = [dict(row) for row in query_job.result()]
 
             return rows
 
         except Exception as e:
             raise RuntimeError(f"Query execution failed: {str(e)}") from e
 
+    def _revalidate_in_background(self, sql: str, version: str, result_format: str = "rows") -> None:
+        """Refresh a stale cache entry without blocking the caller."""
+        task_key = (sql, result_format)
+        with self._revalidate_lock:
+            if task_key in self._revalidating:
+                return
+            self._revalidating.add(task_key)
+            if self._revalidate_executor is None:
+                self._revalidate_executor = ThreadPoolExecutor(
+                    max_workers=2, thread_name_prefix="bq-revalidate"
+                )
+
+        def _refresh():
+            try:
+                self.result_cache.set(
+                    sql, version, self._run_query(sql, result_format=result_format), result_format
+                )
+            except Exception:
+                logging.warning("Background refresh of cached query failed", exc_info=True)
+            finally:
+                with self._revalidate_lock:
+                    self._revalidating.discard(task_key)
+
+        self._revalidate_executor.submit(_refresh)
+
+    def _cached_rows(self, sql: str, result_format: str = "rows") -> Any:
+        """Return a fresh cached result without blocking on any query, if available."""
+        if self.result_cache is None:
+            return None
+        tracker = get_data_version_tracker(self.client)
+        # The first (blocking) version check runs in a worker on the query path;
+        # afterwards current() returns at once and re-checks in background when due
+        if tracker.peek() is None:
+            return None
+        version = tracker.current()
+        if version is None:
+            return None
+        cached = self.result_cache.get(sql, version, result_format)
+        if cached is None or cached[1]:
+            return None
+        return cached[0]
+
     async def aquery(
         self,
         sql: str,
-        job_config: Optional[QueryJobConfig] = None
-    ) -> List[Dict[str, Any]]:
+        job_config: Optional[QueryJobConfig] = None,
+        timeout: Optional[float] = None,
+        key: Optional[str] = None,
+        result_format: str = "rows"
+    ) -> Any:
         """
         Execute a SQL query asynchronously.
 
+        The job is polled by the job engine instead of blocking an executor
+        thread, and it is cancelled on BigQuery when the deadline passes, the
+        calling task is cancelled or a newer query with the same key starts.
+
         Args:
             sql: SQL query string
             job_config: Optional job configuration
+            timeout: Deadline in seconds (defaults to BQ_QUERY_TIMEOUT_SECONDS)
+            key: Optional owner of the query (e.g. conversation thread id)
+            result_format: "rows" (list of dictionaries) or "arrow" (pyarrow.Table)
 
         Returns:
-            List of dictionaries representing rows
+            Query result in the requested format
         """
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, self.query, sql, job_config)
+        cache = self.result_cache if job_config is None else None
+        version = None
+        if cache is not None:
+            rows = self._cached_rows(sql, result_format)
+            if rows is not None:
+                return rows
+
+            version = await self.jobs.run_sync(get_data_version_tracker(self.client).current)
+            cached = cache.get(sql, version, result_format) if version is not None else None
+            if cached is not None:
+                rows, is_stale = cached
+                if is_stale:
+                    self._revalidate_in_background(sql, version, result_format)
+                return rows
+
+        try:
+            rows = await self.jobs.run(
+                sql,
+                job_config or self.default_job_config,
+                timeout=timeout,
+                key=key,
+                result_format=result_format
+            )
+        except (QueryTimeoutError, QueryCancelledError):
+            raise
+        except Exception as e:
+            raise RuntimeError(f"Query execution failed: {str(e)}") from e
+
+        if cache is not None and version is not None:
+            cache.set(sql, version, rows, result_format)
+        return rows
+
+    async def aquery_arrow(
+        self,
+        sql: str,
+        job_config: Optional[QueryJobConfig] = None,
+        timeout: Optional[float] = None,
+        key: Optional[str] = None
+    ):
+        """
+        Execute a SQL query asynchronously and return a pyarrow.Table.
+
+        Args:
+            sql: SQL query string
+            job_config: Optional job configuration
+            timeout: Deadline in seconds
+            key: Optional owner of the query (e.g. conversation thread id)
+
+        Returns:
+            pyarrow.Table
+        """
+        return await self.aquery(sql, job_config, timeout=timeout, key=key, result_format="arrow")
+
+    def dry_run(self, sql: str) -> Dict[str, Any]:
+        """
+        Estimate a query without running it (dry runs are free).
+
+        Args:
+            sql: SQL query string
+
+        Returns:
+            Dictionary with total_bytes_processed and referenced_tables
+            ("project.dataset.table" strings)
+        """
+        config = QueryJobConfig(
+            dry_run=True,
+            use_query_cache=False,
+            use_legacy_sql=False
+        )
+        query_job = self.client.query(sql, job_config=config)
+        return {
+            "total_bytes_processed": query_job.total_bytes_processed or 0,
+            "referenced_tables": [
+                f"{table.project}.{table.dataset_id}.{table.table_id}"
+                for table in (query_job.referenced_tables or [])
+            ],
+        }
+
+    async def adry_run(self, sql: str) -> Dict[str, Any]:
+        """
+        Estimate a query asynchronously.
+
+        Args:
+            sql: SQL query string
+
+        Returns:
+            Same as dry_run
+        """
+        return await self.jobs.run_sync(self.dry_run, sql)
 
     def test_connection(self) -> bool:
         """
@@ -151,6 +332,31 @@ class BigQueryClient:
         full_table_id = f"{self.data_project_id}.{self.dataset_id}.{table_name}"
         return self.client.get_table(full_table_id)
 
+    def get_schema(self, table_name: str) -> Dict[str, Any]:
+        """
+        Describe a table of the dataset.
+
+        Args:
+            table_name: Name of the table
+
+        Returns:
+            Dictionary with name, description and columns
+        """
+        table = self.get_table(table_name)
+        return {
+            "name": table_name,
+            "description": table.description or f"Table: {table_name}",
+            "columns": [
+                {
+                    "name": field.name,
+                    "type": field.field_type,
+                    "mode": field.mode,
+                    "description": field.description or ""
+                }
+                for field in table.schema
+            ]
+        }
+
     def list_tables(self) -> List[str]:
         """
         List all tables in the dataset.
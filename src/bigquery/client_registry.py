@@ -0,0 +1,211 @@
+"""
+Shared google-cloud-bigquery clients.
+
+Creating a bigquery.Client resolves credentials and opens a new HTTP session
+(and TLS connections) every time. The registry hands out one thread-safe
+client per (project, location, credentials), with an HTTP connection pool
+sized for the concurrent job and lookup calls and an access token fetched up
+front, plus one BigQuery Storage Read client per credentials for large Arrow
+downloads.
+"""
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+
+BIGQUERY_SCOPES = [
+    "https://www.googleapis.com/auth/bigquery",
+    "https://www.googleapis.com/auth/cloud-platform",
+]
+
+
+def load_credentials():
+    """
+    Load service account credentials from env or Streamlit secrets.
+
+    GOOGLE_APPLICATION_CREDENTIALS_JSON takes precedence over the
+    gcp_service_account Streamlit secret.
+
+    Returns:
+        google.oauth2.service_account.Credentials, or None to use ADC
+    """
+    creds_json = os.getenv("GOOGLE_APPLICATION_CREDENTIALS_JSON")
+    if creds_json:
+        try:
+            from google.oauth2 import service_account
+            info = json.loads(creds_json)
+            return service_account.Credentials.from_service_account_info(info)
+        except Exception:
+            pass
+
+    try:
+        import streamlit as st
+        if hasattr(st, "secrets") and "gcp_service_account" in st.secrets:
+            from google.oauth2 import service_account
+            return service_account.Credentials.from_service_account_info(
+                st.secrets["gcp_service_account"]
+            )
+    except Exception:
+        pass
+
+    return None
+
+
+def _credentials_key(credentials) -> Hashable:
+    if credentials is None:
+        return "adc"
+    email = getattr(credentials, "service_account_email", None)
+    return email or id(credentials)
+
+
+class ClientRegistry:
+    """
+    Thread-safe registry of shared BigQuery clients.
+    """
+
+    def __init__(self, pool_size: int = 32, warm_tokens: bool = True):
+        """
+        Initialize the registry.
+
+        Args:
+            pool_size: Maximum HTTP connections kept open per client
+            warm_tokens: Fetch an access token when a client is created, so the
+                first query does not pay for it
+        """
+        self.pool_size = max(1, int(pool_size))
+        self.warm_tokens = warm_tokens
+        self._clients: Dict[Tuple[str, str, Hashable], Any] = {}
+        self._storage_clients: Dict[Hashable, Any] = {}
+        self._lock = threading.Lock()
+
+    def _resolve_credentials(self, credentials):
+        if credentials is not None:
+            if hasattr(credentials, "with_scopes") and getattr(credentials, "requires_scopes", False):
+                credentials = credentials.with_scopes(BIGQUERY_SCOPES)
+            return credentials
+        import google.auth
+        credentials, _ = google.auth.default(scopes=BIGQUERY_SCOPES)
+        return credentials
+
+    def _http_session(self, credentials):
+        """AuthorizedSession with a connection pool of pool_size."""
+        import requests
+        from google.auth.transport.requests import AuthorizedSession, Request
+
+        session = AuthorizedSession(credentials)
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=self.pool_size, pool_maxsize=self.pool_size
+        )
+        session.mount("https://", adapter)
+
+        if self.warm_tokens:
+            try:
+                credentials.refresh(Request(session=session))
+            except Exception:
+                logging.warning("Could not prefetch BigQuery access token", exc_info=True)
+        return session
+
+    def get_client(
+        self,
+        project: Optional[str] = None,
+        location: Optional[str] = None,
+        credentials=None
+    ):
+        """
+        Get the shared client for a project, location and credentials.
+
+        Args:
+            project: Billing project (default: GOOGLE_CLOUD_PROJECT)
+            location: Default job location
+            credentials: Optional credentials (default: load_credentials(), then ADC)
+
+        Returns:
+            google.cloud.bigquery.Client
+        """
+        from google.cloud import bigquery
+
+        project = project or os.getenv("GOOGLE_CLOUD_PROJECT", "saasimpacto")
+        if credentials is None:
+            credentials = load_credentials()
+        key = (project, location or "", _credentials_key(credentials))
+
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                credentials = self._resolve_credentials(credentials)
+                client = bigquery.Client(
+                    project=project,
+                    location=location,
+                    credentials=credentials,
+                    _http=self._http_session(credentials)
+                )
+                self._clients[key] = client
+            return client
+
+    def get_storage_client(self, client):
+        """
+        Get the shared BigQuery Storage Read client for a client's credentials.
+
+        Args:
+            client: google.cloud.bigquery.Client
+
+        Returns:
+            BigQueryReadClient, or None when google-cloud-bigquery-storage is
+            not installed
+        """
+        key = _credentials_key(client._credentials)
+        with self._lock:
+            if key not in self._storage_clients:
+                try:
+                    from google.cloud import bigquery_storage
+                    self._storage_clients[key] = bigquery_storage.BigQueryReadClient(
+                        credentials=client._credentials
+                    )
+                except ImportError:
+                    self._storage_clients[key] = None
+            return self._storage_clients[key]
+
+    def close(self) -> None:
+        """Close every client (HTTP sessions and gRPC channels)."""
+        with self._lock:
+            for client in self._clients.values():
+                client.close()
+            for storage_client in self._storage_clients.values():
+                if storage_client is not None:
+                    storage_client.transport.close()
+            self._clients.clear()
+            self._storage_clients.clear()
+
+
+# Singleton instance
+_registry: Optional[ClientRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_client_registry() -> ClientRegistry:
+    """Get the process-wide client registry (pool size from BQ_HTTP_POOL_SIZE)."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ClientRegistry(
+                pool_size=int(os.getenv("BQ_HTTP_POOL_SIZE", "32")),
+                warm_tokens=os.getenv("BQ_WARM_TOKENS", "true").lower() == "true",
+            )
+        return _registry
+
+
+def get_shared_client(project: Optional[str] = None, location: Optional[str] = None, credentials=None):
+    """
+    Shortcut for get_client_registry().get_client(...).
+
+    Args:
+        project: Billing project (default: GOOGLE_CLOUD_PROJECT)
+        location: Default job location
+        credentials: Optional credentials
+
+    Returns:
+        google.cloud.bigquery.Client
+    """
+    return get_client_registry().get_client(project, location, credentials)
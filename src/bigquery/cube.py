@@ -0,0 +1,335 @@
+"""
+Pre-aggregated monthly cargo cube.
+
+The overview tab asks the same few questions for every click (totals by
+sentido, top commodities, top destinations, UF) and each one scanned the
+whole month of v_carga_metodologia_oficial. The cube stores SUM(tonnage) and
+COUNT(*) of the official rows at the grain
+
+    (ano, mes, porto_atracacao, uf, sentido, cdmercadoria, destino,
+     tipo_de_navegacao_da_atracacao, tipo_operacao_da_carga)
+
+as Parquet partitioned by month in <LOCAL_DATA_DIR>/carga_mensal_cubo, next to
+the replica, so the DuckDB backend exposes it as a table as well. A month of
+the cube is far smaller than the month of the view, so the overview sections
+are computed in memory with Arrow.
+
+The cube is rebuilt for the months changed by antaq-replica-sync, or directly
+from BigQuery with antaq-cube-build --source bigquery.
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..utils.cache import LRUCache
+from .replica import DATASET, PARTITIONED_TABLE, month_key, write_parquet_atomic
+
+
+CUBE_TABLE = "carga_mensal_cubo"
+
+CUBE_DIMENSIONS = [
+    "ano",
+    "mes",
+    "porto_atracacao",
+    "uf",
+    "sentido",
+    "cdmercadoria",
+    "destino",
+    "tipo_de_navegacao_da_atracacao",
+    "tipo_operacao_da_carga",
+]
+
+# Measure column -> aggregate over the official rows
+CUBE_MEASURES = {
+    "carga_total": "SUM(c.vlpesocargabruta_oficial)",
+    "registros": "COUNT(*)",
+}
+
+# Filters baked into the cube (every row of the cube satisfies them)
+CUBE_FILTERS = [
+    "c.isValidoMetodologiaANTAQ = 1",
+    "c.vlpesocargabruta_oficial > 0",
+]
+
+# Operation types used by the overview tab
+OVERVIEW_TIPOS_OPERACAO = [
+    "movimentação de carga", "apoio", "longo curso exportação",
+    "longo curso importação", "cabotagem", "interior",
+    "baldeação de carga nacional", "baldeação de carga estrangeira de passagem",
+]
+
+
+def cube_build_sql(months: Optional[List[Tuple[int, int]]] = None, dataset: str = DATASET) -> str:
+    """
+    BigQuery-dialect SQL that aggregates the view at the cube grain.
+
+    Args:
+        months: Optional (ano, mes) pairs to build (None = whole history)
+        dataset: Source dataset ("project.dataset")
+
+    Returns:
+        SQL string
+    """
+    dimensions = ", ".join(f"c.{d}" for d in CUBE_DIMENSIONS)
+    measures = ", ".join(f"{expr} AS {name}" for name, expr in CUBE_MEASURES.items())
+    filters = list(CUBE_FILTERS)
+    if months:
+        keys = ", ".join(str(int(ano) * 100 + int(mes)) for ano, mes in sorted(set(months)))
+        filters.append(f"(c.ano * 100 + c.mes) IN ({keys})")
+    return (
+        f"SELECT {dimensions}, {measures}\n"
+        f"FROM `{dataset}.{PARTITIONED_TABLE}` c\n"
+        f"WHERE {' AND '.join(filters)}\n"
+        f"GROUP BY {dimensions}"
+    )
+
+
+class CargoCube:
+    """
+    Build and read the monthly cargo cube stored as Parquet.
+    """
+
+    def __init__(self, data_dir: str, max_cached_months: int = 24):
+        """
+        Initialize the cube.
+
+        Args:
+            data_dir: Replica directory (the cube lives in <data_dir>/carga_mensal_cubo)
+            max_cached_months: Months kept in memory after being read
+        """
+        self.data_dir = data_dir
+        self.directory = os.path.join(data_dir, CUBE_TABLE)
+        self._months = LRUCache(max_size=max_cached_months)
+
+    def _path(self, ano: int, mes: int) -> str:
+        return os.path.join(self.directory, f"ano={int(ano)}", f"mes={int(mes)}", "part-0.parquet")
+
+    # --- Build ----------------------------------------------------------------------
+
+    def build(self, source, months: Optional[List[Tuple[int, int]]] = None) -> int:
+        """
+        Aggregate the view on a backend and write the cube partitions.
+
+        Args:
+            source: QueryBackend (BigQueryClient, or DuckDBBackend over the replica)
+            months: Optional (ano, mes) pairs to rebuild (None = whole history)
+
+        Returns:
+            Number of partitions written
+        """
+        import pyarrow.compute as pc
+
+        table = source.query_arrow(cube_build_sql(months), use_cache=False)
+        month_index = pc.add(pc.multiply(table.column("ano"), 100), table.column("mes"))
+        keys = sorted(divmod(int(key), 100) for key in pc.unique(month_index).to_pylist())
+
+        for ano, mes in keys:
+            partition = table.filter(pc.equal(month_index, ano * 100 + mes))
+            # ano/mes come from the directory names (hive partitioning)
+            write_parquet_atomic(partition.drop_columns(["ano", "mes"]), self._path(ano, mes))
+
+        # Requested months without official rows anymore
+        for ano, mes in {(int(a), int(m)) for a, m in months or []} - set(keys):
+            path = self._path(ano, mes)
+            if os.path.exists(path):
+                os.remove(path)
+
+        self._months.clear()
+        return len(keys)
+
+    # --- Read ---------------------------------------------------------------------
+
+    def has_month(self, ano: int, mes: int) -> bool:
+        """Whether the cube has the given month."""
+        return os.path.exists(self._path(ano, mes))
+
+    def month(self, ano: int, mes: int):
+        """
+        Cube rows of one month.
+
+        Args:
+            ano: Year
+            mes: Month (1-12)
+
+        Returns:
+            pyarrow.Table (without ano/mes) or None when the month is not built
+        """
+        path = self._path(ano, mes)
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return None
+
+        cached = self._months.get((ano, mes))
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+
+        import pyarrow.parquet as pq
+        # ParquetFile reads the file alone (no partition columns inferred from the path)
+        table = pq.ParquetFile(path).read()
+        self._months.set((ano, mes), (mtime, table))
+        return table
+
+    @staticmethod
+    def _filter(table, porto: Optional[str], tipos_operacao: Optional[List[str]]):
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        if tipos_operacao:
+            table = table.filter(pc.is_in(
+                pc.utf8_lower(table.column("tipo_operacao_da_carga")),
+                value_set=pa.array(tipos_operacao, type=pa.string())
+            ))
+        if porto:
+            # Same semantics as LOWER(porto_atracacao) LIKE '%porto%'
+            table = table.filter(pc.match_substring(
+                pc.utf8_lower(table.column("porto_atracacao")), porto.lower()
+            ))
+        return table
+
+    @staticmethod
+    def _top(table, column: str, limit: Optional[int] = None):
+        """SUM(carga_total) by column, largest first, as a DataFrame."""
+        grouped = table.group_by(column).aggregate([("carga_total", "sum")])
+        grouped = grouped.rename_columns([
+            "carga_total" if name == "carga_total_sum" else name for name in grouped.column_names
+        ]).sort_by([("carga_total", "descending")])
+        if limit is not None:
+            grouped = grouped.slice(0, limit)
+        return grouped.select([column, "carga_total"]).to_pandas()
+
+    def overview(self, porto: str, ano: int, mes: int) -> Optional[Dict[str, Any]]:
+        """
+        Sections of the overview tab computed from the cube.
+
+        Args:
+            porto: Port name or "Brasil" for the whole country
+            ano: Year
+            mes: Month (1-12)
+
+        Returns:
+            Dictionary of DataFrames (resultado_atual, resultado_anterior,
+            mercadorias_exp, mercadorias_imp, destinos) and uf, or None when
+            the month or the same month a year earlier is not in the cube
+        """
+        import pyarrow.compute as pc
+
+        atual = self.month(ano, mes)
+        anterior = self.month(ano - 1, mes)
+        # A missing comparison month would read as a 0 t prior year
+        if atual is None or anterior is None:
+            return None
+
+        porto_filter = None if porto == "Brasil" else porto
+        atual = self._filter(atual, porto_filter, OVERVIEW_TIPOS_OPERACAO)
+        anterior = self._filter(anterior, porto_filter, OVERVIEW_TIPOS_OPERACAO)
+
+        embarcados = atual.filter(pc.equal(atual.column("sentido"), "Embarcados"))
+        desembarcados = atual.filter(pc.equal(atual.column("sentido"), "Desembarcados"))
+        destinos = embarcados.set_column(
+            embarcados.column_names.index("destino"),
+            "destino",
+            pc.fill_null(embarcados.column("destino"), "Não informado")
+        )
+
+        uf = "BR"
+        if porto_filter:
+            ufs = [u for u in atual.column("uf").to_pylist() if u]
+            uf = ufs[0] if ufs else "SP"
+
+        sections = {
+            "resultado_atual": self._top(atual, "sentido"),
+            "resultado_anterior": self._top(anterior, "sentido"),
+            "mercadorias_exp": self._top(embarcados, "cdmercadoria", 5),
+            "mercadorias_imp": self._top(desembarcados, "cdmercadoria", 5),
+            "destinos": self._top(destinos, "destino", 5),
+            "uf": uf,
+        }
+        return sections
+
+
+# Singleton instance
+_cube_instance: Optional[CargoCube] = None
+
+
+def get_cargo_cube() -> Optional[CargoCube]:
+    """
+    Get the cube of the local replica, or None when disabled or not built.
+
+    CARGO_CUBE_ENABLED=false turns the cube off; it lives in LOCAL_DATA_DIR.
+    """
+    global _cube_instance
+    if os.getenv("CARGO_CUBE_ENABLED", "true").lower() != "true":
+        return None
+    if _cube_instance is None:
+        _cube_instance = CargoCube(
+            os.getenv("LOCAL_DATA_DIR", os.path.join(os.getcwd(), "data", "replica"))
+        )
+    if not os.path.isdir(_cube_instance.directory):
+        return None
+    return _cube_instance
+
+
+def build_cube_from_replica(data_dir: str, months: Optional[List[Tuple[int, int]]] = None) -> int:
+    """
+    Rebuild cube months from the local replica with DuckDB.
+
+    Args:
+        data_dir: Replica directory
+        months: Optional (ano, mes) pairs to rebuild (None = whole history)
+
+    Returns:
+        Number of partitions written
+    """
+    from .duckdb_backend import DuckDBBackend
+
+    backend = DuckDBBackend(data_dir)
+    try:
+        return CargoCube(data_dir).build(backend, months)
+    finally:
+        backend.close()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point (antaq-cube-build)."""
+    parser = argparse.ArgumentParser(
+        description="Constrói o cubo mensal de carga (Parquet) usado pela aba de visão geral."
+    )
+    parser.add_argument(
+        "--data-dir",
+        default=os.getenv("LOCAL_DATA_DIR", os.path.join(os.getcwd(), "data", "replica")),
+        help="Diretório da réplica (padrão: LOCAL_DATA_DIR)"
+    )
+    parser.add_argument(
+        "--source", choices=["local", "bigquery"], default="local",
+        help="Agrega a réplica local (DuckDB) ou direto no BigQuery"
+    )
+    parser.add_argument("--months", nargs="*", help="Meses a reconstruir, no formato AAAA-MM (padrão: todos)")
+    args = parser.parse_args(argv)
+
+    months = None
+    if args.months:
+        months = [tuple(int(part) for part in key.split("-")) for key in args.months]
+
+    started = time.time()
+    try:
+        if args.source == "bigquery":
+            from .client import get_bigquery_client
+            written = CargoCube(args.data_dir).build(get_bigquery_client(), months)
+        else:
+            written = build_cube_from_replica(args.data_dir, months)
+    except Exception as e:
+        logging.exception("Cube build failed")
+        print(f"✗ {e}")
+        return 1
+
+    label = ", ".join(month_key(*m) for m in months) if months else "todo o histórico"
+    print(f"{written} partições do cubo gravadas ({label}) em {time.time() - started:.1f}s -> {args.data_dir}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+"""
+In-memory snapshots of the small reference tables.
+
+mercadoria_carga, instalacao_origem and instalacao_destino have a few thousand
+rows each, but names were looked up with one query per code (and up to four
+per destination). The cache loads each table once per data version, keeps it
+as a compact code -> value dict and persists the dict on disk, so a restarted
+process does not query the table again until a new month is published. Codes
+missing from a loaded table are answered locally (negative lookups).
+"""
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from ..utils.cache import DiskCache
+
+
+class DimensionCache:
+    """
+    Code -> value lookups of reference tables, refreshed on data version change.
+    """
+
+    def __init__(
+        self,
+        version: Callable[[], Optional[str]],
+        snapshot_dir: Optional[str] = None,
+        max_age_seconds: Optional[float] = 86400,
+        retry_seconds: float = 300
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            version: Returns the current data version (None when unknown)
+            snapshot_dir: Optional directory for the persisted snapshots
+            max_age_seconds: Reload a table after this long even if the data
+                version did not change (None = only on version change)
+            retry_seconds: Time before retrying a table that failed to load
+        """
+        self.version = version
+        self.max_age_seconds = max_age_seconds
+        self.retry_seconds = retry_seconds
+        self._snapshots = DiskCache(snapshot_dir, max_entries=32) if snapshot_dir else None
+        self._tables: Dict[str, Dict[str, Any]] = {}
+        self._failed_at: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _is_current(self, entry: Optional[Dict[str, Any]], version: Optional[str]) -> bool:
+        if entry is None or entry["version"] != version:
+            return False
+        if self.max_age_seconds is None:
+            return True
+        return time.time() - entry["loaded_at"] <= self.max_age_seconds
+
+    def lookup(self, name: str, build: Callable[[], Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        Lookup dict of a table, building it when missing or outdated.
+
+        Args:
+            name: Table name (cache key)
+            build: Loads the table and returns its code -> value dict
+
+        Returns:
+            Lookup dict, or None when the table cannot be loaded (callers fall
+            back to per-code queries)
+        """
+        try:
+            version = self.version()
+        except Exception:
+            logging.warning("Could not get data version for reference tables", exc_info=True)
+            version = None
+
+        entry = self._tables.get(name)
+        if self._is_current(entry, version):
+            return entry["values"]
+
+        with self._lock:
+            entry = self._tables.get(name)
+            if self._is_current(entry, version):
+                return entry["values"]
+
+            if self._snapshots is not None and version is not None:
+                snapshot = self._snapshots.get((name, version))
+                if self._is_current(snapshot, version):
+                    self._tables[name] = snapshot
+                    return snapshot["values"]
+
+            failed_at = self._failed_at.get(name)
+            if failed_at is not None and time.monotonic() - failed_at < self.retry_seconds:
+                return entry["values"] if entry is not None else None
+
+            try:
+                values = build()
+            except Exception:
+                logging.warning("Could not load reference table %s", name, exc_info=True)
+                self._failed_at[name] = time.monotonic()
+                # Keep serving the previous snapshot if there is one
+                return entry["values"] if entry is not None else None
+
+            self._failed_at.pop(name, None)
+            entry = {"version": version, "values": values, "loaded_at": time.time()}
+            self._tables[name] = entry
+            if self._snapshots is not None and version is not None:
+                self._snapshots.set((name, version), entry)
+            return values
+
+    def clear(self) -> None:
+        """Drop every table from memory and disk."""
+        with self._lock:
+            self._tables.clear()
+            self._failed_at.clear()
+            if self._snapshots is not None:
+                self._snapshots.clear()
+
+
+def create_dimension_cache_from_env(version: Callable[[], Optional[str]]) -> Optional[DimensionCache]:
+    """
+    Build the dimension cache from environment settings.
+
+    Args:
+        version: Returns the current data version
+
+    Returns:
+        DimensionCache, or None when DIMENSION_CACHE_ENABLED=false
+    """
+    if os.getenv("DIMENSION_CACHE_ENABLED", "true").lower() != "true":
+        return None
+    max_age = os.getenv("DIMENSION_CACHE_MAX_AGE_SECONDS", "86400")
+    return DimensionCache(
+        version,
+        snapshot_dir=os.getenv("DIMENSION_CACHE_DIR", os.path.join("data", "cache", "dimensions")) or None,
+        max_age_seconds=float(max_age) if max_age else None,
+    )
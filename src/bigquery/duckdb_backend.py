@@ -0,0 +1,362 @@
+"""
+DuckDB query backend over a local Parquet replica of the ANTAQ dataset.
+
+Each table is a directory (or a single .parquet file) inside the data
+directory, e.g. data/replica/v_carga_metodologia_oficial/ano=2024/mes=1/*.parquet,
+and is exposed as a DuckDB view with hive partitioning, so filters on ano/mes
+skip whole files. The agent's BigQuery-dialect SQL is translated with sqlglot;
+project and dataset qualifiers are dropped so
+`antaqdados.br_antaq_estatistico_aquaviario.<table>` resolves to the local view,
+and BigQuery functions without a DuckDB equivalent are rewritten (accent
+folding with NORMALIZE becomes strip_accents).
+"""
+import asyncio
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+from .backend import QueryBackend
+from .jobs import QueryTimeoutError
+from ..utils.cache import LRUCache
+
+
+def _quote_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _quote_literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _query_parameters(job_config: Any) -> Dict[str, Any]:
+    """Named parameters of a QueryJobConfig (or its dictionary form) for DuckDB."""
+    if job_config is None:
+        return {}
+    if isinstance(job_config, dict):
+        return {
+            p["name"]: p.get("parameter_value")
+            for p in job_config.get("query_parameters", [])
+        }
+    return {p.name: p.value for p in getattr(job_config, "query_parameters", None) or []}
+
+
+# Regular expressions that remove combining marks after NFD normalization
+_MARK_PATTERNS = {r"\pM", r"\p{M}", r"\p{Mn}"}
+
+
+def _strip_accents(tree) -> None:
+    """
+    Rewrite BigQuery's accent folding for DuckDB, in place.
+
+    REGEXP_REPLACE(NORMALIZE(x, NFD), r'\pM', '') (added by the SQL validator
+    to porto_atracacao filters) becomes strip_accents(x): DuckDB has no
+    NORMALIZE function.
+    """
+    from sqlglot import exp
+
+    for node in list(tree.find_all(exp.RegexpReplace)):
+        normalized = node.this
+        pattern = node.args.get("expression")
+        replacement = node.args.get("replacement")
+        if (
+            isinstance(normalized, exp.Normalize)
+            and pattern is not None and pattern.name in _MARK_PATTERNS
+            and replacement is not None and replacement.name == ""
+        ):
+            node.replace(exp.Anonymous(this="strip_accents", expressions=[normalized.this]))
+
+
+class DuckDBBackend(QueryBackend):
+    """
+    Run BigQuery-dialect SQL on local Parquet files with DuckDB.
+    """
+
+    dialect = "duckdb"
+
+    def __init__(
+        self,
+        data_dir: str,
+        database: str = ":memory:",
+        threads: Optional[int] = None,
+        memory_limit: Optional[str] = None,
+        default_timeout: Optional[float] = None
+    ):
+        """
+        Initialize the backend and register one view per table.
+
+        Args:
+            data_dir: Directory with one sub-directory (or .parquet file) per table
+            database: DuckDB database path (":memory:" keeps only the views)
+            threads: DuckDB worker threads (defaults to the number of cores)
+            memory_limit: DuckDB memory limit, e.g. "2GB"
+            default_timeout: Deadline in seconds for aquery when none is given
+        """
+        import duckdb
+
+        self.data_dir = data_dir
+        self.default_timeout = default_timeout
+        self._conn = duckdb.connect(database)
+        if threads:
+            self._conn.execute(f"SET threads = {int(threads)}")
+        if memory_limit:
+            self._conn.execute(f"SET memory_limit = {_quote_literal(memory_limit)}")
+
+        self._tables: Dict[str, str] = {}
+        self._translations = LRUCache(max_size=256)
+        self._lock = threading.Lock()
+        self.refresh()
+
+    # --- Table registration ---------------------------------------------------
+
+    def refresh(self) -> List[str]:
+        """
+        (Re)register the views after the replica changed on disk.
+
+        Returns:
+            Registered table names
+        """
+        tables = {}
+        if os.path.isdir(self.data_dir):
+            for entry in sorted(os.listdir(self.data_dir)):
+                path = os.path.join(self.data_dir, entry)
+                if os.path.isdir(path):
+                    if any(name.endswith(".parquet") for _, _, files in os.walk(path) for name in files):
+                        tables[entry] = os.path.join(path, "**", "*.parquet")
+                elif entry.endswith(".parquet"):
+                    tables[entry[:-len(".parquet")]] = path
+        else:
+            logging.warning("DuckDB data directory %s does not exist", self.data_dir)
+
+        with self._lock:
+            for name, pattern in tables.items():
+                self._conn.execute(
+                    f"CREATE OR REPLACE VIEW {_quote_identifier(name)} AS "
+                    f"SELECT * FROM read_parquet({_quote_literal(pattern)}, "
+                    "hive_partitioning = true, union_by_name = true)"
+                )
+            for name in set(self._tables) - set(tables):
+                self._conn.execute(f"DROP VIEW IF EXISTS {_quote_identifier(name)}")
+            self._tables = tables
+        return sorted(tables)
+
+    # --- SQL translation --------------------------------------------------------
+
+    @staticmethod
+    def _parse(sql: str):
+        import sqlglot
+        return [tree for tree in sqlglot.parse(sql, read="bigquery") if tree is not None]
+
+    def translate(self, sql: str) -> str:
+        """
+        Translate BigQuery SQL to DuckDB SQL with local table names.
+
+        Args:
+            sql: SQL query string (BigQuery dialect)
+
+        Returns:
+            DuckDB SQL
+        """
+        cached = self._translations.get(sql)
+        if cached is not None:
+            return cached
+
+        from sqlglot import exp
+
+        statements = []
+        for tree in self._parse(sql):
+            for table in tree.find_all(exp.Table):
+                table.set("catalog", None)
+                table.set("db", None)
+            _strip_accents(tree)
+            statements.append(tree.sql(dialect="duckdb"))
+        translated = ";\n".join(statements)
+        self._translations.set(sql, translated)
+        return translated
+
+    def referenced_tables(self, sql: str) -> List[str]:
+        """
+        Tables read by a query, as written in the SQL (CTE names excluded).
+
+        Args:
+            sql: SQL query string (BigQuery dialect)
+
+        Returns:
+            Sorted list of table references
+        """
+        from sqlglot import exp
+
+        tables = set()
+        for tree in self._parse(sql):
+            ctes = {cte.alias_or_name for cte in tree.find_all(exp.CTE)}
+            for table in tree.find_all(exp.Table):
+                if table.name in ctes and not table.args.get("db"):
+                    continue
+                tables.add(".".join(part for part in (table.catalog, table.db, table.name) if part))
+        return sorted(tables)
+
+    # --- QueryBackend ---------------------------------------------------------
+
+    def _execute(self, cursor, sql: str, result_format: str, parameters: Dict[str, Any]) -> Any:
+        """Run translated SQL on a cursor and close it."""
+        try:
+            # BigQuery @name parameters are translated to DuckDB $name
+            cursor.execute(self.translate(sql), parameters or None)
+            if result_format == "arrow":
+                # to_arrow_table replaces fetch_arrow_table in newer DuckDB releases
+                fetch = getattr(cursor, "to_arrow_table", None) or cursor.fetch_arrow_table
+                return fetch()
+            columns = [column[0] for column in cursor.description or []]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+
+    def query(
+        self,
+        sql: str,
+        job_config: Any = None,
+        use_cache: bool = True,
+        result_format: str = "rows"
+    ) -> Any:
+        """
+        Execute a SQL query on the local replica.
+
+        Args:
+            sql: SQL query string (BigQuery dialect)
+            job_config: Optional QueryJobConfig; only its query_parameters are used
+            use_cache: Ignored (local scans are cheap)
+            result_format: "rows" (list of dictionaries) or "arrow" (pyarrow.Table)
+
+        Returns:
+            Query result in the requested format
+        """
+        try:
+            return self._execute(self._conn.cursor(), sql, result_format, _query_parameters(job_config))
+        except Exception as e:
+            raise RuntimeError(f"Query execution failed: {str(e)}") from e
+
+    async def aquery(
+        self,
+        sql: str,
+        job_config: Any = None,
+        timeout: Optional[float] = None,
+        key: Optional[str] = None,
+        result_format: str = "rows"
+    ) -> Any:
+        """
+        Execute a SQL query asynchronously.
+
+        The query runs in a worker thread on its own cursor; it is interrupted
+        when the deadline passes or the calling task is cancelled.
+
+        Args:
+            sql: SQL query string (BigQuery dialect)
+            job_config: Optional QueryJobConfig; only its query_parameters are used
+            timeout: Deadline in seconds (defaults to default_timeout)
+            key: Ignored (queries are not shared between threads)
+            result_format: "rows" (list of dictionaries) or "arrow" (pyarrow.Table)
+
+        Returns:
+            Query result in the requested format
+        """
+        timeout = self.default_timeout if timeout is None else timeout
+        cursor = self._conn.cursor()
+        try:
+            return await asyncio.wait_for(
+                asyncio.to_thread(
+                    self._execute, cursor, sql, result_format, _query_parameters(job_config)
+                ),
+                timeout
+            )
+        except asyncio.TimeoutError:
+            cursor.interrupt()
+            raise QueryTimeoutError(f"Query exceeded the {timeout:.0f}s deadline and was cancelled")
+        except asyncio.CancelledError:
+            cursor.interrupt()
+            raise
+        except Exception as e:
+            raise RuntimeError(f"Query execution failed: {str(e)}") from e
+
+    def dry_run(self, sql: str) -> Dict[str, Any]:
+        """
+        Check a query with EXPLAIN (local scans have no billed bytes).
+
+        Args:
+            sql: SQL query string (BigQuery dialect)
+
+        Returns:
+            Dictionary with total_bytes_processed (always 0) and referenced_tables
+
+        Raises:
+            Exception: The query does not parse or bind
+        """
+        cursor = self._conn.cursor()
+        try:
+            cursor.execute(f"EXPLAIN {self.translate(sql)}")
+        finally:
+            cursor.close()
+        return {
+            "total_bytes_processed": 0,
+            "referenced_tables": self.referenced_tables(sql),
+        }
+
+    def get_schema(self, table_name: str) -> Dict[str, Any]:
+        """
+        Describe a local table.
+
+        Args:
+            table_name: Table name
+
+        Returns:
+            Dictionary with name, description and columns
+        """
+        cursor = self._conn.cursor()
+        try:
+            cursor.execute(f"DESCRIBE {_quote_identifier(table_name)}")
+            rows = cursor.fetchall()
+        finally:
+            cursor.close()
+        return {
+            "name": table_name,
+            "description": f"Table: {table_name} (réplica local)",
+            "columns": [
+                {
+                    "name": row[0],
+                    "type": row[1],
+                    "mode": "NULLABLE" if row[2] == "YES" else "REQUIRED",
+                    "description": ""
+                }
+                for row in rows
+            ]
+        }
+
+    def list_tables(self) -> List[str]:
+        """
+        List the tables of the local replica.
+
+        Returns:
+            List of table names
+        """
+        return sorted(self._tables)
+
+    def close(self) -> None:
+        """Close the DuckDB connection."""
+        self._conn.close()
+
+
+def create_duckdb_backend_from_env() -> DuckDBBackend:
+    """
+    Build the DuckDB backend from environment settings.
+
+    Returns:
+        DuckDBBackend instance
+    """
+    threads = os.getenv("DUCKDB_THREADS")
+    timeout = os.getenv("BQ_QUERY_TIMEOUT_SECONDS", "120")
+    return DuckDBBackend(
+        os.getenv("LOCAL_DATA_DIR", os.path.join(os.getcwd(), "data", "replica")),
+        database=os.getenv("DUCKDB_DATABASE", ":memory:"),
+        threads=int(threads) if threads else None,
+        memory_limit=os.getenv("DUCKDB_MEMORY_LIMIT") or None,
+        default_timeout=float(timeout) if timeout else None,
+    )
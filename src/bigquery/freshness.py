@@ -0,0 +1,373 @@
+"""
+Data freshness tracking for ANTAQ statistics.
+
+ANTAQ publishes the official view monthly. Caches key their entries on the
+latest published period ("data version") instead of a blind TTL, so they are
+invalidated exactly when a new month becomes available.
+
+The version check first reads the last modification time of the view's
+base tables (table metadata, no query). MAX(ano * 100 + mes) only runs when a
+base table changed, or on every check when metadata cannot be read. A tiny
+watermark table (DATA_WATERMARK_TABLE) is read instead when one is
+maintained. The local replica reads the version from the sync manifest
+without any query. FreshnessService exposes the version and the latest period
+to the app.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+
+CARGA_VIEW = "antaqdados.br_antaq_estatistico_aquaviario.v_carga_metodologia_oficial"
+
+MESES = [
+    "Janeiro", "Fevereiro", "Março", "Abril", "Maio", "Junho",
+    "Julho", "Agosto", "Setembro", "Outubro", "Novembro", "Dezembro",
+]
+
+
+def version_sql() -> str:
+    """
+    SQL with the latest published period as periodo (ano * 100 + mes).
+
+    Reads DATA_WATERMARK_TABLE (columns ano, mes) when set, the view otherwise.
+    """
+    watermark_table = os.getenv("DATA_WATERMARK_TABLE")
+    if watermark_table:
+        return f"SELECT MAX(ano * 100 + mes) AS periodo FROM `{watermark_table}`"
+    return f"""
+        SELECT MAX(ano * 100 + mes) AS periodo
+        FROM `{CARGA_VIEW}`
+        WHERE isValidoMetodologiaANTAQ = 1
+        """
+
+
+def _qualify(table, project: str, dataset: str) -> str:
+    return ".".join((table.catalog or project, table.db or dataset, table.name))
+
+
+def source_tables(client, table: str = CARGA_VIEW, depth: int = 3) -> List[str]:
+    """
+    Base tables behind a view (views report no modification time).
+
+    DATA_SOURCE_TABLES (comma-separated) replaces the discovery from the view
+    definition.
+
+    Args:
+        client: google.cloud.bigquery.Client
+        table: Table or view reference ("project.dataset.table")
+        depth: Maximum nesting of views to follow
+
+    Returns:
+        Sorted list of table references
+    """
+    configured = os.getenv("DATA_SOURCE_TABLES")
+    if configured:
+        return sorted(t.strip() for t in configured.split(",") if t.strip())
+
+    import sqlglot
+    from sqlglot import exp
+
+    definition = client.get_table(table)
+    if definition.table_type != "VIEW" or depth <= 0:
+        return [table]
+
+    project, dataset = table.split(".")[:2]
+    tables = set()
+    for tree in sqlglot.parse(definition.view_query or "", read="bigquery"):
+        if tree is None:
+            continue
+        ctes = {cte.alias_or_name for cte in tree.find_all(exp.CTE)}
+        for ref in tree.find_all(exp.Table):
+            if ref.name in ctes and not ref.args.get("db"):
+                continue
+            tables.update(source_tables(client, _qualify(ref, project, dataset), depth - 1))
+    return sorted(tables)
+
+
+def source_modified(client, tables: List[str]) -> Optional[int]:
+    """
+    Last modification time (epoch seconds) of a set of tables, from metadata.
+
+    Args:
+        client: google.cloud.bigquery.Client
+        tables: Table references
+
+    Returns:
+        Latest modification time, or None when no table reports one
+    """
+    modified = [client.get_table(table).modified for table in tables]
+    modified = [value for value in modified if value is not None]
+    return int(max(modified).timestamp()) if modified else None
+
+
+def _periodo_version(periodo: Any) -> Optional[str]:
+    if periodo is None:
+        return None
+    periodo = int(periodo)
+    return f"{periodo // 100:04d}-{periodo % 100:02d}"
+
+
+def replica_data_version(data_dir: str) -> Optional[str]:
+    """
+    Data version of the local replica, from its sync manifest (no query).
+
+    The latest month is suffixed with the last sync time, so re-synced
+    revisions of recent months also change the version.
+
+    Args:
+        data_dir: Replica directory
+
+    Returns:
+        Version string ("YYYY-MM+<sync time>") or None without a manifest
+    """
+    from .replica import MANIFEST_NAME, PARTITIONED_TABLE
+
+    try:
+        with open(os.path.join(data_dir, MANIFEST_NAME), encoding="utf-8") as f:
+            state = json.load(f).get("tables", {}).get(PARTITIONED_TABLE, {})
+    except (OSError, ValueError):
+        return None
+    partitions = state.get("partitions") or {}
+    if not partitions:
+        return None
+    return f"{max(partitions)}+{int(state.get('synced_at') or 0)}"
+
+
+class DataVersionTracker:
+    """
+    Track the latest published ANTAQ period (e.g. "2025-08").
+
+    The version is re-checked at most every check_interval_seconds. After the
+    first check, refreshes happen in a background thread and callers keep the
+    previous version meanwhile (stale-while-revalidate). On BigQuery, a check
+    only queries the view when its base tables were modified since the last
+    one, and the modification time is part of the version, so revisions of
+    published months also change it.
+    """
+
+    def __init__(
+        self,
+        client,
+        check_interval_seconds: float = 900,
+        fetch_version: Optional[Callable[[], Optional[str]]] = None
+    ):
+        """
+        Initialize the tracker.
+
+        Args:
+            client: google.cloud.bigquery.Client used for the version query
+            check_interval_seconds: Minimum time between version checks
+            fetch_version: Optional function returning the version (replaces
+                the BigQuery query, e.g. for the local replica)
+        """
+        self.client = client
+        self.check_interval_seconds = check_interval_seconds
+        self.fetch_version = fetch_version
+        self._version: Optional[str] = None
+        self._checked_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._source_tables: Optional[List[str]] = None
+        self._source_modified: Optional[int] = None
+
+    def _query_version(self) -> Optional[str]:
+        rows = list(self.client.query(version_sql()).result())
+        return _periodo_version(rows[0]["periodo"]) if rows else None
+
+    def _probe_modified(self) -> Optional[int]:
+        """Modification time of the view's base tables, None when unavailable."""
+        try:
+            if self._source_tables is None:
+                self._source_tables = source_tables(self.client)
+            return source_modified(self.client, self._source_tables)
+        except Exception:
+            logging.info("Table metadata unavailable, using the version query", exc_info=True)
+            return None
+
+    def _fetch_version(self) -> Optional[str]:
+        if self.fetch_version is not None:
+            return self.fetch_version()
+        if os.getenv("DATA_WATERMARK_TABLE"):
+            return self._query_version()
+
+        modified = self._probe_modified()
+        if modified is not None and modified == self._source_modified and self._version is not None:
+            return self._version  # Nothing changed since the last check
+
+        version = self._query_version()
+        if version is None or modified is None:
+            return version
+        self._source_modified = modified
+        return f"{version}+{modified}"
+
+    def refresh(self) -> Optional[str]:
+        """
+        Check the latest published period synchronously.
+
+        Returns:
+            Current data version, or the previous one if the check fails
+        """
+        try:
+            version = self._fetch_version()
+        except Exception:
+            logging.warning("Could not check ANTAQ data version", exc_info=True)
+            version = None
+
+        with self._lock:
+            if version is not None:
+                if self._version is not None and version != self._version:
+                    logging.info("New ANTAQ data version: %s -> %s", self._version, version)
+                self._version = version
+            self._checked_at = time.monotonic()
+            self._refreshing = False
+            return self._version
+
+    def peek(self) -> Optional[str]:
+        """Return the last known version without triggering any query."""
+        return self._version
+
+    def current(self) -> Optional[str]:
+        """
+        Get the current data version.
+
+        Blocks only on the very first call; later checks run in background.
+
+        Returns:
+            Data version string (starts with YYYY-MM) or None if unknown
+        """
+        with self._lock:
+            version = self._version
+            due = (
+                self._checked_at is None
+                or (time.monotonic() - self._checked_at) >= self.check_interval_seconds
+            )
+            start_background = due and version is not None and not self._refreshing
+            if start_background:
+                self._refreshing = True
+
+        if version is None and due:
+            return self.refresh()
+
+        if start_background:
+            threading.Thread(
+                target=self.refresh, name="antaq-data-version", daemon=True
+            ).start()
+
+        return version
+
+
+# Tracker per BigQuery client
+_trackers: dict = {}
+_trackers_lock = threading.Lock()
+
+
+def get_data_version_tracker(client) -> DataVersionTracker:
+    """
+    Get the shared DataVersionTracker for a BigQuery client.
+
+    Args:
+        client: google.cloud.bigquery.Client
+
+    Returns:
+        DataVersionTracker instance
+    """
+    with _trackers_lock:
+        tracker = _trackers.get(id(client))
+        if tracker is None:
+            tracker = DataVersionTracker(
+                client,
+                check_interval_seconds=float(os.getenv("DATA_VERSION_CHECK_SECONDS", "900")),
+            )
+            _trackers[id(client)] = tracker
+        return tracker
+
+
+class FreshnessService:
+    """
+    Data version and latest published period for a query backend.
+
+    BigQuery backends share the tracker used by the result cache, so showing
+    the latest period costs no query of its own; other backends use the
+    replica manifest, or the version query when there is none.
+    """
+
+    def __init__(self, backend, check_interval_seconds: Optional[float] = None):
+        """
+        Initialize the service.
+
+        Args:
+            backend: QueryBackend
+            check_interval_seconds: Minimum time between version checks
+                (default: DATA_VERSION_CHECK_SECONDS)
+        """
+        from .client import BigQueryClient
+
+        self.backend = backend
+        if isinstance(backend, BigQueryClient):
+            self.tracker = get_data_version_tracker(backend.client)
+        else:
+            if check_interval_seconds is None:
+                check_interval_seconds = float(os.getenv("DATA_VERSION_CHECK_SECONDS", "900"))
+            self.tracker = DataVersionTracker(
+                None, check_interval_seconds, fetch_version=self._fetch_backend_version
+            )
+
+    def _fetch_backend_version(self) -> Optional[str]:
+        data_dir = getattr(self.backend, "data_dir", None)
+        version = replica_data_version(data_dir) if data_dir else None
+        if version is None:
+            rows = self.backend.query(version_sql())
+            version = _periodo_version(rows[0]["periodo"]) if rows else None
+        return version
+
+    def data_version(self) -> Optional[str]:
+        """
+        Current data version token (starts with the latest period, YYYY-MM).
+
+        Returns:
+            Version string or None if unknown
+        """
+        return self.tracker.current()
+
+    def latest_period(self) -> Optional[Dict[str, Any]]:
+        """
+        Latest published period.
+
+        Returns:
+            Dict with 'ano', 'mes', 'mes_nome' and 'versao', or None if unknown
+        """
+        version = self.data_version()
+        if not version:
+            return None
+        ano, mes = int(version[:4]), int(version[5:7])
+        return {"ano": ano, "mes": mes, "mes_nome": MESES[mes - 1], "versao": version}
+
+
+# Service per query backend
+_services: dict = {}
+_services_lock = threading.Lock()
+
+
+def get_freshness_service(backend=None) -> FreshnessService:
+    """
+    Get the shared FreshnessService of a query backend.
+
+    Args:
+        backend: QueryBackend (default: get_query_backend())
+
+    Returns:
+        FreshnessService instance
+    """
+    if backend is None:
+        from .backend import get_query_backend
+        backend = get_query_backend()
+    with _services_lock:
+        service = _services.get(id(backend))
+        if service is None:
+            service = FreshnessService(backend)
+            _services[id(backend)] = service
+        return service
@@ -0,0 +1,278 @@
+"""
+Async execution engine for BigQuery query jobs.
+
+Waiting on QueryJob.result() in a thread holds that thread for the whole job.
+The engine instead submits the job, polls its state with short API calls from a
+small dedicated thread pool and sleeps on the event loop in between, so many
+concurrent queries share a handful of threads. Every call has a deadline, and
+jobs that time out, are cancelled by the caller or are superseded by a newer
+query with the same key are cancelled on BigQuery so they stop using slots.
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+
+class QueryTimeoutError(RuntimeError):
+    """Raised when a query job exceeds its deadline (the job is cancelled)."""
+
+
+class QueryCancelledError(RuntimeError):
+    """Raised when a query job is superseded by a newer query with the same key."""
+
+
+class BigQueryJobEngine:
+    """
+    Submit, poll and cancel BigQuery query jobs without blocking threads.
+    """
+
+    def __init__(
+        self,
+        client,
+        max_workers: int = 8,
+        default_timeout: Optional[float] = 120,
+        poll_interval: float = 0.2,
+        max_poll_interval: float = 2.0,
+        storage_api_min_rows: int = 5000
+    ):
+        """
+        Initialize the engine.
+
+        Args:
+            client: google.cloud.bigquery.Client
+            max_workers: Threads used for BigQuery API calls
+            default_timeout: Deadline in seconds when run() gets none (None = no deadline)
+            poll_interval: First delay between job state checks
+            max_poll_interval: Upper bound of the (exponential) polling delay
+            storage_api_min_rows: Arrow results with at least this many rows are
+                downloaded with the BigQuery Storage Read API instead of REST pages
+        """
+        self.client = client
+        self.default_timeout = default_timeout
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.storage_api_min_rows = storage_api_min_rows
+        self._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix="bq-jobs")
+        self._active: Dict[Hashable, Any] = {}
+        self._superseded: set = set()
+        self._lock = threading.Lock()
+
+    async def run_sync(self, fn: Callable[..., Any], *args) -> Any:
+        """
+        Run a short blocking call (API request) on the engine's thread pool.
+
+        Args:
+            fn: Function to call
+            *args: Positional arguments
+
+        Returns:
+            Function result
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, fn, *args)
+
+    async def submit(self, sql: str, job_config=None):
+        """
+        Start a query job and return without waiting for it.
+
+        Args:
+            sql: SQL query string
+            job_config: Optional QueryJobConfig
+
+        Returns:
+            google.cloud.bigquery.QueryJob
+        """
+        return await self.run_sync(lambda: self.client.query(sql, job_config=job_config))
+
+    async def is_done(self, job) -> bool:
+        """Refresh the job state with one API call and report whether it finished."""
+        await self.run_sync(job.reload)
+        return job.state == "DONE"
+
+    async def fetch_rows(self, job, timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Download the rows of a finished job.
+
+        Args:
+            job: Finished QueryJob
+            timeout: Optional timeout for the download
+
+        Returns:
+            List of dictionaries representing rows
+        """
+        return await self.run_sync(lambda: [dict(row) for row in job.result(timeout=timeout)])
+
+    def to_arrow(self, job, timeout: Optional[float] = None):
+        """
+        Download the result of a finished job as a pyarrow.Table (blocking).
+
+        Small results reuse the first REST page; large ones are streamed with
+        the Storage Read API (falls back to REST when google-cloud-bigquery-storage
+        is not installed).
+
+        Args:
+            job: Finished QueryJob
+            timeout: Optional timeout for the first page
+
+        Returns:
+            pyarrow.Table
+        """
+        rows = job.result(timeout=timeout)
+        if (rows.total_rows or 0) < self.storage_api_min_rows:
+            return rows.to_arrow(create_bqstorage_client=False)
+        # Shared Storage Read client instead of a new gRPC channel per download
+        from .client_registry import get_client_registry
+        storage_client = get_client_registry().get_storage_client(self.client)
+        if storage_client is None:
+            return rows.to_arrow(create_bqstorage_client=False)
+        return rows.to_arrow(bqstorage_client=storage_client)
+
+    async def fetch_arrow(self, job, timeout: Optional[float] = None):
+        """
+        Download the result of a finished job as a pyarrow.Table.
+
+        Args:
+            job: Finished QueryJob
+            timeout: Optional timeout for the first page
+
+        Returns:
+            pyarrow.Table
+        """
+        return await self.run_sync(self.to_arrow, job, timeout)
+
+    async def cancel(self, job) -> bool:
+        """
+        Request cancellation of a job on BigQuery.
+
+        Args:
+            job: QueryJob to cancel
+
+        Returns:
+            True if the cancel request was accepted
+        """
+        try:
+            cancelled = await self.run_sync(job.cancel)
+            logging.info("Cancelled BigQuery job %s", job.job_id)
+            return bool(cancelled)
+        except Exception:
+            logging.warning("Could not cancel BigQuery job %s", job.job_id, exc_info=True)
+            return False
+
+    def _cancel_in_background(self, job) -> None:
+        """Cancel a job without awaiting (used while the caller is being cancelled)."""
+        def _cancel():
+            try:
+                job.cancel()
+                logging.info("Cancelled BigQuery job %s", job.job_id)
+            except Exception:
+                logging.warning("Could not cancel BigQuery job %s", job.job_id, exc_info=True)
+
+        self._executor.submit(_cancel)
+
+    def _register(self, key: Optional[Hashable], job) -> None:
+        if key is None:
+            return
+        with self._lock:
+            previous = self._active.get(key)
+            self._active[key] = job
+            if previous is not None:
+                self._superseded.add(previous.job_id)
+        if previous is not None:
+            logging.info("BigQuery job %s superseded by %s", previous.job_id, job.job_id)
+            self._cancel_in_background(previous)
+
+    def _unregister(self, key: Optional[Hashable], job) -> None:
+        with self._lock:
+            if key is not None and self._active.get(key) is job:
+                del self._active[key]
+            self._superseded.discard(job.job_id)
+
+    def _was_superseded(self, job) -> bool:
+        with self._lock:
+            return job.job_id in self._superseded
+
+    async def run(
+        self,
+        sql: str,
+        job_config=None,
+        timeout: Optional[float] = None,
+        key: Optional[Hashable] = None,
+        result_format: str = "rows"
+    ) -> Any:
+        """
+        Run a query job to completion with a deadline.
+
+        Args:
+            sql: SQL query string
+            job_config: Optional QueryJobConfig
+            timeout: Deadline in seconds (defaults to default_timeout)
+            key: Optional owner of the job (e.g. conversation thread); a newer
+                query with the same key cancels this one
+            result_format: "rows" (list of dictionaries) or "arrow" (pyarrow.Table)
+
+        Returns:
+            Query result in the requested format
+
+        Raises:
+            QueryTimeoutError: Deadline exceeded (the job was cancelled)
+            QueryCancelledError: Superseded by a newer query with the same key
+            RuntimeError: The job failed
+        """
+        timeout = self.default_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout if timeout else None
+
+        job = await self.submit(sql, job_config)
+        self._register(key, job)
+        try:
+            delay = self.poll_interval
+            while not await self.is_done(job):
+                if deadline is not None and time.monotonic() + delay > deadline:
+                    await self.cancel(job)
+                    raise QueryTimeoutError(f"Query exceeded the {timeout:.0f}s deadline and was cancelled")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_poll_interval)
+
+            if job.error_result:
+                if self._was_superseded(job):
+                    # Clearer than BigQuery's "Job execution was cancelled"
+                    raise QueryCancelledError("Query was superseded by a newer question")
+                raise RuntimeError(job.error_result.get("message", "Query job failed"))
+
+            remaining = None if deadline is None else max(1.0, deadline - time.monotonic())
+            if result_format == "arrow":
+                return await self.fetch_arrow(job, timeout=remaining)
+            return await self.fetch_rows(job, timeout=remaining)
+
+        except asyncio.CancelledError:
+            # Caller went away (turn superseded, Streamlit rerun): free the slots
+            self._cancel_in_background(job)
+            raise
+        finally:
+            self._unregister(key, job)
+
+    def shutdown(self, wait: bool = False) -> None:
+        """Stop the thread pool (pending API calls, e.g. cancellations, still run)."""
+        self._executor.shutdown(wait=wait)
+
+
+def create_job_engine_from_env(client) -> BigQueryJobEngine:
+    """
+    Build the job engine from environment settings.
+
+    Args:
+        client: google.cloud.bigquery.Client
+
+    Returns:
+        BigQueryJobEngine instance
+    """
+    timeout = os.getenv("BQ_QUERY_TIMEOUT_SECONDS", "120")
+    return BigQueryJobEngine(
+        client,
+        max_workers=int(os.getenv("BQ_JOB_WORKERS", "8")),
+        default_timeout=float(timeout) if timeout else None,
+        storage_api_min_rows=int(os.getenv("BQ_STORAGE_API_MIN_ROWS", "5000")),
+    )
@@ -0,0 +1,339 @@
+"""
+Live overview queries on v_carga_metodologia_oficial.
+
+When the month is not in the cargo cube, the overview tab used to run six
+queries one after the other (totals of the month, totals of the same month of
+the previous year, top exported and imported commodities, top destinations
+and the UF of the port). The first five share the same filters and only
+differ in grouping, so they are answered by a single scan with GROUPING SETS
+over both years; the UF lookup uses other filters and runs concurrently with
+it.
+
+Overview results are also cached process-wide (OverviewCache), so every
+session looking at the same port and month shares one fetch.
+"""
+import asyncio
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from ..utils.cache import DiskCache, LRUCache
+from .cube import OVERVIEW_TIPOS_OPERACAO
+from .replica import DATASET, PARTITIONED_TABLE
+
+
+# Value of GROUPING(...) -> section of the combined query
+_SECTION_SQL = (
+    "CASE WHEN GROUPING(c.cdmercadoria) = 0 THEN 'mercadoria' "
+    "WHEN GROUPING(c.destino) = 0 THEN 'destino' ELSE 'sentido' END"
+)
+
+
+def _porto_filter(porto: str) -> str:
+    if porto == "Brasil":
+        return "1=1"
+    escaped = porto.lower().replace("\\", "\\\\").replace("'", "\\'")
+    return f"LOWER(c.porto_atracacao) LIKE '%{escaped}%'"
+
+
+def overview_sql(porto: str, ano: int, mes: int, dataset: str = DATASET) -> str:
+    """
+    Single-scan SQL with every overview section of a month and of the same month a year earlier.
+
+    Rows carry a secao column: 'sentido' (totals by ano and sentido),
+    'mercadoria' (by ano, sentido and cdmercadoria) or 'destino' (by ano,
+    sentido and destino).
+
+    Args:
+        porto: Port name or "Brasil" for the whole country
+        ano: Year
+        mes: Month (1-12)
+        dataset: Source dataset ("project.dataset")
+
+    Returns:
+        SQL string (BigQuery dialect)
+    """
+    tipos = ", ".join(f"'{tipo}'" for tipo in OVERVIEW_TIPOS_OPERACAO)
+    return f"""
+    SELECT {_SECTION_SQL} AS secao,
+           c.ano, c.sentido, c.cdmercadoria, c.destino,
+           SUM(c.vlpesocargabruta_oficial) AS carga_total
+    FROM `{dataset}.{PARTITIONED_TABLE}` c
+    WHERE c.isValidoMetodologiaANTAQ = 1
+      AND c.vlpesocargabruta_oficial > 0
+      AND LOWER(c.tipo_operacao_da_carga) IN ({tipos})
+      AND c.ano IN ({int(ano)}, {int(ano) - 1})
+      AND c.mes = {int(mes)}
+      AND {_porto_filter(porto)}
+    GROUP BY GROUPING SETS (
+      (c.ano, c.sentido),
+      (c.ano, c.sentido, c.cdmercadoria),
+      (c.ano, c.sentido, c.destino)
+    )
+    """
+
+
+def uf_sql(porto: str, ano: int, dataset: str = DATASET) -> str:
+    """
+    SQL with the UF of a port (any operation of the year).
+
+    Args:
+        porto: Port name
+        ano: Year
+        dataset: Source dataset ("project.dataset")
+
+    Returns:
+        SQL string (BigQuery dialect)
+    """
+    return f"""
+    SELECT DISTINCT c.uf
+    FROM `{dataset}.{PARTITIONED_TABLE}` c
+    WHERE {_porto_filter(porto)}
+      AND c.ano = {int(ano)}
+      AND c.isValidoMetodologiaANTAQ = 1
+    LIMIT 1
+    """
+
+
+def split_overview_sections(table, ano: int) -> Dict[str, Any]:
+    """
+    Split the combined result into the overview sections.
+
+    Args:
+        table: pyarrow.Table returned by overview_sql
+        ano: Year of the overview (the other year is the comparison)
+
+    Returns:
+        Dictionary of DataFrames (resultado_atual, resultado_anterior,
+        mercadorias_exp, mercadorias_imp, destinos), same columns and order
+        as the individual queries
+    """
+    frame = table.to_pandas()
+    frame["ano"] = frame["ano"].astype(int)
+
+    def section(secao: str, ano_secao: int, sentido: Optional[str] = None):
+        rows = frame[(frame["secao"] == secao) & (frame["ano"] == ano_secao)]
+        if sentido is not None:
+            rows = rows[rows["sentido"] == sentido]
+        return rows
+
+    def top(rows, column: str, limit: int = 5):
+        rows = rows.sort_values("carga_total", ascending=False, kind="stable").head(limit)
+        return rows[[column, "carga_total"]].reset_index(drop=True)
+
+    destinos = section("destino", ano, "Embarcados").copy()
+    destinos["destino"] = destinos["destino"].fillna("Não informado")
+
+    return {
+        "resultado_atual": section("sentido", ano)[["sentido", "carga_total"]].reset_index(drop=True),
+        "resultado_anterior": section("sentido", ano - 1)[["sentido", "carga_total"]].reset_index(drop=True),
+        "mercadorias_exp": top(section("mercadoria", ano, "Embarcados"), "cdmercadoria"),
+        "mercadorias_imp": top(section("mercadoria", ano, "Desembarcados"), "cdmercadoria"),
+        "destinos": top(destinos, "destino"),
+    }
+
+
+async def aquery_overview_sections(backend, porto: str, ano: int, mes: int) -> Dict[str, Any]:
+    """
+    Query the overview sections on the view: one scan plus the concurrent UF lookup.
+
+    Args:
+        backend: QueryBackend
+        porto: Port name or "Brasil" for the whole country
+        ano: Year
+        mes: Month (1-12)
+
+    Returns:
+        Dictionary of DataFrames (see split_overview_sections) and uf
+    """
+    is_brasil = porto == "Brasil"
+    queries = [backend.aquery_arrow(overview_sql(porto, ano, mes))]
+    if not is_brasil:
+        queries.append(backend.aquery_arrow(uf_sql(porto, ano)))
+    results = await asyncio.gather(*queries)
+
+    sections = split_overview_sections(results[0], ano)
+    if is_brasil:
+        sections["uf"] = "BR"
+    else:
+        ufs = results[1].column("uf").to_pylist() if results[1].num_rows else []
+        sections["uf"] = ufs[0] if ufs else "SP"
+    return sections
+
+
+def query_overview_sections(backend, porto: str, ano: int, mes: int) -> Dict[str, Any]:
+    """Blocking version of aquery_overview_sections (Streamlit callbacks)."""
+    return asyncio.run(aquery_overview_sections(backend, porto, ano, mes))
+
+
+class OverviewCache:
+    """
+    Process-wide cache of overview results keyed on (porto, ano, mes).
+
+    Entries are tagged with the data version (latest published ANTAQ period)
+    and are misses once a new month is published. Concurrent requests for the
+    same key wait for a single fetch.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 64,
+        ttl_seconds: Optional[float] = None,
+        disk_dir: Optional[str] = None
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            max_size: Maximum number of overviews kept in memory
+            ttl_seconds: Optional entry lifetime (bounds staleness when the
+                data version is unknown)
+            disk_dir: Optional directory for a persistent tier shared by processes
+        """
+        self.ttl_seconds = ttl_seconds
+        self._memory = LRUCache(max_size=max_size, ttl_seconds=ttl_seconds)
+        self._disk = DiskCache(disk_dir, max_entries=max_size * 4) if disk_dir else None
+        self._locks: Dict[Hashable, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    @staticmethod
+    def _key(porto: str, ano: int, mes: int) -> Hashable:
+        return ("overview", porto, int(ano), int(mes))
+
+    def get(self, porto: str, ano: int, mes: int, version: Optional[str]) -> Optional[Dict[str, Any]]:
+        """
+        Look up an overview computed on the given data version.
+
+        Args:
+            porto: Port name or "Brasil"
+            ano: Year
+            mes: Month (1-12)
+            version: Current data version
+
+        Returns:
+            Overview data, or None on miss
+        """
+        key = self._key(porto, ano, mes)
+        entry = self._memory.get(key)
+        if entry is None and self._disk is not None:
+            entry = self._disk.get(key)
+            if entry is not None:
+                self._memory.set(key, entry)
+        if entry is None:
+            return None
+        expired = self.ttl_seconds is not None and time.time() - entry["stored_at"] > self.ttl_seconds
+        if expired or entry["version"] != version:
+            self.invalidate(porto, ano, mes)
+            return None
+        return entry["data"]
+
+    def set(self, porto: str, ano: int, mes: int, version: Optional[str], data: Dict[str, Any]) -> None:
+        """
+        Store an overview.
+
+        Args:
+            porto: Port name or "Brasil"
+            ano: Year
+            mes: Month (1-12)
+            version: Data version the overview was computed on
+            data: Overview data
+        """
+        key = self._key(porto, ano, mes)
+        entry = {"version": version, "data": data, "stored_at": time.time()}
+        self._memory.set(key, entry)
+        if self._disk is not None:
+            self._disk.set(key, entry)
+
+    def get_or_fetch(
+        self,
+        porto: str,
+        ano: int,
+        mes: int,
+        version: Optional[str],
+        fetch: Callable[[], Optional[Dict[str, Any]]]
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Cached overview, fetching it once on miss.
+
+        Args:
+            porto: Port name or "Brasil"
+            ano: Year
+            mes: Month (1-12)
+            version: Current data version
+            fetch: Computes the overview (None results are not cached)
+
+        Returns:
+            Overview data or None
+        """
+        data = self.get(porto, ano, mes, version)
+        if data is not None:
+            return data
+
+        key = self._key(porto, ano, mes)
+        with self._locks_guard:
+            lock = self._locks.setdefault(key, threading.Lock())
+        with lock:
+            # Another session may have fetched it while we waited
+            data = self.get(porto, ano, mes, version)
+            if data is None:
+                data = fetch()
+                if data is not None:
+                    self.set(porto, ano, mes, version, data)
+        with self._locks_guard:
+            if not lock.locked():
+                self._locks.pop(key, None)
+        return data
+
+    def invalidate(self, porto: str, ano: int, mes: int) -> None:
+        """Remove an overview from both tiers."""
+        key = self._key(porto, ano, mes)
+        self._memory.pop(key)
+        if self._disk is not None:
+            self._disk.pop(key)
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        self._memory.clear()
+        if self._disk is not None:
+            self._disk.clear()
+
+
+# Singleton instance
+_overview_cache: Optional[OverviewCache] = None
+
+
+def get_overview_cache() -> Optional[OverviewCache]:
+    """
+    Get the process-wide overview cache configured from environment.
+
+    Returns:
+        OverviewCache instance, or None when OVERVIEW_CACHE_ENABLED=false
+    """
+    global _overview_cache
+
+    if os.getenv("OVERVIEW_CACHE_ENABLED", "true").lower() != "true":
+        return None
+
+    if _overview_cache is None:
+        ttl = os.getenv("OVERVIEW_CACHE_TTL_SECONDS", "86400")
+        _overview_cache = OverviewCache(
+            max_size=int(os.getenv("OVERVIEW_CACHE_MAX_SIZE", "64")),
+            ttl_seconds=float(ttl) if ttl else None,
+            disk_dir=os.getenv("OVERVIEW_CACHE_DIR") or None,
+        )
+    return _overview_cache
+
+
+def overview_data_version(backend) -> Optional[str]:
+    """
+    Data version used to tag overview results.
+
+    Args:
+        backend: QueryBackend serving the overview
+
+    Returns:
+        Data version token (see FreshnessService), None when unknown
+    """
+    from .freshness import get_freshness_service
+    return get_freshness_service(backend).data_version()
@@ -3,139 +3,105 @@ Helper functions for querying referential data tables
 Used to enrich query results with friendly names from reference tables
 """
 import os
-import re
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, List, Tuple
+import numpy as np
 import pandas as pd
 
+from .backend import QueryBackend, get_query_backend
+from .dimension_cache import create_dimension_cache_from_env
+from .unlocode import get_unlocode_index
 
-# Mapeamento manual de portos internacionais UN/LOCODE mais comuns
-# Formato: código: (cidade, uf, país)
-INTERNATIONAL_PORTS = {
-    # Ásia - China
-    "CNNGB": ("Ningbo", "", "China"),
-    "CNSHA": ("Xangai", "", "China"),
-    "CNQDG": ("Qingdao", "", "China"),
-    "CNTAO": ("Tianjin", "", "China"),
-    "CNCXD": ("Xingang", "", "China"),
-    "CNSZX": ("Shenzhen", "", "China"),
-    "CNNDG": ("Nansha", "", "China"),
-    "CNXMN": ("Xiamen", "", "China"),
-    "CNQIN": ("Qinhuangdao", "", "China"),
-    "CNZZZ": ("China", "", "China"),
-    # Ásia - Outros
-    "SGSIN": ("Singapura", "", "Singapura"),
-    "JPTYO": ("Tóquio", "", "Japão"),
-    "JPOSA": ("Osaka", "", "Japão"),
-    "JPNGS": ("Nagoya", "", "Japão"),
-    "HKHKG": ("Hong Kong", "", "Hong Kong"),
-    "KRPUS": ("Busan (Pusan)", "", "Coreia do Sul"),
-    "KANIN": ("Incheon", "", "Coreia do Sul"),
-    "KRPUS": ("Busan", "", "Coreia do Sul"),
-    "VNCLI": ("Cat Lai", "", "Vietnã"),
-    "VNXXX": ("Vietnã", "", "Vietnã"),
-    "VNZZZ": ("Vietnã", "", "Vietnã"),
-    "THBKK": ("Bangkok", "", "Tailândia"),
-    "IDLHG": ("Jakarta", "", "Indonésia"),
-    "IDJKT": ("Jacarta", "", "Indonésia"),
-    "IDSUB": ("Surabaya", "", "Indonésia"),
-    "MYPKG": ("Port Klang", "", "Malásia"),
-    "MYSUB": ("Subang", "", "Malásia"),
-    "PHPHI": ("Filipinas", "", "Filipinas"),
-    "PHMNL": ("Manila", "", "Filipinas"),
-    "BDCGP": ("Batangas", "", "Filipinas"),
-    "INNSA": ("Nhava Sheva", "", "Índia"),
-    "INMUN": ("Mundra", "", "Índia"),
-    # Europa
-    "NLRTM": ("Roterdã", "", "Países Baixos"),
-    "NLXXX": ("Países Baixos", "", "Países Baixos"),
-    "DEHAM": ("Hamburgo", "", "Alemanha"),
-    "DEBRE": ("Bremerhaven", "", "Alemanha"),
-    "DEBRV": ("Brêmea", "", "Alemanha"),
-    "BEANR": ("Antuérpia", "", "Bélgica"),
-    "BEBRU": ("Bruxelas", "", "Bélgica"),
-    "FRLEH": ("Le Havre", "", "França"),
-    "FRMRS": ("Marselha", "", "França"),
-    "ESZZZ": ("Espanha", "", "Espanha"),
-    "ESALG": ("Algeciras", "", "Espanha"),
-    "ESBCN": ("Barcelona", "", "Espanha"),
-    "ESVLC": ("Valência", "", "Espanha"),
-    "ESTAR": ("Tarragona", "", "Espanha"),
-    "ITGOA": ("Gênova", "", "Itália"),
-    "ITTRI": ("Trieste", "", "Itália"),
-    "ITLIO": ("Livorno", "", "Itália"),
-    "GRPIR": ("Pireu", "", "Grécia"),
-    "GBLGP": ("London Gateway", "", "Reino Unido"),
-    "GBFXT": ("Felixstowe", "", "Reino Unido"),
-    "GBSOU": ("Southampton", "", "Reino Unido"),
-    "PTLIS": ("Lisboa", "", "Portugal"),
-    "PTSIN": ("Sines", "", "Portugal"),
-    # Oriente Médio
-    "AEDXB": ("Dubai", "", "Emirados Árabes"),
-    "AEAUH": ("Abu Dhabi", "", "Emirados Árabes"),
-    "AEJEA": ("Jebel Ali", "", "Emirados Árabes"),
-    "QAMCT": ("Doha", "", "Catar"),
-    "OMSLL": ("Salalah", "", "Omã"),
-    "OMSAL": ("Salalah", "", "Omã"),
-    "IRBKM": ("Khorramshahr", "", "Irã"),
-    "IRBND": ("Bandar Abbas", "", "Irã"),
-    "IRAMM": ("Bandar Imam", "", "Irã"),
-    "PKKHI": ("Karachi", "", "Paquistão"),
-    "PKKET": ("Karachi", "", "Paquistão"),
-    "SAJED": ("Jeddah", "", "Arábia Saudita"),
-    "SADMM": ("Dammam", "", "Arábia Saudita"),
-    # Américas - EUA
-    "USNYC": ("Nova York", "NY", "Estados Unidos"),
-    "USLAX": ("Los Angeles", "CA", "Estados Unidos"),
-    "USHOU": ("Houston", "TX", "Estados Unidos"),
-    "USSAV": ("Savannah", "GA", "Estados Unidos"),
-    "USMIA": ("Miami", "FL", "Estados Unidos"),
-    "USCHS": ("Charleston", "SC", "Estados Unidos"),
-    "USSEA": ("Seattle", "WA", "Estados Unidos"),
-    "USMSY": ("Nova Orleans", "LA", "Estados Unidos"),
-    "USORF": ("Norfolk", "VA", "Estados Unidos"),
-    "USMOB": ("Mobile", "AL", "Estados Unidos"),
-    "USBAL": ("Baltimore", "MD", "Estados Unidos"),
-    "USBOS": ("Boston", "MA", "Estados Unidos"),
-    "USCHI": ("Chicago", "IL", "Estados Unidos"),
-    "USDAL": ("Dallas", "TX", "Estados Unidos"),
-    "USDET": ("Detroit", "MI", "Estados Unidos"),
-    "USJAX": ("Jacksonville", "FL", "Estados Unidos"),
-    "USLBE": ("Long Beach", "CA", "Estados Unidos"),
-    "USNWK": ("Newark", "NJ", "Estados Unidos"),
-    "USOAK": ("Oakland", "CA", "Estados Unidos"),
-    "USPHL": ("Philadelphia", "PA", "Estados Unidos"),
-    "USTPA": ("Tampa", "FL", "Estados Unidos"),
-    "USZZZ": ("Estados Unidos", "", "Estados Unidos"),
-    # Américas - Canadá
-    "CAYVR": ("Vancouver", "BC", "Canadá"),
-    "CAMTR": ("Montreal", "QC", "Canadá"),
-    "CATOR": ("Toronto", "ON", "Canadá"),
-    "CAHAL": ("Halifax", "NS", "Canadá"),
-    # Américas - Brasil
-    "BRSSZ": ("São Sebastião", "SP", "Brasil"),
-    "BRRIO": ("Rio de Janeiro", "RJ", "Brasil"),
-    "BRFOR": ("Fortaleza", "CE", "Brasil"),
-    "BRADR": ("Brasil (Outros)", "", "Brasil"),
-    # América do Sul
-    "ARBUE": ("Buenos Aires", "", "Argentina"),
-    "CLCLI": ("Callao", "", "Peru"),
-    "CLVAP": ("Valparaíso", "", "Chile"),
-    "PECLL": ("Callao", "", "Peru"),
-    "ECGYE": ("Guayaquil", "", "Equador"),
-    "COCTG": ("Cartagena", "", "Colômbia"),
-    # África
-    "ZADUR": ("Durban", "", "África do Sul"),
-    "ZACPT": ("Cidade do Cabo", "", "África do Sul"),
-    "EGALY": ("Alexandria", "", "Egito"),
-    "EGZZZ": ("Egito", "", "Egito"),
-    # Oceania
-    "AUSYD": ("Sydney", "NSW", "Austrália"),
-    "AUMEL": ("Melbourne", "VIC", "Austrália"),
-    "NZAKL": ("Auckland", "", "Nova Zelândia"),
-    # Códigos genéricos/ZZZ
-    "XXXZZ": ("Outros", "", "Desconhecido"),
-    "ZZZZZ": ("Desconhecido", "", "Desconhecido"),
-}
+
+# mercadoria_carga columns, in the order they are tried for a display name
+MERCADORIA_CODE_COLUMNS = ("cd_mercadoria", "cdmercadoria", "string_field_0")
+MERCADORIA_NAME_COLUMNS = (
+    "nomenclatura_simplificada",
+    "mercadoria",
+    "mercadoria_nome",
+    "descricao_mercadoria",
+    "descricao",
+    "mercadoria_descricao",
+    "ncm_descricao",
+    "ncm",
+)
+MERCADORIA_GROUP_COLUMNS = ("grupo_mercadoria", "string_field_3")
+
+# Values that are codes, not names (avoid showing them as names)
+_CODE_LIKE_PATTERN = r"^[0-9.\- /]+$"
+
+
+def _clean_column(values: pd.Series) -> pd.Series:
+    """Column as stripped strings, with missing values, "nan" and "none" as ""."""
+    text = values.astype("string").str.strip().fillna("")
+    return text.mask(text.str.lower().isin(["nan", "none"]), "")
+
+
+def resolve_mercadoria_names(frame: pd.DataFrame, code_column: str) -> Dict[str, str]:
+    """
+    Best display name of every commodity code of a mercadoria_carga frame.
+
+    Works on whole columns instead of row by row. For each code, in order:
+    the first name column (MERCADORIA_NAME_COLUMNS) with a value that is not
+    the code and does not look like one; else the shortest such value among
+    the other descriptive columns; else the group column; else the code.
+
+    Args:
+        frame: Rows of mercadoria_carga
+        code_column: Column with the commodity codes
+
+    Returns:
+        Dictionary code -> name (the first row of a repeated code wins)
+    """
+    if code_column not in frame.columns:
+        return {}
+    codes = _clean_column(frame[code_column])
+    keep = ((codes != "") & ~codes.duplicated()).to_numpy(dtype=bool)
+    if not keep.any():
+        return {}
+    frame = frame[keep]
+    codes = codes[keep].to_numpy(dtype=object)
+    names = codes.copy()
+    resolved = np.zeros(len(names), dtype=bool)
+
+    cleaned: Dict[str, np.ndarray] = {}
+    valid: Dict[str, np.ndarray] = {}
+    for column in frame.columns:
+        text = _clean_column(frame[column])
+        code_like = ((text.str.len() <= 2) | text.str.match(_CODE_LIKE_PATTERN)).to_numpy(dtype=bool)
+        cleaned[column] = text.to_numpy(dtype=object)
+        valid[column] = (cleaned[column] != codes) & ~code_like
+
+    for column in MERCADORIA_NAME_COLUMNS:
+        if column in cleaned:
+            take = valid[column] & ~resolved
+            names[take] = cleaned[column][take]
+            resolved |= take
+
+    # Shortest descriptive value of any other column (the first one on ties)
+    others = [
+        column for column in frame.columns
+        if column not in MERCADORIA_CODE_COLUMNS and "container" not in str(column)
+    ]
+    pending = ~resolved
+    if others and pending.any():
+        lengths = np.stack([
+            np.where(valid[column], [len(value) for value in cleaned[column]], np.inf)
+            for column in others
+        ])
+        shortest = lengths.argmin(axis=0)
+        take = pending & np.isfinite(lengths.min(axis=0))
+        rows = np.flatnonzero(take)
+        candidates = np.stack([cleaned[column] for column in others])
+        names[rows] = candidates[shortest[rows], rows]
+        resolved |= take
+
+    for column in MERCADORIA_GROUP_COLUMNS:
+        if column in cleaned:
+            take = (cleaned[column] != "") & ~resolved
+            names[take] = cleaned[column][take]
+            resolved |= take
+
+    return dict(zip(codes.tolist(), names.tolist()))
 
 
 class ReferentialHelper:
@@ -149,89 +115,95 @@ class ReferentialHelper:
         Initialize the helper
 
         Args:
-            client: BigQuery client (optional, will create if not provided)
+            client: QueryBackend or google.cloud.bigquery.Client (optional,
+                defaults to the backend selected by QUERY_BACKEND)
         """
+        # Local backends (DuckDB) answer lookups from the replica
+        self.backend = None
         if client is None:
-            from google.cloud import bigquery
-            project_id = os.getenv("GOOGLE_CLOUD_PROJECT", "saasimpacto")
-            self.client = bigquery.Client(project=project_id)
-        else:
-            self.client = client
+            client = get_query_backend()
+        if isinstance(client, QueryBackend):
+            if client.dialect == "bigquery":
+                client = client.client
+            else:
+                self.backend = client
+
+        self.client = None if self.backend is not None else client
 
         self.project = os.getenv("GOOGLE_CLOUD_PROJECT", "saasimpacto")
         self.dataset = "antaqdados.br_antaq_estatistico_aquaviario"
-        self.international_ports = INTERNATIONAL_PORTS
-        self._code_like_re = re.compile(r"^[0-9.\- /]+$")
-
-    def _clean_value(self, value: Any) -> str:
-        """Normalize values from BigQuery rows."""
-        if value is None:
-            return ""
-        if isinstance(value, float) and pd.isna(value):
-            return ""
-        text = str(value).strip()
-        if text.lower() in {"nan", "none"}:
-            return ""
-        return text
-
-    def _is_code_like(self, text: str) -> bool:
-        """Heuristic for codes (avoid showing them as names)."""
-        if not text:
-            return True
-        if len(text) <= 2:
-            return True
-        return bool(self._code_like_re.match(text))
-
-    def _pick_best_mercadoria_name(self, row: pd.Series, code: str) -> str:
+        # Foreign ports answered offline from the packaged UN/LOCODE index
+        self.international_ports = get_unlocode_index()
+
+        # Whole reference tables kept in memory (one load per data version)
+        self.dimensions = create_dimension_cache_from_env(self._data_version)
+
+    def _query_df(self, query: str, job_config=None) -> pd.DataFrame:
+        """Run a lookup query on the configured backend as a DataFrame."""
+        if self.backend is not None:
+            return self.backend.query_dataframe(query, job_config)
+        return self.client.query(query, job_config=job_config).to_dataframe()
+
+    def _data_version(self) -> Optional[str]:
+        """Current data version of the configured backend."""
+        if self.backend is not None:
+            from .freshness import get_freshness_service
+            return get_freshness_service(self.backend).data_version()
+        from .freshness import get_data_version_tracker
+        return get_data_version_tracker(self.client).current()
+
+    # --- Dimension cache ------------------------------------------------------------
+
+    def _load_mercadoria_names(self) -> Dict[str, str]:
+        """Best display name of every commodity code in mercadoria_carga."""
+        result = self._query_df(f"SELECT * FROM `{self.dataset}.mercadoria_carga`")
+        code_col = "cd_mercadoria" if "cd_mercadoria" in result.columns else "string_field_0"
+        return resolve_mercadoria_names(result, code_col)
+
+    def _load_location_table(self, table: str, key_columns: List[str]) -> Dict[str, Tuple[str, str, str]]:
         """
-        Pick the best human-readable name for a commodity from a row.
-        Prefers simplified names, then other descriptive fields, then group.
+        Code -> (cidade, uf, pais) of a location table.
+
+        Codes are matched on the key columns in order (the first column that
+        has a code wins, like the per-code lookups).
         """
-        priority_cols = [
-            "nomenclatura_simplificada",
-            "mercadoria",
-            "mercadoria_nome",
-            "descricao_mercadoria",
-            "descricao",
-            "mercadoria_descricao",
-            "ncm_descricao",
+        result = self._query_df(f"SELECT * FROM `{self.dataset}.{table}`")
+        columns = [
+            result[column].astype(object).where(result[column].notna(), "")
+            if column in result.columns else [""] * len(result)
+            for column in ("cidade", "uf", "pais")
         ]
-
-        for col in priority_cols:
-            if col in row.index:
-                value = self._clean_value(row[col])
-                if value and value != code and not self._is_code_like(value):
-                    return value
-
-        # Try NCM if it's descriptive (not just a code)
-        if "ncm" in row.index:
-            value = self._clean_value(row["ncm"])
-            if value and value != code and not self._is_code_like(value):
-                return value
-
-        # Fallback to any other descriptive columns, prefer shorter names
-        candidates = []
-        for col in row.index:
-            if col in {"cd_mercadoria", "cdmercadoria", "string_field_0"}:
-                continue
-            if "container" in col or "tipo_container" in col:
-                continue
-            value = self._clean_value(row[col])
-            if not value or value == code or self._is_code_like(value):
+        values = list(zip(*columns))
+        lookup: Dict[str, Tuple[str, str, str]] = {}
+        for column in key_columns:
+            if column not in result.columns:
                 continue
-            candidates.append(value)
-
-        if candidates:
-            return min(candidates, key=len)
-
-        # Last resort: group/legacy description
-        for col in ("grupo_mercadoria", "string_field_3"):
-            if col in row.index:
-                value = self._clean_value(row[col])
-                if value:
-                    return value
-
-        return code
+            for code, value in zip(result[column], values):
+                if pd.isna(code):
+                    continue
+                lookup.setdefault(str(code).strip().upper(), value)
+        return lookup
+
+    def _mercadoria_names(self) -> Optional[Dict[str, str]]:
+        if self.dimensions is None:
+            return None
+        return self.dimensions.lookup("mercadoria_carga", self._load_mercadoria_names)
+
+    def _destino_lookup(self) -> Optional[Dict[str, Tuple[str, str, str]]]:
+        if self.dimensions is None:
+            return None
+        return self.dimensions.lookup(
+            "instalacao_destino",
+            lambda: self._load_location_table("instalacao_destino", ["origem", "destino", "codigo", "unlocode"])
+        )
+
+    def _origem_lookup(self) -> Optional[Dict[str, Tuple[str, str, str]]]:
+        if self.dimensions is None:
+            return None
+        return self.dimensions.lookup(
+            "instalacao_origem",
+            lambda: self._load_location_table("instalacao_origem", ["origem"])
+        )
 
     def get_mercadoria_nome(self, cd_mercadoria: str) -> str:
         """
@@ -248,6 +220,10 @@ class ReferentialHelper:
         if not cd_mercadoria or str(cd_mercadoria) == 'nan':
             return str(cd_mercadoria) if cd_mercadoria else ""
 
+        names = self._mercadoria_names()
+        if names is not None:
+            return names.get(str(cd_mercadoria), str(cd_mercadoria))
+
         try:
             from google.cloud.bigquery import QueryJobConfig, ScalarQueryParameter
 
@@ -264,12 +240,11 @@ class ReferentialHelper:
                 ]
             )
 
-            result = self.client.query(query, job_config=job_config).to_dataframe()
+            result = self._query_df(query, job_config)
 
             if not result.empty:
-                row = result.iloc[0]
-                code = self._clean_value(row.get("cd_mercadoria", cd_mercadoria))
-                return self._pick_best_mercadoria_name(row, code or str(cd_mercadoria))
+                names = resolve_mercadoria_names(result, "cd_mercadoria")
+                return next(iter(names.values()), str(cd_mercadoria))
             return str(cd_mercadoria)
 
         except Exception:
@@ -289,12 +264,11 @@ class ReferentialHelper:
                     ]
                 )
 
-                result = self.client.query(query, job_config=job_config).to_dataframe()
+                result = self._query_df(query, job_config)
 
                 if not result.empty:
-                    row = result.iloc[0]
-                    code = self._clean_value(row.get("string_field_0", cd_mercadoria))
-                    return self._pick_best_mercadoria_name(row, code or str(cd_mercadoria))
+                    names = resolve_mercadoria_names(result, "string_field_0")
+                    return next(iter(names.values()), str(cd_mercadoria))
                 return str(cd_mercadoria)
 
             except Exception as e:
@@ -306,7 +280,7 @@ class ReferentialHelper:
         """
         Get destination information (city, UF, country)
 
-        First checks international ports dictionary, then BigQuery table.
+        First checks the UN/LOCODE index, then BigQuery table.
 
         Args:
             destino: Destination code (UN/LOCODE or Brazilian port code)
@@ -323,12 +297,25 @@ class ReferentialHelper:
 
         destino = str(destino).strip().upper()
 
-        # 1. Check international ports dictionary first
+        # 1. Check the UN/LOCODE index first
         if destino in self.international_ports:
             cidade, uf, pais = self.international_ports[destino]
             return {"cidade": cidade, "uf": uf, "pais": pais}
 
-        # 2. Check Brazilian/foreign ports table with multiple possible key columns
+        # 2. Reference tables from the dimension cache (no query per code)
+        destinos = self._destino_lookup()
+        if destinos is not None:
+            if destino in destinos:
+                cidade, uf, pais = destinos[destino]
+                return {"cidade": cidade, "uf": uf, "pais": pais}
+            origem_info = self.get_instalacao_origem_info(destino)
+            if any(origem_info.values()):
+                return origem_info
+            if len(destino) == 5 and destino[:2].isalpha():
+                info["pais"] = self._get_country_from_unlocode(destino[:2])
+            return info
+
+        # 3. Check Brazilian/foreign ports table with multiple possible key columns
         try:
             def _query_destino(column_name: str) -> Optional[pd.Series]:
                 query = f"""
@@ -342,7 +329,7 @@ class ReferentialHelper:
                         ScalarQueryParameter("destino", "STRING", destino)
                     ]
                 )
-                result = self.client.query(query, job_config=job_config).to_dataframe()
+                result = self._query_df(query, job_config)
                 if not result.empty:
                     return result.iloc[0]
                 return None
@@ -358,12 +345,12 @@ class ReferentialHelper:
                     info["pais"] = row['pais'] if pd.notna(row['pais']) else ""
                     return info
 
-            # 3. Fallback: try origem table too (some codes live there)
+            # 4. Fallback: try origem table too (some codes live there)
             origem_info = self.get_instalacao_origem_info(destino)
             if any(origem_info.values()):
                 return origem_info
 
-            # 4. Fallback: derive country from UN/LOCODE prefix
+            # 5. Fallback: derive country from UN/LOCODE prefix
             if len(destino) == 5 and destino[:2].isalpha():
                 country = self._get_country_from_unlocode(destino[:2])
                 if country:
@@ -379,56 +366,13 @@ class ReferentialHelper:
         """Return country name (pt-BR) from UN/LOCODE prefix."""
         if not country_code:
             return ""
-        code = country_code.upper()
-        # Minimal mapping for common destinations
-        map_pt = {
-            "CN": "China",
-            "US": "Estados Unidos",
-            "AR": "Argentina",
-            "CL": "Chile",
-            "PE": "Peru",
-            "CO": "Colômbia",
-            "EC": "Equador",
-            "MX": "México",
-            "DE": "Alemanha",
-            "ES": "Espanha",
-            "FR": "França",
-            "IT": "Itália",
-            "NL": "Países Baixos",
-            "BE": "Bélgica",
-            "GB": "Reino Unido",
-            "PT": "Portugal",
-            "EG": "Egito",
-            "ZA": "África do Sul",
-            "TR": "Turquia",
-            "IN": "Índia",
-            "JP": "Japão",
-            "KR": "Coreia do Sul",
-            "AE": "Emirados Árabes",
-            "SA": "Arábia Saudita",
-            "QA": "Catar",
-            "SG": "Singapura",
-            "AU": "Austrália",
-            "CA": "Canadá",
-            "BR": "Brasil",
-        }
-        if code in map_pt:
-            return map_pt[code]
-        # Try pycountry if available
-        try:
-            import pycountry
-            country = pycountry.countries.get(alpha_2=code)
-            if country:
-                return country.name
-        except Exception:
-            pass
-        return ""
+        return self.international_ports.country_name(country_code)
 
     def get_instalacao_origem_info(self, origem: str) -> Dict[str, str]:
         """
         Get origin information (city, UF, country)
 
-        First checks international ports dictionary, then BigQuery table.
+        First checks the UN/LOCODE index, then BigQuery table.
 
         Args:
             origem: Origin code (UN/LOCODE or Brazilian port code)
@@ -445,12 +389,20 @@ class ReferentialHelper:
 
         origem = str(origem).strip().upper()
 
-        # 1. Check international ports dictionary first
+        # 1. Check the UN/LOCODE index first
         if origem in self.international_ports:
             cidade, uf, pais = self.international_ports[origem]
             return {"cidade": cidade, "uf": uf, "pais": pais}
 
-        # 2. Check Brazilian ports table
+        # 2. Reference table from the dimension cache (no query per code)
+        origens = self._origem_lookup()
+        if origens is not None:
+            if origem in origens:
+                cidade, uf, pais = origens[origem]
+                return {"cidade": cidade, "uf": uf, "pais": pais}
+            return info
+
+        # 3. Check Brazilian ports table
         try:
             query = f"""
             SELECT cidade, uf, pais
@@ -464,7 +416,7 @@ class ReferentialHelper:
                 ]
             )
 
-            result = self.client.query(query, job_config=job_config).to_dataframe()
+            result = self._query_df(query, job_config)
 
             if not result.empty:
                 row = result.iloc[0]
@@ -479,18 +431,9 @@ class ReferentialHelper:
             logging.error(f"Error getting origem info: {e}")
             return info
 
-    def enrich_destino_with_info(self, destino: str) -> str:
-        """
-        Get a friendly description for a destination (City, UF - Country)
-
-        Args:
-            destino: Destination code
-
-        Returns:
-            Friendly string like "Santos, SP - Brasil" or original code
-        """
-        info = self.get_instalacao_destino_info(destino)
-
+    @staticmethod
+    def _format_location(info: Dict[str, str], fallback: str) -> str:
+        """Friendly string (City, UF - Country) of a location info dict."""
         parts = []
         if info["cidade"]:
             parts.append(info["cidade"])
@@ -505,7 +448,111 @@ class ReferentialHelper:
         elif info["pais"]:
             return info["pais"]
         else:
-            return destino
+            return fallback
+
+    def enrich_destino_with_info(self, destino: str) -> str:
+        """
+        Get a friendly description for a destination (City, UF - Country)
+
+        Args:
+            destino: Destination code
+
+        Returns:
+            Friendly string like "Santos, SP - Brasil" or original code
+        """
+        return self._format_location(self.get_instalacao_destino_info(destino), destino)
+
+    def _location_tables(self, include_destino: bool) -> Optional[List[Dict[str, Tuple[str, str, str]]]]:
+        """
+        Location lookups searched in order for a batch (destino table first).
+
+        Uses the dimension cache, or loads the tables once for this batch when
+        the cache is disabled. Returns None when a table cannot be loaded.
+        """
+        if self.dimensions is not None:
+            tables = ([self._destino_lookup()] if include_destino else []) + [self._origem_lookup()]
+            return None if any(table is None for table in tables) else tables
+
+        try:
+            tables = []
+            if include_destino:
+                tables.append(self._load_location_table(
+                    "instalacao_destino", ["origem", "destino", "codigo", "unlocode"]
+                ))
+            tables.append(self._load_location_table("instalacao_origem", ["origem"]))
+            return tables
+        except Exception as e:
+            import logging
+            logging.warning(f"Could not load location tables: {e}")
+            return None
+
+    def _batch_location_info(self, codes: list, include_destino: bool) -> Dict[str, Dict[str, str]]:
+        """
+        Location info of many codes in one pass.
+
+        UN/LOCODE index first, then the location tables (at most one
+        round trip), then the UN/LOCODE country prefix.
+        """
+        resolved: Dict[str, Dict[str, str]] = {}
+        tables, loaded = None, False
+        for raw in dict.fromkeys(str(c) for c in codes if c is not None):
+            info = {"cidade": "", "uf": "", "pais": ""}
+            code = raw.strip().upper()
+            resolved[raw] = info
+            if not code or raw in ("nan", "Não informado"):
+                continue
+            if code in self.international_ports:
+                cidade, uf, pais = self.international_ports[code]
+                resolved[raw] = {"cidade": cidade, "uf": uf, "pais": pais}
+                continue
+
+            if not loaded:
+                tables, loaded = self._location_tables(include_destino), True
+            if tables is None:
+                # Tables unavailable: per-code lookups
+                getter = self.get_instalacao_destino_info if include_destino else self.get_instalacao_origem_info
+                resolved[raw] = getter(code)
+                continue
+
+            for table in tables:
+                if code in table:
+                    cidade, uf, pais = table[code]
+                    resolved[raw] = {"cidade": cidade, "uf": uf, "pais": pais}
+                    break
+            else:
+                if len(code) == 5 and code[:2].isalpha():
+                    info["pais"] = self._get_country_from_unlocode(code[:2])
+        return resolved
+
+    def batch_enrich_destinos(self, destinos: list) -> Dict[str, str]:
+        """
+        Friendly descriptions (City, UF - Country) of many destination codes.
+
+        Args:
+            destinos: Destination codes (UN/LOCODE or Brazilian port codes)
+
+        Returns:
+            Dictionary mapping code -> friendly string (the code when unknown)
+        """
+        return {
+            code: self._format_location(info, code)
+            for code, info in self._batch_location_info(destinos, include_destino=True).items()
+        }
+
+    def batch_enrich_origens(self, origens: list) -> Dict[str, str]:
+        """
+        Friendly descriptions (City, UF - Country) of many origin codes.
+
+        Args:
+            origens: Origin codes (UN/LOCODE or Brazilian port codes)
+
+        Returns:
+            Dictionary mapping code -> friendly string (the code when unknown)
+        """
+        return {
+            code: self._format_location(info, code)
+            for code, info in self._batch_location_info(origens, include_destino=False).items()
+        }
 
     def batch_get_mercadoria_nomes(self, codigos: list) -> Dict[str, str]:
         """
@@ -526,6 +573,10 @@ class ReferentialHelper:
         if not valid_codes:
             return {}
 
+        names = self._mercadoria_names()
+        if names is not None:
+            return {str(code): names.get(str(code), str(code)) for code in valid_codes}
+
         try:
             # Create IN clause with up to 1000 codes (BigQuery limit)
             codes_str = ", ".join([f"'{c}'" for c in valid_codes[:1000]])
@@ -537,15 +588,9 @@ class ReferentialHelper:
             WHERE cd_mercadoria IN ({codes_str})
             """
 
-            result = self.client.query(query).to_dataframe()
+            result = self._query_df(query)
 
-            mapping = {}
-            code_col = "cd_mercadoria" if "cd_mercadoria" in result.columns else None
-            for _, row in result.iterrows():
-                code = self._clean_value(row.get(code_col)) if code_col else ""
-                if not code:
-                    continue
-                mapping[code] = self._pick_best_mercadoria_name(row, code)
+            mapping = resolve_mercadoria_names(result, "cd_mercadoria")
 
             # Add codes not found in result
             for code in valid_codes:
@@ -566,15 +611,9 @@ class ReferentialHelper:
                 WHERE string_field_0 IN ({codes_str})
                 """
 
-                result = self.client.query(query).to_dataframe()
+                result = self._query_df(query)
 
-                mapping = {}
-                code_col = "string_field_0" if "string_field_0" in result.columns else None
-                for _, row in result.iterrows():
-                    code = self._clean_value(row.get(code_col)) if code_col else ""
-                    if not code:
-                        continue
-                    mapping[code] = self._pick_best_mercadoria_name(row, code)
+                mapping = resolve_mercadoria_names(result, "string_field_0")
 
                 for code in valid_codes:
                     code_str = str(code)
@@ -598,7 +637,7 @@ def get_referential_helper(client=None) -> ReferentialHelper:
     Get a cached ReferentialHelper instance
 
     Args:
-        client: BigQuery client (optional)
+        client: QueryBackend or BigQuery client (optional)
 
     Returns:
         ReferentialHelper instance
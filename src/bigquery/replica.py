@@ -0,0 +1,354 @@
+"""
+Incremental Parquet replica of the ANTAQ dataset for the DuckDB backend.
+
+v_carga_metodologia_oficial is exported partitioned by month
+(<data_dir>/v_carga_metodologia_oficial/ano=YYYY/mes=M/part-0.parquet) and
+each reference table is exported as a single <data_dir>/<table>.parquet file.
+
+A manifest (<data_dir>/_manifest.json) stores the row count and checksum of
+every partition plus a watermark: the latest month that was already final
+(older than ANTAQ's publication lag) when it was synced. Later runs only
+fingerprint months after the watermark and download the partitions whose
+fingerprint changed, instead of pulling the whole history again.
+
+Files are written to a temporary name and renamed, and the manifest is saved
+after every partition, so an interrupted run can simply be started again.
+
+Usage:
+    antaq-replica-sync --data-dir data/replica
+    python -m src.bigquery.replica --full
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from datetime import date, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+
+DATASET = "antaqdados.br_antaq_estatistico_aquaviario"
+PARTITIONED_TABLE = "v_carga_metodologia_oficial"
+REFERENCE_TABLES = ["instalacao_origem", "instalacao_destino", "mercadoria_carga"]
+MANIFEST_NAME = "_manifest.json"
+
+# Order-independent fingerprint of the rows of each month
+PARTITION_FINGERPRINT_SQL = """
+SELECT t.ano, t.mes, COUNT(*) AS row_count,
+       BIT_XOR(FARM_FINGERPRINT(TO_JSON_STRING(t))) AS checksum
+FROM `{dataset}.{table}` t
+WHERE (t.ano * 100 + t.mes) > {after}
+GROUP BY t.ano, t.mes
+"""
+
+PARTITION_EXPORT_SQL = """
+SELECT * FROM `{dataset}.{table}`
+WHERE ano = {ano} AND mes = {mes}
+"""
+
+TABLE_FINGERPRINT_SQL = """
+SELECT COUNT(*) AS row_count,
+       BIT_XOR(FARM_FINGERPRINT(TO_JSON_STRING(t))) AS checksum
+FROM `{dataset}.{table}` t
+"""
+
+TABLE_EXPORT_SQL = "SELECT * FROM `{dataset}.{table}`"
+
+
+def month_key(ano: int, mes: int) -> str:
+    """Manifest key of a month partition, e.g. "2024-03"."""
+    return f"{int(ano):04d}-{int(mes):02d}"
+
+
+def is_final_month(ano: int, mes: int, lag_days: int, today: Optional[date] = None) -> bool:
+    """
+    Whether a month is past ANTAQ's publication lag (its data should not change).
+
+    Args:
+        ano: Year
+        mes: Month (1-12)
+        lag_days: Days after the end of the month until official publication
+        today: Reference date (defaults to today)
+
+    Returns:
+        True if the month is final
+    """
+    next_month = date(ano + mes // 12, mes % 12 + 1, 1)
+    return next_month + timedelta(days=lag_days) <= (today or date.today())
+
+
+def write_parquet_atomic(table, path: str) -> None:
+    """Write a pyarrow.Table to a temporary file and rename it into place."""
+    import pyarrow.parquet as pq
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # Not matched by the *.parquet globs of the DuckDB views
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        pq.write_table(table, tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+class ReplicaSync:
+    """
+    Incremental, restartable export of the dataset to local Parquet.
+    """
+
+    def __init__(
+        self,
+        source,
+        data_dir: str,
+        lag_days: int = 45,
+        dataset: str = DATASET,
+        partitioned_table: str = PARTITIONED_TABLE,
+        reference_tables: Optional[List[str]] = None
+    ):
+        """
+        Initialize the sync job.
+
+        Args:
+            source: QueryBackend to read from (the BigQueryClient)
+            data_dir: Replica directory (LOCAL_DATA_DIR of the DuckDB backend)
+            lag_days: ANTAQ publication lag (MetadataHelper.official_publication_lag_days)
+            dataset: Source dataset ("project.dataset")
+            partitioned_table: Table exported by ano/mes
+            reference_tables: Tables exported as a whole
+        """
+        self.source = source
+        self.data_dir = data_dir
+        self.lag_days = lag_days
+        self.dataset = dataset
+        self.partitioned_table = partitioned_table
+        self.reference_tables = REFERENCE_TABLES if reference_tables is None else reference_tables
+        self.manifest_path = os.path.join(data_dir, MANIFEST_NAME)
+        self.manifest = self._load_manifest()
+        # Month keys written or deleted by this instance (rebuilt in the cube)
+        self.changed_months: List[str] = []
+
+    # --- Manifest ---------------------------------------------------------------
+
+    def _load_manifest(self) -> Dict[str, Any]:
+        try:
+            with open(self.manifest_path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {"tables": {}}
+        except (OSError, ValueError):
+            logging.warning("Unreadable replica manifest %s, starting over", self.manifest_path)
+            return {"tables": {}}
+
+    def _save_manifest(self) -> None:
+        os.makedirs(self.data_dir, exist_ok=True)
+        tmp_path = f"{self.manifest_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _table_state(self, table: str) -> Dict[str, Any]:
+        return self.manifest.setdefault("tables", {}).setdefault(table, {})
+
+    def _query(self, template: str, **params) -> Any:
+        sql = template.format(dataset=self.dataset, **params)
+        return self.source.query_arrow(sql, use_cache=False)
+
+    def _partition_path(self, table: str, ano: int, mes: int) -> str:
+        return os.path.join(self.data_dir, table, f"ano={int(ano)}", f"mes={int(mes)}", "part-0.parquet")
+
+    # --- Partitioned table ----------------------------------------------------------
+
+    def sync_partitioned(
+        self,
+        full: bool = False,
+        on_partition: Optional[Callable[[str, str], None]] = None
+    ) -> Dict[str, int]:
+        """
+        Sync the month partitions after the watermark (or all with full=True).
+
+        Args:
+            full: Fingerprint the whole history instead of starting at the watermark
+            on_partition: Optional callback(month_key, action) for progress output
+
+        Returns:
+            Counts of written, unchanged and deleted partitions
+        """
+        table = self.partitioned_table
+        state = self._table_state(table)
+        partitions = state.setdefault("partitions", {})
+        watermark = None if full else state.get("watermark")
+        after = int(watermark.replace("-", "")) if watermark else 0
+
+        fingerprints = self._query(PARTITION_FINGERPRINT_SQL, table=table, after=after).to_pylist()
+        remote = {month_key(row["ano"], row["mes"]): row for row in fingerprints}
+        counts = {"written": 0, "unchanged": 0, "deleted": 0}
+
+        for key in sorted(remote):
+            row = remote[key]
+            stored = partitions.get(key)
+            path = self._partition_path(table, row["ano"], row["mes"])
+            if (
+                stored
+                and stored["row_count"] == row["row_count"]
+                and stored["checksum"] == row["checksum"]
+                and os.path.exists(path)
+            ):
+                counts["unchanged"] += 1
+                continue
+
+            data = self._query(PARTITION_EXPORT_SQL, table=table, ano=int(row["ano"]), mes=int(row["mes"]))
+            if data.num_rows != row["row_count"]:
+                raise RuntimeError(
+                    f"{table} {key}: expected {row['row_count']} rows, got {data.num_rows}"
+                )
+            # ano/mes come from the directory names (hive partitioning)
+            data = data.drop_columns([c for c in ("ano", "mes") if c in data.column_names])
+            write_parquet_atomic(data, path)
+
+            partitions[key] = {
+                "row_count": row["row_count"],
+                "checksum": row["checksum"],
+                "synced_at": time.time(),
+            }
+            self._save_manifest()
+            counts["written"] += 1
+            self.changed_months.append(key)
+            if on_partition:
+                on_partition(key, "written")
+
+        # Months after the watermark that disappeared from the source
+        for key in [k for k in partitions if int(k.replace("-", "")) > after and k not in remote]:
+            ano, mes = (int(part) for part in key.split("-"))
+            path = self._partition_path(table, ano, mes)
+            if os.path.exists(path):
+                os.remove(path)
+            del partitions[key]
+            self._save_manifest()
+            counts["deleted"] += 1
+            self.changed_months.append(key)
+            if on_partition:
+                on_partition(key, "deleted")
+
+        final = [key for key in remote if is_final_month(*map(int, key.split("-")), self.lag_days)]
+        if final:
+            state["watermark"] = max([max(final)] + ([watermark] if watermark else []))
+        state["synced_at"] = time.time()
+        self._save_manifest()
+        return counts
+
+    # --- Reference tables --------------------------------------------------------
+
+    def sync_reference_table(self, table: str) -> bool:
+        """
+        Export a reference table when its fingerprint changed.
+
+        Args:
+            table: Table name
+
+        Returns:
+            True if the table was written
+        """
+        state = self._table_state(table)
+        path = os.path.join(self.data_dir, f"{table}.parquet")
+        fingerprint = self._query(TABLE_FINGERPRINT_SQL, table=table).to_pylist()[0]
+        if (
+            state.get("row_count") == fingerprint["row_count"]
+            and state.get("checksum") == fingerprint["checksum"]
+            and os.path.exists(path)
+        ):
+            return False
+
+        write_parquet_atomic(self._query(TABLE_EXPORT_SQL, table=table), path)
+        state.update({
+            "row_count": fingerprint["row_count"],
+            "checksum": fingerprint["checksum"],
+            "synced_at": time.time(),
+        })
+        self._save_manifest()
+        return True
+
+    def run(self, full: bool = False, on_partition: Optional[Callable[[str, str], None]] = None) -> Dict[str, Any]:
+        """
+        Sync the partitioned table and every reference table.
+
+        Args:
+            full: Re-check the whole history of the partitioned table
+            on_partition: Optional progress callback
+
+        Returns:
+            Summary with partition counts, written reference tables and errors
+        """
+        summary: Dict[str, Any] = {"partitions": {}, "reference_tables": [], "errors": []}
+        try:
+            summary["partitions"] = self.sync_partitioned(full=full, on_partition=on_partition)
+        except Exception as e:
+            logging.exception("Replica sync of %s failed", self.partitioned_table)
+            summary["errors"].append(f"{self.partitioned_table}: {e}")
+
+        for table in self.reference_tables:
+            try:
+                if self.sync_reference_table(table):
+                    summary["reference_tables"].append(table)
+            except Exception as e:
+                logging.exception("Replica sync of %s failed", table)
+                summary["errors"].append(f"{table}: {e}")
+        return summary
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point (antaq-replica-sync)."""
+    parser = argparse.ArgumentParser(
+        description="Sincroniza uma réplica local em Parquet (ano/mes) do dataset ANTAQ no BigQuery."
+    )
+    parser.add_argument(
+        "--data-dir",
+        default=os.getenv("LOCAL_DATA_DIR", os.path.join(os.getcwd(), "data", "replica")),
+        help="Diretório da réplica (padrão: LOCAL_DATA_DIR)"
+    )
+    parser.add_argument("--full", action="store_true", help="Reverifica todo o histórico, não só após o watermark")
+    parser.add_argument("--no-cube", action="store_true", help="Não reconstrói o cubo mensal dos meses alterados")
+    parser.add_argument(
+        "--tables", nargs="*",
+        help="Tabelas de referência a exportar (padrão: " + ", ".join(REFERENCE_TABLES) + ")"
+    )
+    args = parser.parse_args(argv)
+
+    from ..agent.metadata_helper import MetadataHelper
+    from .client import get_bigquery_client
+
+    source = get_bigquery_client()
+    sync = ReplicaSync(
+        source,
+        args.data_dir,
+        lag_days=MetadataHelper(source).official_publication_lag_days,
+        reference_tables=args.tables,
+    )
+    started = time.time()
+    summary = sync.run(full=args.full, on_partition=lambda key, action: print(f"  {key}: {action}"))
+
+    partitions = summary["partitions"]
+    print(
+        f"\n{partitions.get('written', 0)} partições gravadas, {partitions.get('unchanged', 0)} inalteradas, "
+        f"{partitions.get('deleted', 0)} removidas; tabelas de referência atualizadas: "
+        f"{', '.join(summary['reference_tables']) or 'nenhuma'} "
+        f"({time.time() - started:.1f}s) -> {args.data_dir}"
+    )
+    if sync.changed_months and not args.no_cube:
+        from .cube import build_cube_from_replica
+        months = [tuple(int(part) for part in key.split("-")) for key in sync.changed_months]
+        try:
+            written = build_cube_from_replica(args.data_dir, months)
+            print(f"Cubo mensal: {written} partições reconstruídas")
+        except Exception as e:
+            logging.exception("Cube rebuild failed")
+            summary["errors"].append(f"cubo: {e}")
+
+    for error in summary["errors"]:
+        print(f"✗ {error}")
+    return 1 if summary["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
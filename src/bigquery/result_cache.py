@@ -0,0 +1,198 @@
+"""
+Result cache for validated SQL.
+
+Entries are keyed on a canonicalized SQL string and tagged with the data version
+(latest published ANTAQ period). When the version changes, old entries are either
+served stale while a background refresh runs, or treated as misses.
+"""
+import hashlib
+import os
+import re
+import time
+from typing import Any, List, Optional, Tuple
+
+from ..utils.cache import LRUCache, DiskCache
+
+
+# Keywords lowercased during canonicalization (identifiers keep their case,
+# since BigQuery table names are case-sensitive)
+SQL_KEYWORDS = {
+    "select", "from", "where", "and", "or", "not", "in", "is", "null", "as", "on",
+    "join", "left", "right", "inner", "outer", "full", "cross", "group", "by", "order",
+    "having", "limit", "offset", "with", "union", "all", "distinct", "case", "when",
+    "then", "else", "end", "asc", "desc", "like", "between", "over", "partition",
+    "qualify", "sum", "count", "avg", "min", "max", "lower", "upper", "coalesce",
+    "cast", "safe_cast", "date", "extract", "true", "false", "interval", "exists",
+}
+
+_TOKEN_RE = re.compile(
+    r"""
+    (?P<string>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")
+    |(?P<quoted>`[^`]*`)
+    |(?P<line_comment>--[^\n]*|\#[^\n]*)
+    |(?P<block_comment>/\*.*?\*/)
+    |(?P<space>\s+)
+    |(?P<word>[A-Za-z_][A-Za-z0-9_]*)
+    |(?P<other>.)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+_PUNCTUATION = {"(", ")", ",", "=", "<", ">", ";"}
+
+
+def canonicalize_sql(sql: str) -> str:
+    """
+    Canonical form of a SQL string for cache keys.
+
+    Removes comments, collapses whitespace and lowercases keywords outside of
+    string literals and quoted identifiers. Trailing semicolons are dropped.
+
+    Args:
+        sql: SQL query
+
+    Returns:
+        Canonical SQL string
+    """
+    parts: List[str] = []
+    pending_space = False
+    for match in _TOKEN_RE.finditer(sql or ""):
+        kind = match.lastgroup
+        text = match.group()
+        if kind in ("space", "line_comment", "block_comment"):
+            pending_space = True
+            continue
+        if kind == "word" and text.lower() in SQL_KEYWORDS:
+            text = text.lower()
+        # Spaces around punctuation carry no meaning
+        if pending_space and parts and text not in _PUNCTUATION and parts[-1] not in _PUNCTUATION:
+            parts.append(" ")
+        pending_space = False
+        parts.append(text)
+
+    canonical = "".join(parts).strip()
+    while canonical.endswith(";"):
+        canonical = canonical[:-1].rstrip()
+    return canonical
+
+
+def sql_cache_key(sql: str, result_format: str = "rows") -> str:
+    """Stable hash of the canonical SQL (suffixed for non-row result formats)."""
+    key = hashlib.sha256(canonicalize_sql(sql).encode("utf-8")).hexdigest()
+    return key if result_format == "rows" else f"{key}.{result_format}"
+
+
+def _copy_result(result: Any) -> Any:
+    # Row lists are copied so callers cannot mutate cached entries;
+    # Arrow tables are immutable and shared as is
+    return list(result) if isinstance(result, list) else result
+
+
+class ResultCache:
+    """
+    Two-tier (memory LRU + optional disk) cache of query results.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 512,
+        disk_dir: Optional[str] = None,
+        stale_while_revalidate: bool = True
+    ):
+        """
+        Initialize the cache.
+
+        Args:
+            max_size: Maximum number of result sets kept in memory
+            disk_dir: Optional directory for the persistent tier
+            stale_while_revalidate: Serve entries from an older data version
+                while the caller refreshes them in background
+        """
+        self.stale_while_revalidate = stale_while_revalidate
+        self._memory = LRUCache(max_size=max_size)
+        self._disk = DiskCache(disk_dir) if disk_dir else None
+
+    def get(
+        self,
+        sql: str,
+        version: str,
+        result_format: str = "rows"
+    ) -> Optional[Tuple[Any, bool]]:
+        """
+        Look up results for a query.
+
+        Args:
+            sql: SQL query
+            version: Current data version
+            result_format: "rows" or "arrow" (cached separately)
+
+        Returns:
+            Tuple (result, is_stale), or None on miss
+        """
+        key = sql_cache_key(sql, result_format)
+        entry = self._memory.get(key)
+        if entry is None and self._disk is not None:
+            entry = self._disk.get(key)
+            if entry is not None:
+                self._memory.set(key, entry)
+
+        if entry is None:
+            return None
+        if entry["version"] == version:
+            return _copy_result(entry["rows"]), False
+        if self.stale_while_revalidate:
+            return _copy_result(entry["rows"]), True
+
+        self.invalidate(sql, result_format)
+        return None
+
+    def set(
+        self,
+        sql: str,
+        version: str,
+        rows: Any,
+        result_format: str = "rows"
+    ) -> None:
+        """
+        Store results for a query.
+
+        Args:
+            sql: SQL query
+            version: Data version the results were computed on
+            rows: Result rows (list of dictionaries or pyarrow.Table)
+            result_format: "rows" or "arrow"
+        """
+        key = sql_cache_key(sql, result_format)
+        entry = {"version": version, "rows": _copy_result(rows), "stored_at": time.time()}
+        self._memory.set(key, entry)
+        if self._disk is not None:
+            self._disk.set(key, entry)
+
+    def invalidate(self, sql: str, result_format: str = "rows") -> None:
+        """Remove a query from both tiers."""
+        key = sql_cache_key(sql, result_format)
+        self._memory.pop(key)
+        if self._disk is not None:
+            self._disk.pop(key)
+
+    def clear(self) -> None:
+        """Remove all entries."""
+        self._memory.clear()
+        if self._disk is not None:
+            self._disk.clear()
+
+
+def create_result_cache_from_env() -> Optional[ResultCache]:
+    """
+    Build the result cache from environment settings.
+
+    Returns:
+        ResultCache, or None when BQ_RESULT_CACHE_ENABLED=false
+    """
+    if os.getenv("BQ_RESULT_CACHE_ENABLED", "true").lower() != "true":
+        return None
+    return ResultCache(
+        max_size=int(os.getenv("BQ_RESULT_CACHE_MAX_SIZE", "512")),
+        disk_dir=os.getenv("BQ_RESULT_CACHE_DIR") or None,
+        stale_while_revalidate=os.getenv("BQ_RESULT_CACHE_SWR", "true").lower() == "true",
+    )
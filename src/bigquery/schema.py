@@ -3,7 +3,7 @@ Schema retrieval and formatting for BigQuery tables.
 """
 import json
 from typing import List, Dict, Any
-from .client import BigQueryClient, get_bigquery_client
+from .backend import QueryBackend, get_query_backend
 
 
 class SchemaRetriever:
@@ -22,8 +22,8 @@ class SchemaRetriever:
         "mercadoria_carga"              # Commodity catalog
     ]
 
-    def __init__(self, client: BigQueryClient | None = None):
-        self.client = client or get_bigquery_client()
+    def __init__(self, client: QueryBackend | None = None):
+        self.client = client or get_query_backend()
 
     def get_formatted_schema(self) -> str:
         """
@@ -42,22 +42,8 @@ class SchemaRetriever:
 
     def _get_table_schema(self, table_name: str) -> Dict[str, Any]:
         """Get schema for a single table."""
-        # Use the client's get_table which already handles cross-project access
-        table = self.client.get_table(table_name)
-
-        return {
-            "name": table_name,
-            "description": table.description or f"Table: {table_name}",
-            "columns": [
-                {
-                    "name": field.name,
-                    "type": field.field_type,
-                    "mode": field.mode,
-                    "description": field.description or ""
-                }
-                for field in table.schema
-            ]
-        }
+        # BigQuery handles cross-project access; DuckDB describes the local view
+        return self.client.get_schema(table_name)
 
     def _format_table_schema(self, table_info: Dict[str, Any]) -> str:
         """Format table schema for LLM consumption."""
@@ -0,0 +1,262 @@
+"""
+Offline UN/LOCODE index for foreign port codes.
+
+Destination and origin codes of foreign ports are UN/LOCODEs (country alpha-2
++ 3-letter location). The index is packaged with the code
+(data/unlocode.tsv.gz): one line per code, sorted, with the location name,
+the subdivision and, only when it is not the country of the prefix, the
+country. It is loaded once, on first use, into parallel sorted lists and
+searched with bisect. Country names in Portuguese come from data/paises_pt.tsv,
+and data/unlocode_overrides_pt.tsv holds the Portuguese names of the most
+frequent ports (and the non-standard *ZZZ codes found in ANTAQ data).
+
+The packaged index holds the port locations (function 1) of the UN/LOCODE
+2023-1 release. Rebuild it from the official UNECE CSV files with:
+
+    antaq-unlocode-build "2024-2 UNLOCODE CodeListPart1.csv" ... [--ports-only]
+"""
+import argparse
+import bisect
+import csv
+import gzip
+import io
+import os
+import sys
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+INDEX_PATH = os.path.join(DATA_DIR, "unlocode.tsv.gz")
+COUNTRIES_PATH = os.path.join(DATA_DIR, "paises_pt.tsv")
+OVERRIDES_PATH = os.path.join(DATA_DIR, "unlocode_overrides_pt.tsv")
+
+# Brazilian codes are left to the ANTAQ installation tables (except overrides)
+DOMESTIC_COUNTRY = "BR"
+
+# Countries whose official subdivisions are familiar state abbreviations (TX,
+# NSW, ...); elsewhere they are opaque codes ("S", "JS") and are left out
+SUBDIVISION_COUNTRIES = {"AU", "BR", "CA", "US"}
+
+
+def _read_tsv(path: str) -> Iterable[List[str]]:
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("#") or not line.strip():
+                continue
+            yield line.rstrip("\n").split("\t")
+
+
+def load_countries(path: str = COUNTRIES_PATH) -> Dict[str, str]:
+    """
+    Country names in Portuguese.
+
+    Args:
+        path: TSV with alpha-2 code and name
+
+    Returns:
+        Dictionary alpha-2 -> name
+    """
+    return {fields[0]: fields[1] for fields in _read_tsv(path)}
+
+
+class UnlocodeIndex:
+    """
+    Read-only code -> (cidade, uf, pais) mapping over the packaged index.
+
+    Behaves like the former INTERNATIONAL_PORTS dict (in, [] and get).
+    """
+
+    def __init__(self, path: str = INDEX_PATH, countries_path: str = COUNTRIES_PATH):
+        """
+        Initialize the index (files are read on first use).
+
+        Args:
+            path: Index file (TSV, optionally gzip-compressed)
+            countries_path: Country names file
+        """
+        self.path = path
+        self.countries_path = countries_path
+        self._codes: Optional[List[str]] = None
+        self._locations: List[Tuple[str, str, str]] = []
+        self._countries: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def _load(self) -> List[str]:
+        if self._codes is not None:
+            return self._codes
+        with self._lock:
+            if self._codes is None:
+                countries = load_countries(self.countries_path)
+                codes, locations = [], []
+                for fields in _read_tsv(self.path):
+                    code, cidade, uf = fields[0], fields[1], fields[2]
+                    pais = fields[3] if len(fields) > 3 and fields[3] else countries.get(code[:2], "")
+                    codes.append(code)
+                    locations.append((cidade, uf, pais))
+                self._countries = countries
+                self._locations = locations
+                self._codes = codes
+        return self._codes
+
+    def _position(self, code: str) -> int:
+        codes = self._load()
+        position = bisect.bisect_left(codes, code)
+        return position if position < len(codes) and codes[position] == code else -1
+
+    def get(self, code: str, default=None) -> Optional[Tuple[str, str, str]]:
+        """
+        Location of a code.
+
+        Args:
+            code: UN/LOCODE (case-insensitive)
+            default: Value returned when the code is unknown
+
+        Returns:
+            Tuple (cidade, uf, pais) or default
+        """
+        position = self._position(str(code).strip().upper())
+        return self._locations[position] if position >= 0 else default
+
+    def country_name(self, alpha2: str) -> str:
+        """Portuguese name of a country (alpha-2 code), or "" when unknown."""
+        self._load()
+        return self._countries.get(str(alpha2).upper(), "")
+
+    def __contains__(self, code: object) -> bool:
+        return isinstance(code, str) and self._position(code.strip().upper()) >= 0
+
+    def __getitem__(self, code: str) -> Tuple[str, str, str]:
+        location = self.get(code)
+        if location is None:
+            raise KeyError(code)
+        return location
+
+    def __len__(self) -> int:
+        return len(self._load())
+
+
+# Singleton instance
+_index_instance: Optional[UnlocodeIndex] = None
+
+
+def get_unlocode_index() -> UnlocodeIndex:
+    """Get the shared index of the packaged UN/LOCODE file."""
+    global _index_instance
+    if _index_instance is None:
+        _index_instance = UnlocodeIndex()
+    return _index_instance
+
+
+# --- Build ----------------------------------------------------------------------------
+
+def read_unlocode_csv(path: str, encoding: str = "latin-1", ports_only: bool = False) -> Dict[str, Tuple[str, str]]:
+    """
+    Locations of an official UN/LOCODE CSV file (CodeListPart*.csv).
+
+    Args:
+        path: CSV file (columns: change, country, location, name, name without
+            diacritics, subdivision, function, ...)
+        encoding: File encoding (the UNECE files are ISO 8859-1)
+        ports_only: Keep only locations with the port function (1 in the
+            first position of the function column)
+
+    Returns:
+        Dictionary code -> (name, subdivision)
+    """
+    locations = {}
+    with open(path, encoding=encoding, newline="") as f:
+        for row in csv.reader(f):
+            if len(row) < 7:
+                continue
+            change, country, location, name, _, subdivision, function = row[:7]
+            # Country header lines have no location; "X" marks removed entries
+            if not location.strip() or change.strip() == "X":
+                continue
+            if ports_only and not function.startswith("1"):
+                continue
+            locations[f"{country.strip()}{location.strip()}".upper()] = (name.strip(), subdivision.strip())
+    return locations
+
+
+def build_index(
+    csv_paths: List[str],
+    output: str = INDEX_PATH,
+    overrides_path: str = OVERRIDES_PATH,
+    encoding: str = "latin-1",
+    ports_only: bool = False,
+    include_domestic: bool = False
+) -> int:
+    """
+    Write the index file from official CSV files and the Portuguese overrides.
+
+    Args:
+        csv_paths: Official UN/LOCODE CSV files (all parts)
+        output: Index file to write (gzip when it ends with .gz)
+        overrides_path: TSV with Portuguese names that replace official ones
+        encoding: Encoding of the CSV files
+        ports_only: Keep only locations with the port function
+        include_domestic: Keep Brazilian codes from the CSV files
+
+    Returns:
+        Number of codes written
+    """
+    entries: Dict[str, Tuple[str, str, str]] = {}
+    for path in csv_paths:
+        for code, (name, subdivision) in read_unlocode_csv(path, encoding, ports_only).items():
+            if include_domestic or code[:2] != DOMESTIC_COUNTRY:
+                if code[:2] not in SUBDIVISION_COUNTRIES:
+                    subdivision = ""
+                entries[code] = (name, subdivision, "")
+    for fields in _read_tsv(overrides_path):
+        fields += [""] * (4 - len(fields))
+        entries[fields[0].upper()] = (fields[1], fields[2], fields[3])
+
+    buffer = io.StringIO()
+    buffer.write("# UN/LOCODE: código\tcidade\tsubdivisão\tpaís (vazio = país do prefixo)\n")
+    for code in sorted(entries):
+        cidade, uf, pais = (value.replace("\t", " ") for value in entries[code])
+        buffer.write(f"{code}\t{cidade}\t{uf}\t{pais}\n")
+
+    data = buffer.getvalue().encode("utf-8")
+    tmp_path = f"{output}.{os.getpid()}.tmp"
+    if output.endswith(".gz"):
+        # mtime=0 keeps rebuilds of the same data byte-identical
+        with open(tmp_path, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as f:
+            f.write(data)
+    else:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+    os.replace(tmp_path, output)
+    return len(entries)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command-line entry point (antaq-unlocode-build)."""
+    parser = argparse.ArgumentParser(
+        description="Reconstrói o índice UN/LOCODE offline a partir dos CSVs oficiais da UNECE."
+    )
+    parser.add_argument("csv", nargs="*", help="Arquivos CodeListPart*.csv do UN/LOCODE")
+    parser.add_argument("--output", default=INDEX_PATH, help="Arquivo do índice (padrão: o empacotado)")
+    parser.add_argument("--overrides", default=OVERRIDES_PATH, help="Nomes em português que substituem os oficiais")
+    parser.add_argument("--encoding", default="latin-1", help="Codificação dos CSVs (padrão: latin-1)")
+    parser.add_argument("--ports-only", action="store_true", help="Mantém só locais com função portuária")
+    parser.add_argument("--include-br", action="store_true", help="Inclui códigos brasileiros do CSV")
+    args = parser.parse_args(argv)
+
+    try:
+        written = build_index(
+            args.csv, args.output, args.overrides, args.encoding,
+            ports_only=args.ports_only, include_domestic=args.include_br
+        )
+    except Exception as e:
+        print(f"✗ {e}")
+        return 1
+
+    print(f"{written} códigos gravados em {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
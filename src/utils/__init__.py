@@ -1,8 +1,10 @@
 """Utilities module."""
 from .validation import SQLValidator, get_sql_validator
 from .security import sanitize_input, validate_environment, get_credentials_path
-from .formatting import format_results_for_llm, format_results_for_display, format_sql_query
+from .formatting import format_results_for_llm, format_results_for_display, format_sql_query, format_bytes, result_rows
 from .logging_config import setup_logging, get_logger
+from .cache import LRUCache, DiskCache
+from .result import QueryResult
 
 __all__ = [
     "SQLValidator",
@@ -13,6 +15,11 @@ __all__ = [
     "format_results_for_llm",
     "format_results_for_display",
     "format_sql_query",
+    "format_bytes",
+    "result_rows",
     "setup_logging",
     "get_logger",
+    "LRUCache",
+    "DiskCache",
+    "QueryResult",
 ]
@@ -0,0 +1,186 @@
+"""
+In-process caching primitives shared by the agent, BigQuery and app layers.
+"""
+import hashlib
+import logging
+import os
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, List, Optional, Tuple
+
+
+class LRUCache:
+    """
+    Thread-safe, size-bounded LRU cache with optional per-entry TTL.
+    """
+
+    def __init__(self, max_size: int = 256, ttl_seconds: Optional[float] = None):
+        """
+        Initialize the cache.
+
+        Args:
+            max_size: Maximum number of entries kept in memory
+            ttl_seconds: Optional time-to-live for each entry (None = no expiry)
+        """
+        self.max_size = max(1, int(max_size))
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    def _is_expired(self, stored_at: float) -> bool:
+        if self.ttl_seconds is None:
+            return False
+        return (time.monotonic() - stored_at) > self.ttl_seconds
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """
+        Get a value and mark it as most recently used.
+
+        Args:
+            key: Cache key
+            default: Value returned on miss
+
+        Returns:
+            Cached value or default
+        """
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or self._is_expired(item[0]):
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """
+        Store a value, evicting the least recently used entry when full.
+
+        Args:
+            key: Cache key
+            value: Value to store
+        """
+        with self._lock:
+            self._data[key] = (time.monotonic(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        """Remove an entry and return its value."""
+        with self._lock:
+            item = self._data.pop(key, None)
+            return default if item is None else item[1]
+
+    def items(self) -> List[Tuple[Hashable, Any]]:
+        """Snapshot of non-expired (key, value) pairs, oldest first."""
+        with self._lock:
+            return [
+                (key, value)
+                for key, (stored_at, value) in self._data.items()
+                if not self._is_expired(stored_at)
+            ]
+
+    def clear(self) -> None:
+        """Remove all entries and reset statistics."""
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            item = self._data.get(key)
+            return item is not None and not self._is_expired(item[0])
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+
+class DiskCache:
+    """
+    Pickle-backed key/value store in a local directory.
+
+    Writes are atomic (temporary file + rename) so concurrent readers never see
+    partial entries. The oldest files are pruned when max_entries is exceeded.
+    """
+
+    def __init__(self, directory: str, max_entries: int = 2048):
+        """
+        Initialize the disk cache.
+
+        Args:
+            directory: Directory where entries are stored (created if missing)
+            max_entries: Maximum number of files kept on disk
+        """
+        self.directory = directory
+        self.max_entries = max_entries
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: Hashable) -> str:
+        digest = hashlib.sha256(repr(key).encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, f"{digest}.pkl")
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Load an entry from disk, returning default when missing or unreadable."""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as fh:
+                stored_key, value = pickle.load(fh)
+        except (OSError, EOFError, pickle.UnpicklingError, ValueError, TypeError):
+            return default
+        # Guard against (unlikely) digest collisions
+        return value if stored_key == repr(key) else default
+
+    def set(self, key: Hashable, value: Any) -> None:
+        """Persist an entry atomically."""
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "wb") as fh:
+                pickle.dump((repr(key), value), fh, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, path)
+        except Exception:
+            logging.warning("Could not write disk cache entry %s", path, exc_info=True)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        self._prune()
+
+    def pop(self, key: Hashable) -> None:
+        """Delete an entry if it exists."""
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def clear(self) -> None:
+        """Delete all entries."""
+        for name in os.listdir(self.directory):
+            if name.endswith(".pkl"):
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except OSError:
+                    pass
+
+    def _prune(self) -> None:
+        files = [
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+            if name.endswith(".pkl")
+        ]
+        if len(files) <= self.max_entries:
+            return
+        files.sort(key=lambda p: os.path.getmtime(p))
+        for path in files[:len(files) - self.max_entries]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
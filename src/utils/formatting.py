@@ -2,89 +2,189 @@
 Result formatting utilities.
 """
 import json
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
+from .result import QueryResult
 
-def enrich_results_with_mercadoria_names(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+
+def result_rows(results: Any, limit: Optional[int] = None) -> List[Dict[str, Any]]:
     """
-    Enrich query results with mercadoria names instead of codes.
+    Rows of a query result as dictionaries.
 
     Args:
-        results: Query results
+        results: QueryResult, pyarrow.Table or list of dictionaries (only the
+            needed rows of columnar results are converted)
+        limit: Optional maximum number of rows
 
     Returns:
-        Enriched results with mercadoria names
+        List of dictionaries
     """
-    if not results:
-        return results
+    if results is None:
+        return []
+    if isinstance(results, QueryResult):
+        return results.to_pylist(limit)
+    if hasattr(results, "to_pylist"):
+        if limit is not None:
+            results = results.slice(0, limit)
+        return results.to_pylist()
+    return list(results[:limit]) if limit is not None else results
+
+
+# Code column -> (name column, ReferentialHelper batch method)
+LOCATION_COLUMNS = {
+    "destino": ("destino_nome", "batch_enrich_destinos"),
+    "origem": ("origem_nome", "batch_enrich_origens"),
+}
+
+
+def _code_label(nome_map: Dict[str, str], code: Any) -> Optional[str]:
+    if not code:
+        return None
+    code = str(code)
+    nome = nome_map.get(code, code)
+    # Formatted value with both code and name
+    return f"{nome} ({code})" if nome != code else code
+
+
+def _enrich_codes(results: Any, source: str, target: str, lookup) -> Any:
+    """
+    Add a name column for a code column, resolving all distinct codes in one lookup.
+
+    Columnar results get the column computed once per distinct code; row
+    lists get the key per row.
 
-    # Collect unique mercadoria codes
-    mercadoria_codes = set()
-    for row in results:
-        if 'cdmercadoria' in row and row['cdmercadoria']:
-            mercadoria_codes.add(str(row['cdmercadoria']))
+    Args:
+        results: QueryResult, pyarrow.Table or list of dictionaries
+        source: Code column
+        target: Name column to add
+        lookup: Function mapping a list of codes to a code -> name dict
 
-    if not mercadoria_codes:
+    Returns:
+        Enriched results (QueryResult for columnar input, list otherwise)
+    """
+    columnar = isinstance(results, QueryResult) or hasattr(results, "schema")
+    if columnar:
+        results = QueryResult.coerce(results)
+        if not results or source not in results:
+            return results
+        codes = {str(code) for code in results.distinct(source) if code}
+    else:
+        if not results:
+            return results
+        # Collect unique codes
+        codes = {str(row[source]) for row in results if source in row and row[source]}
+
+    if not codes:
         return results
 
-    # Batch lookup mercadoria names
     try:
-        from src.bigquery.referential_helper import get_referential_helper
-        helper = get_referential_helper()
-        nome_map = helper.batch_get_mercadoria_nomes(list(mercadoria_codes))
+        nome_map = lookup(list(codes))
+
+        if columnar:
+            return results.map_column(source, lambda code: _code_label(nome_map, code), target)
 
         # Create enriched results
         enriched = []
         for row in results:
             new_row = dict(row)
-            if 'cdmercadoria' in row and row['cdmercadoria']:
-                code = str(row['cdmercadoria'])
-                nome = nome_map.get(code, code)
-                # Add formatted column with both code and name
-                new_row['mercadoria_nome'] = f"{nome} ({code})" if nome != code else code
+            if source in row and row[source]:
+                new_row[target] = _code_label(nome_map, row[source])
             enriched.append(new_row)
 
         return enriched
     except Exception as e:
         # If enrichment fails, return original results
         import logging
-        logging.warning(f"Could not enrich mercadoria names: {e}")
+        logging.warning(f"Could not enrich {source} names: {e}")
         return results
 
 
-def format_results_for_llm(results: List[Dict[str, Any]], enrich: bool = True) -> str:
+def enrich_results_with_mercadoria_names(results: Any) -> Any:
+    """
+    Enrich query results with mercadoria names instead of codes.
+
+    Columnar results get a mercadoria_nome column computed once per distinct
+    code; row lists get a mercadoria_nome key per row.
+
+    Args:
+        results: QueryResult, pyarrow.Table or list of dictionaries
+
+    Returns:
+        Enriched results (QueryResult for columnar input, list otherwise)
+    """
+    def lookup(codes):
+        from src.bigquery.referential_helper import get_referential_helper
+        return get_referential_helper().batch_get_mercadoria_nomes(codes)
+
+    return _enrich_codes(results, "cdmercadoria", "mercadoria_nome", lookup)
+
+
+def enrich_results_with_location_names(results: Any) -> Any:
+    """
+    Enrich query results with destino/origem descriptions (City, UF - Country).
+
+    Each location column present gets a *_nome column, with every distinct
+    code resolved in a single batch lookup.
+
+    Args:
+        results: QueryResult, pyarrow.Table or list of dictionaries
+
+    Returns:
+        Enriched results (QueryResult for columnar input, list otherwise)
+    """
+    for source, (target, method) in LOCATION_COLUMNS.items():
+        def lookup(codes, method=method):
+            from src.bigquery.referential_helper import get_referential_helper
+            return getattr(get_referential_helper(), method)(codes)
+
+        results = _enrich_codes(results, source, target, lookup)
+    return results
+
+
+def format_results_for_llm(results: Any, enrich: bool = True) -> str:
     """
     Format query results for LLM consumption.
     Optionally enriches mercadoria codes with names.
 
     Args:
-        results: Query results
+        results: Query results (QueryResult, pyarrow.Table or list of dictionaries)
         enrich: Whether to enrich mercadoria codes with names
 
     Returns:
         Formatted string
     """
-    if not results:
+    if results is None or len(results) == 0:
         return "Nenhum resultado encontrado."
 
-    # Enrich results with mercadoria names if requested
+    total = len(results)
+    # Only the rows that can be shown are converted (and enriched)
+    if isinstance(results, QueryResult):
+        results = results.head(100)
+    else:
+        results = result_rows(results, limit=100)
+
+    # Enrich results with mercadoria and location names if requested
     if enrich:
         results = enrich_results_with_mercadoria_names(results)
+        results = enrich_results_with_location_names(results)
+    results = result_rows(results, limit=20)
 
-    if len(results) > 100:
-        results = results[:100]
-        header = f"Primeiros 100 de {len(results)} resultados:\n"
+    if total > 100:
+        header = f"Primeiros 100 de {total} resultados:\n"
     else:
-        header = f"{len(results)} resultados:\n"
+        header = f"{total} resultados:\n"
 
     # Format as table
     lines = [header]
 
-    # Get headers - use mercadoria_nome if available
+    # Get headers - use the *_nome columns if available
     headers = list(results[0].keys())
-    # Prefer mercadoria_nome over cdmercadoria for display
-    if 'mercadoria_nome' in headers:
-        headers.remove('cdmercadoria')
+    # Prefer names over codes for display (names include the code)
+    for code_column, name_column in [("cdmercadoria", "mercadoria_nome")] + [
+        (source, target) for source, (target, _) in LOCATION_COLUMNS.items()
+    ]:
+        if name_column in headers and code_column in headers:
+            headers.remove(code_column)
 
     lines.append(" | ".join(headers))
     lines.append("-" * min(100, len(" | ".join(headers))))
@@ -99,26 +199,26 @@ def format_results_for_llm(results: List[Dict[str, Any]], enrich: bool = True) -
             values.append(val_str)
         lines.append(" | ".join(values))
 
-    if len(results) > 20:
-        lines.append(f"... e mais {len(results) - 20} linhas")
+    if total > 20:
+        lines.append(f"... e mais {total - 20} linhas")
 
     return "\n".join(lines)
 
 
-def format_results_for_display(results: List[Dict[str, Any]]) -> str:
+def format_results_for_display(results: Any) -> str:
     """
     Format results for Streamlit display.
 
     Args:
-        results: Query results
+        results: Query results (QueryResult, pyarrow.Table or list of dictionaries)
 
     Returns:
         Formatted string
     """
-    if not results:
+    if results is None or len(results) == 0:
         return "Nenhum resultado encontrado."
 
-    return json.dumps(results, indent=2, ensure_ascii=False, default=str)
+    return json.dumps(result_rows(results), indent=2, ensure_ascii=False, default=str)
 
 
 def format_sql_query(query: str) -> str:
@@ -144,3 +244,22 @@ def format_sql_query(query: str) -> str:
         query = re.sub(rf'\b{kw}\b', f'\n{kw}', query, flags=re.IGNORECASE)
 
     return query.strip()
+
+
+def format_bytes(num_bytes: int) -> str:
+    """
+    Format a byte count for user-facing messages.
+
+    Args:
+        num_bytes: Number of bytes
+
+    Returns:
+        Human-readable size (e.g. "2,5 GB")
+    """
+    units = ["B", "KB", "MB", "GB", "TB"]
+    size = float(num_bytes or 0)
+    index = 0
+    while size >= 1024 and index < len(units) - 1:
+        size /= 1024
+        index += 1
+    return f"{size:.1f} {units[index]}".replace(".", ",")
@@ -0,0 +1,203 @@
+"""
+Columnar query result shared by the BigQuery client, the agent nodes,
+the formatters and the UI.
+
+QueryResult wraps an immutable pyarrow.Table. Slicing, renaming and adding
+columns share the existing buffers instead of copying rows. Only the rows that
+are actually shown are converted to Python dictionaries. Column enrichment maps
+each distinct value once and builds the new column with Arrow kernels.
+"""
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+
+class QueryResult:
+    """
+    Immutable columnar result (pyarrow.Table) with column metadata.
+    """
+
+    def __init__(self, table, labels: Optional[Dict[str, str]] = None):
+        """
+        Initialize the result.
+
+        Args:
+            table: pyarrow.Table
+            labels: Optional display label per column name
+        """
+        self._table = table
+        self.labels = dict(labels or {})
+
+    @classmethod
+    def from_rows(cls, rows: Optional[List[Dict[str, Any]]]) -> "QueryResult":
+        """
+        Build a result from a list of dictionaries.
+
+        Args:
+            rows: Result rows
+
+        Returns:
+            QueryResult
+        """
+        import pyarrow as pa
+        return cls(pa.Table.from_pylist(list(rows or [])))
+
+    @classmethod
+    def coerce(cls, data: Any) -> "QueryResult":
+        """
+        Wrap a QueryResult, pyarrow.Table, list of dictionaries or None.
+
+        Args:
+            data: Result in any supported representation
+
+        Returns:
+            QueryResult
+        """
+        if isinstance(data, cls):
+            return data
+        if data is not None and hasattr(data, "schema") and hasattr(data, "to_pylist"):
+            return cls(data)
+        return cls.from_rows(data)
+
+    # --- Size and schema ---------------------------------------------------
+
+    @property
+    def num_rows(self) -> int:
+        """Number of rows."""
+        return self._table.num_rows
+
+    def __len__(self) -> int:
+        return self._table.num_rows
+
+    def __bool__(self) -> bool:
+        return self._table.num_rows > 0
+
+    @property
+    def column_names(self) -> List[str]:
+        """Column names in order."""
+        return list(self._table.column_names)
+
+    @property
+    def columns(self) -> List[Dict[str, str]]:
+        """Column metadata: name, Arrow type and display label."""
+        return [
+            {
+                "name": field.name,
+                "type": str(field.type),
+                "label": self.labels.get(field.name, field.name),
+            }
+            for field in self._table.schema
+        ]
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the Arrow buffers."""
+        return self._table.nbytes
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._table.column_names
+
+    # --- Zero-copy transformations ---------------------------------------
+
+    def head(self, n: int) -> "QueryResult":
+        """First n rows (shares buffers with this result)."""
+        return QueryResult(self._table.slice(0, n), self.labels)
+
+    def select(self, names: Iterable[str]) -> "QueryResult":
+        """Subset of columns (shares buffers with this result)."""
+        return QueryResult(self._table.select(list(names)), self.labels)
+
+    def with_labels(self, labels: Dict[str, str]) -> "QueryResult":
+        """Same data with additional display labels."""
+        merged = dict(self.labels)
+        merged.update({name: label for name, label in labels.items() if name in self})
+        return QueryResult(self._table, merged)
+
+    def with_column(self, name: str, values: Any) -> "QueryResult":
+        """
+        Add (or replace) a column.
+
+        Args:
+            name: Column name
+            values: pyarrow array/chunked array or Python list with one value per row
+
+        Returns:
+            New QueryResult sharing the other columns
+        """
+        import pyarrow as pa
+
+        if not isinstance(values, (pa.Array, pa.ChunkedArray)):
+            values = pa.array(values)
+        if name in self:
+            index = self._table.column_names.index(name)
+            return QueryResult(self._table.set_column(index, name, values), self.labels)
+        return QueryResult(self._table.append_column(name, values), self.labels)
+
+    def map_column(
+        self,
+        source: str,
+        fn: Callable[[Any], Any],
+        target: Optional[str] = None
+    ) -> "QueryResult":
+        """
+        Derive a column by applying fn once per distinct value of source.
+
+        Args:
+            source: Existing column
+            fn: Function applied to each distinct Python value (None included)
+            target: Name of the new column (defaults to replacing source)
+
+        Returns:
+            New QueryResult
+        """
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        column = self._table.column(source)
+        distinct = pc.unique(column)
+        mapped = pa.array([fn(value) for value in distinct.to_pylist()])
+        positions = pc.index_in(column, value_set=distinct)
+        return self.with_column(target or source, pc.take(mapped, positions))
+
+    # --- Conversions -------------------------------------------------------
+
+    def column(self, name: str) -> List[Any]:
+        """Values of one column as a Python list."""
+        return self._table.column(name).to_pylist()
+
+    def distinct(self, name: str) -> List[Any]:
+        """Distinct values of one column (computed by Arrow)."""
+        import pyarrow.compute as pc
+        return pc.unique(self._table.column(name)).to_pylist()
+
+    def to_pylist(self, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Rows as dictionaries.
+
+        Args:
+            limit: Optional maximum number of rows (only those are converted)
+
+        Returns:
+            List of dictionaries
+        """
+        table = self._table if limit is None else self._table.slice(0, limit)
+        return table.to_pylist()
+
+    def to_arrow(self, use_labels: bool = False):
+        """
+        Underlying pyarrow.Table (zero-copy, e.g. for st.dataframe).
+
+        Args:
+            use_labels: Rename columns to their display labels
+
+        Returns:
+            pyarrow.Table
+        """
+        if not use_labels or not self.labels:
+            return self._table
+        return self._table.rename_columns([self.labels.get(n, n) for n in self._table.column_names])
+
+    def to_pandas(self):
+        """Result as a pandas DataFrame (copies the data)."""
+        return self._table.to_pandas()
+
+    def __repr__(self) -> str:
+        return f"QueryResult({self.num_rows} rows, columns={self.column_names})"
@@ -0,0 +1,112 @@
+"""
+Tests for the aggregate router (cube rewrite of agent queries).
+"""
+import os
+
+import pytest
+
+pytest.importorskip("sqlglot")
+
+from src.agent.aggregate_router import rewrite_for_cube
+
+
+VIEW = "`antaqdados.br_antaq_estatistico_aquaviario.v_carga_metodologia_oficial`"
+OFFICIAL = "c.isValidoMetodologiaANTAQ = 1 AND c.vlpesocargabruta_oficial > 0"
+
+TOTAL_BY_PORT = f"""
+SELECT c.porto_atracacao, SUM(c.vlpesocargabruta_oficial) AS total_toneladas, COUNT(*) AS operacoes
+FROM {VIEW} c
+WHERE {OFFICIAL} AND c.ano = 2024 AND c.sentido = 'Embarcados'
+GROUP BY c.porto_atracacao
+ORDER BY total_toneladas DESC
+"""
+
+
+def test_rewrites_sum_and_count_by_dimension():
+    """Test that SUM/COUNT by cube dimensions reads the cube without the baked filters."""
+    rewrite = rewrite_for_cube(TOTAL_BY_PORT)
+    assert rewrite["table"] == "antaqdados.br_antaq_estatistico_aquaviario.carga_mensal_cubo"
+    sql = rewrite["sql"]
+    assert "carga_mensal_cubo" in sql and "v_carga_metodologia_oficial" not in sql
+    assert "SUM(c.carga_total)" in sql
+    assert "COALESCE(SUM(c.registros), 0)" in sql
+    assert "isValidoMetodologiaANTAQ" not in sql
+    assert "c.ano = 2024" in sql
+
+
+def test_uncovered_queries_stay_on_the_view():
+    """Test that other columns, joins and missing official filters are not rewritten."""
+    assert rewrite_for_cube(TOTAL_BY_PORT.replace("c.porto_atracacao", "c.nacionalidadearmador")) is None
+    assert rewrite_for_cube(TOTAL_BY_PORT.replace(" AND c.vlpesocargabruta_oficial > 0", "")) is None
+    assert rewrite_for_cube(TOTAL_BY_PORT.replace("SUM(c.vlpesocargabruta_oficial)", "AVG(c.vlpesocargabruta_oficial)")) is None
+    assert rewrite_for_cube(f"SELECT c.porto_atracacao FROM {VIEW} c WHERE {OFFICIAL}") is None
+    joined = TOTAL_BY_PORT.replace(
+        "FROM " + VIEW + " c",
+        "FROM " + VIEW + " c JOIN `antaqdados.br_antaq_estatistico_aquaviario.mercadoria_carga` m "
+        "ON c.cdmercadoria = m.cdmercadoria"
+    )
+    assert rewrite_for_cube(joined) is None
+
+
+@pytest.fixture
+def cube_backend(tmp_path):
+    """DuckDB backend over a one-month replica and the cube built from it."""
+    pytest.importorskip("duckdb")
+    pa = pytest.importorskip("pyarrow")
+    pq = pytest.importorskip("pyarrow.parquet")
+    from src.bigquery.cube import build_cube_from_replica
+    from src.bigquery.duckdb_backend import DuckDBBackend
+
+    rows = [
+        ("Santos", "Embarcados", 100.0, 1),
+        ("Santos", "Embarcados", 50.0, 1),
+        ("Santos", "Embarcados", 999.0, 0),
+        ("Santos", "Desembarcados", 20.0, 1),
+        ("Paranaguá", "Embarcados", 70.0, 1),
+        ("Paranaguá", "Embarcados", 0.0, 1),
+    ]
+    partition = os.path.join(str(tmp_path), "v_carga_metodologia_oficial", "ano=2024", "mes=3")
+    os.makedirs(partition)
+    pq.write_table(pa.table({
+        "porto_atracacao": [r[0] for r in rows],
+        "uf": ["SP"] * len(rows),
+        "sentido": [r[1] for r in rows],
+        "cdmercadoria": ["1201"] * len(rows),
+        "destino": [None] * len(rows),
+        "tipo_de_navegacao_da_atracacao": ["Longo Curso"] * len(rows),
+        "tipo_operacao_da_carga": ["Longo Curso Exportação"] * len(rows),
+        "vlpesocargabruta_oficial": [r[2] for r in rows],
+        "isValidoMetodologiaANTAQ": [r[3] for r in rows],
+    }), os.path.join(partition, "part-0.parquet"))
+    build_cube_from_replica(str(tmp_path))
+
+    backend = DuckDBBackend(str(tmp_path))
+    yield backend
+    backend.close()
+
+
+def test_rewrite_matches_view_on_duckdb(cube_backend):
+    """Test that the rewritten query returns the same rows as the view."""
+    view = cube_backend.query(TOTAL_BY_PORT)
+    cube = cube_backend.query(rewrite_for_cube(TOTAL_BY_PORT)["sql"])
+    assert cube == view
+    assert view == [
+        {"porto_atracacao": "Santos", "total_toneladas": 150.0, "operacoes": 2},
+        {"porto_atracacao": "Paranaguá", "total_toneladas": 70.0, "operacoes": 1},
+    ]
+
+
+def test_validated_port_filter_runs_on_cube_and_view(cube_backend):
+    """Test that validator output with an accent-insensitive port filter runs on the cube and the view."""
+    from src.utils.validation import SQLValidator
+
+    validated = SQLValidator().validate(f"""
+        SELECT SUM(c.vlpesocargabruta_oficial) AS total_toneladas
+        FROM {VIEW} c
+        WHERE {OFFICIAL} AND c.ano = 2024 AND LOWER(c.porto_atracacao) LIKE '%paranaguá%'
+    """)["sanitized_query"]
+    rewrite = rewrite_for_cube(validated)
+    assert rewrite is not None and "NORMALIZE" in rewrite["sql"]
+
+    assert cube_backend.query(rewrite["sql"]) == [{"total_toneladas": 70.0}]
+    assert cube_backend.query(validated) == [{"total_toneladas": 70.0}]
@@ -0,0 +1,58 @@
+"""
+Tests for the query result artifact store.
+"""
+import datetime
+
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from src.agent.artifacts import ResultStore, infer_result_schema
+from src.utils.result import QueryResult
+
+
+ROWS = [
+    {"porto_atracacao": "Santos", "ano": 2024, "total_toneladas": 1200.5},
+    {"porto_atracacao": "Paranaguá", "ano": 2024, "total_toneladas": None},
+]
+
+
+def test_put_returns_handle_instead_of_rows():
+    """Test that only the handle, row count and schema are returned for the state."""
+    store = ResultStore(max_entries=4)
+    artifact = store.put(ROWS)
+
+    assert set(artifact) == {"results_handle", "row_count", "result_schema"}
+    assert artifact["row_count"] == 2
+    assert artifact["result_schema"] == [
+        {"name": "porto_atracacao", "type": "string"},
+        {"name": "ano", "type": "int64"},
+        {"name": "total_toneladas", "type": "double"},
+    ]
+    result = store.get(artifact["results_handle"])
+    assert isinstance(result, QueryResult)
+    assert result.to_pylist() == ROWS
+
+
+def test_unknown_and_evicted_handles_resolve_to_none():
+    """Test that expired handles do not raise."""
+    store = ResultStore(max_entries=1)
+    first = store.put(ROWS)["results_handle"]
+    store.put([{"ano": 2025}])
+
+    assert store.get(first) is None
+    assert store.get("missing") is None
+    assert store.get(None) is None
+
+
+def test_parquet_copy_survives_new_store(tmp_path):
+    """Test that handles resolve from Parquet in a fresh process-level store."""
+    rows = [{"ano": 2024, "data": datetime.date(2024, 1, 31), "peso": 10.0}]
+    handle = ResultStore(directory=str(tmp_path)).put(rows)["results_handle"]
+
+    assert ResultStore(directory=str(tmp_path)).get(handle).to_pylist() == rows
+
+
+def test_schema_of_empty_result():
+    """Test that empty results have an empty schema."""
+    assert infer_result_schema([]) == []
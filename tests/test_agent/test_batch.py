@@ -0,0 +1,103 @@
+"""
+Tests for the batch question runner.
+"""
+import asyncio
+import json
+import threading
+
+import pytest
+
+from src.agent.batch import load_questions, main, run_batch
+
+
+def _fake_query_fn(calls, fail=()):
+    state = {"in_flight": 0, "max_in_flight": 0}
+
+    async def query_fn(question, thread_id, max_attempts):
+        state["in_flight"] += 1
+        state["max_in_flight"] = max(state["max_in_flight"], state["in_flight"])
+        await asyncio.sleep(0.01)
+        state["in_flight"] -= 1
+        calls.append((question, thread_id))
+        if question in fail:
+            raise RuntimeError("falhou")
+        return {"final_answer": f"resposta: {question}", "validated_sql": "SELECT 1", "row_count": 1}
+
+    return query_fn, state
+
+
+def test_bounded_concurrency_and_thread_ids(tmp_path):
+    """Test that concurrency is bounded and each question gets its own thread."""
+    calls = []
+    query_fn, state = _fake_query_fn(calls)
+    output = tmp_path / "out.jsonl"
+
+    summary = asyncio.run(run_batch(
+        [f"pergunta {i}" for i in range(6)], str(output), concurrency=2, query_fn=query_fn
+    ))
+
+    assert summary["ok"] == 6
+    assert state["max_in_flight"] == 2
+    assert len({thread_id for _, thread_id in calls}) == 6
+    assert len(output.read_text(encoding="utf-8").splitlines()) == 6
+
+
+def test_resume_skips_completed_and_retries_errors(tmp_path):
+    """Test that a resumed run only re-executes failed questions."""
+    output = tmp_path / "out.jsonl"
+    questions = ["a", "b", "c"]
+
+    first_calls = []
+    query_fn, _ = _fake_query_fn(first_calls, fail={"b"})
+    summary = asyncio.run(run_batch(questions, str(output), query_fn=query_fn))
+    assert (summary["ok"], summary["error"]) == (2, 1)
+
+    second_calls = []
+    query_fn, _ = _fake_query_fn(second_calls)
+    summary = asyncio.run(run_batch(questions, str(output), query_fn=query_fn))
+    assert [question for question, _ in second_calls] == ["b"]
+    assert summary["skipped"] == 2
+
+    records = [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+    assert [r["status"] for r in records if r["id"] == "q0002"] == ["error", "ok"]
+
+
+def test_load_questions_csv_and_text(tmp_path):
+    """Test that CSV (with ids) and text inputs are supported."""
+    csv_path = tmp_path / "perguntas.csv"
+    csv_path.write_text("id,question\nsantos,Carga de Santos em 2024\n,Carga total em 2024\n", encoding="utf-8")
+    assert load_questions(str(csv_path)) == [
+        {"id": "santos", "question": "Carga de Santos em 2024"},
+        {"id": "q0002", "question": "Carga total em 2024"},
+    ]
+
+    txt_path = tmp_path / "perguntas.txt"
+    txt_path.write_text("# boletim\nPergunta 1\n\nPergunta 2\n", encoding="utf-8")
+    assert [q["question"] for q in load_questions(str(txt_path))] == ["Pergunta 1", "Pergunta 2"]
+
+
+def test_cli_closes_checkpoint_database(tmp_path, monkeypatch, capsys):
+    """Test that antaq-batch returns with the SQLite checkpointer closed."""
+    pytest.importorskip("aiosqlite")
+    pytest.importorskip("langgraph.checkpoint.sqlite.aio")
+    from src.agent import graph
+
+    class FakeGraph:
+        async def ainvoke(self, state, config=None):
+            return {"final_answer": f"resposta: {state['question']}", "node_timings": None}
+
+    monkeypatch.setenv("LANGCHAIN_CHECKPOINT_PATH", str(tmp_path / "checkpoints.db"))
+    monkeypatch.setattr(graph, "create_graph", lambda **kwargs: FakeGraph())
+    questions = tmp_path / "perguntas.txt"
+    questions.write_text("Quanto Santos movimentou em 2024?\nE Paranaguá?\n", encoding="utf-8")
+    output = tmp_path / "out.jsonl"
+
+    assert main([str(questions), "-o", str(output), "--no-rows"]) == 0
+    assert "2 ok" in capsys.readouterr().out
+    assert graph._bound_store is None
+    assert (tmp_path / "checkpoints.db").exists()
+
+    workers = [t for t in threading.enumerate() if "_connection_worker_thread" in t.name]
+    for worker in workers:
+        worker.join(5)
+    assert not any(worker.is_alive() for worker in workers)
@@ -0,0 +1,149 @@
+"""
+Tests for checkpoint retention (compaction, TTL garbage collection) and the runtime loop.
+"""
+import asyncio
+import os
+import subprocess
+import sys
+import textwrap
+import time
+
+import pytest
+
+from src.agent.runtime import AgentRuntime
+
+
+async def _insert_checkpoints(store, thread_id, count):
+    for i in range(count):
+        await store.conn.execute(
+            "INSERT INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id, type, checkpoint, metadata) "
+            "VALUES (?, '', ?, 'msgpack', x'00', x'00')",
+            (thread_id, f"{i:04d}")
+        )
+        await store.conn.execute(
+            "INSERT INTO writes (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, type, value) "
+            "VALUES (?, '', ?, 't', 0, 'messages', 'msgpack', x'00')",
+            (thread_id, f"{i:04d}")
+        )
+    await store.conn.commit()
+
+
+def test_compaction_and_ttl_gc(tmp_path):
+    """Test that threads keep the latest N checkpoints and idle threads are deleted."""
+    pytest.importorskip("aiosqlite")
+    pytest.importorskip("langgraph.checkpoint.sqlite.aio")
+    from src.agent.checkpoint import CheckpointStore
+
+    async def scenario():
+        store = await CheckpointStore.create(
+            str(tmp_path / "checkpoints.db"), keep_per_thread=5, thread_ttl_seconds=60
+        )
+        await _insert_checkpoints(store, "active", 12)
+        await _insert_checkpoints(store, "idle", 3)
+
+        assert await store.compact_thread("active") == 7
+        cursor = await store.conn.execute(
+            "SELECT MIN(checkpoint_id), COUNT(*) FROM checkpoints WHERE thread_id = 'active'"
+        )
+        assert await cursor.fetchone() == ("0007", 5)
+
+        await store.touch("active")
+        await store.conn.execute(
+            "INSERT INTO thread_activity (thread_id, last_seen) VALUES ('idle', ?)",
+            (time.time() - 3600,)
+        )
+        await store.conn.commit()
+        assert await store.collect_garbage() == 1
+
+        report = await store.size_report()
+        await store.close()
+        return report
+
+    report = asyncio.run(scenario())
+    assert (report["threads"], report["checkpoints"], report["writes"]) == (1, 5, 5)
+    assert report["file_bytes"] > 0
+
+
+def test_runtime_runs_coroutines_and_generators_on_one_loop():
+    """Test that the runtime keeps a single loop across calls and bridges async generators."""
+    runtime = AgentRuntime()
+
+    async def current_loop():
+        return asyncio.get_running_loop()
+
+    async def numbers():
+        for i in range(3):
+            await asyncio.sleep(0)
+            yield i
+
+    assert runtime.run(current_loop()) is runtime.run(current_loop()) is runtime.loop
+    assert list(runtime.iterate(numbers())) == [0, 1, 2]
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakeGraph:
+    async def ainvoke(self, state, config=None):
+        return {"final_answer": "ok", "node_timings": None}
+
+
+@pytest.fixture
+def bound_graph(tmp_path, monkeypatch):
+    """get_graph() with a real checkpoint database and a stub graph."""
+    pytest.importorskip("aiosqlite")
+    pytest.importorskip("langgraph.checkpoint.sqlite.aio")
+    from src.agent import graph
+
+    monkeypatch.setenv("LANGCHAIN_CHECKPOINT_PATH", str(tmp_path / "checkpoints.db"))
+    monkeypatch.setattr(graph, "create_graph", lambda **kwargs: FakeGraph())
+    yield graph
+    asyncio.run(graph.close_graph())
+
+
+def test_one_shot_query_exits(tmp_path):
+    """Test that asyncio.run(query_agente(...)) with the SQLite checkpointer lets the process exit."""
+    pytest.importorskip("aiosqlite")
+    pytest.importorskip("langgraph.checkpoint.sqlite.aio")
+    script = textwrap.dedent("""
+        import asyncio
+        from src.agent import graph
+
+        class FakeGraph:
+            async def ainvoke(self, state, config=None):
+                return {"final_answer": "ok", "node_timings": None}
+
+        graph.create_graph = lambda **kwargs: FakeGraph()
+        print(asyncio.run(graph.query_agente("Quanto Santos movimentou em 2024?", thread_id="t1"))["final_answer"])
+    """)
+    env = dict(os.environ, LANGCHAIN_CHECKPOINT_PATH=str(tmp_path / "checkpoints.db"))
+    done = subprocess.run(
+        [sys.executable, "-c", script], cwd=ROOT, env=env, capture_output=True, text=True, timeout=60
+    )
+    assert done.returncode == 0, done.stderr
+    assert done.stdout.strip().endswith("ok")
+    assert (tmp_path / "checkpoints.db").exists()
+
+
+def test_new_loop_closes_previous_store_and_close_graph(bound_graph):
+    """Test that rebinding from a new loop closes the old connection and close_graph releases it."""
+    async def bind():
+        await bound_graph.get_graph()
+        return bound_graph._bound_store
+
+    first = asyncio.run(bind())
+    second = asyncio.run(bind())
+    assert second is not first
+
+    async def closed(store):
+        with pytest.raises(ValueError):
+            await store.size_report()
+
+    asyncio.run(closed(first))
+
+    async def close():
+        await bound_graph.close_graph()
+        return bound_graph._bound_store
+
+    assert asyncio.run(close()) is None
+    asyncio.run(closed(second))
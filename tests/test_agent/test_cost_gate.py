@@ -0,0 +1,124 @@
+"""
+Tests for the dry-run cost gate node.
+"""
+import asyncio
+
+import pytest
+
+from langchain_core.messages import AIMessage, SystemMessage
+
+from src.agent import graph, nodes
+
+
+GB = 1024 ** 3
+
+
+class FakeClient:
+    def __init__(self, total_bytes=None, error=None):
+        self.total_bytes = total_bytes
+        self.error = error
+        self.executed = []
+
+    async def adry_run(self, sql):
+        if self.error:
+            raise self.error
+        return {
+            "total_bytes_processed": self.total_bytes,
+            "referenced_tables": ["antaqdados.br_antaq_estatistico_aquaviario.v_carga_metodologia_oficial"],
+        }
+
+    async def aquery_arrow(self, sql, key=None):
+        import pyarrow as pa
+        self.executed.append(sql)
+        return pa.table({"carga_total": [1.0]})
+
+
+class FakeLLM:
+    def __init__(self):
+        self.sql_calls = 0
+
+    async def ainvoke(self, messages):
+        if isinstance(messages[0], SystemMessage):
+            self.sql_calls += 1
+            return AIMessage(content=f"```sql\nSELECT {self.sql_calls} AS tentativa\n```")
+        return AIMessage(content="Resposta com os dados consultados.")
+
+
+class FakeValidator:
+    def validate(self, sql):
+        return {"is_valid": True, "errors": [], "sanitized_query": sql}
+
+
+@pytest.fixture
+def limits(monkeypatch):
+    monkeypatch.setenv("AGENT_REWRITE_BYTES_THRESHOLD", str(2 * GB))
+    monkeypatch.setenv("AGENT_MAX_BYTES_PROCESSED", str(10 * GB))
+
+
+def _estimate(monkeypatch, client, attempt_count=1):
+    monkeypatch.setattr(nodes, "_get_backend", lambda: client)
+    state = {"validated_sql": "SELECT 1", "attempt_count": attempt_count, "max_attempts": 3}
+    return asyncio.run(nodes.estimate_cost_node(state))
+
+
+def test_cheap_query_executes(monkeypatch, limits):
+    """Test that queries under the rewrite threshold go straight to execution."""
+    update = _estimate(monkeypatch, FakeClient(GB))
+    assert update["cost_decision"] == "execute"
+    assert update["estimated_bytes"] == GB
+    assert update["referenced_tables"]
+
+
+def test_dry_run_failure_fails_open(monkeypatch, limits):
+    """Test that a failed dry run does not block execution."""
+    update = _estimate(monkeypatch, FakeClient(error=RuntimeError("boom")))
+    assert update["cost_decision"] == "execute"
+    assert update["estimated_bytes"] is None
+
+
+async def _prepared(state):
+    return {"dataset_schema": "schema", "schema_version": "v1"}
+
+
+def _run_graph(monkeypatch, client, max_attempts=3):
+    """Run the agent graph with fakes for the LLM, the validator and the backend."""
+    pytest.importorskip("pyarrow")
+    monkeypatch.setenv("QUESTION_CACHE_ENABLED", "false")
+    monkeypatch.setenv("INTENT_ROUTER_ENABLED", "false")
+    monkeypatch.setenv("AGGREGATE_ROUTER_ENABLED", "false")
+    monkeypatch.setattr(graph, "PREPARATION_NODES", {"setup_schema": _prepared})
+    monkeypatch.setattr(nodes, "_get_backend", lambda: client)
+    monkeypatch.setattr(nodes, "sql_validator", FakeValidator())
+    llm = FakeLLM()
+    monkeypatch.setattr(nodes, "get_llm", lambda: llm)
+
+    question = "Quanto foi movimentado em 2024?"
+    state = graph._build_initial_state(question, max_attempts, "cost-gate")
+    agent = graph.create_graph(use_cache=False)
+    final = asyncio.run(agent.ainvoke(state, graph._build_config("cost-gate")))
+    return final, llm
+
+
+def test_expensive_query_runs_on_last_attempt(monkeypatch, limits):
+    """Test that a query over the rewrite threshold is regenerated, then runs on the last attempt."""
+    client = FakeClient(5 * GB)
+    final, llm = _run_graph(monkeypatch, client)
+
+    assert llm.sql_calls == 2
+    assert any("Reescreva a SQL" in m.content for m in final["messages"])
+    assert final["cost_decision"] == "execute"
+    assert client.executed == ["SELECT 2 AS tentativa"]
+    assert final["sql_error"] is None
+    assert final["final_answer"] == "Resposta com os dados consultados."
+
+
+def test_runaway_query_is_refused_on_last_attempt(monkeypatch, limits):
+    """Test that a query over the hard limit is refused with a message once attempts run out."""
+    client = FakeClient(50 * GB)
+    final, llm = _run_graph(monkeypatch, client)
+
+    assert llm.sql_calls == 2
+    assert final["cost_decision"] == "refuse"
+    assert client.executed == []
+    assert "acima do limite" in final["final_answer"]
+
@@ -0,0 +1,53 @@
+"""
+Tests for the template intent router.
+"""
+from src.agent.intent_router import build_template_sql, format_template_answer, route_question
+
+
+OFFICIAL = "c.isValidoMetodologiaANTAQ = 1"
+
+
+def test_total_by_port_and_month():
+    """Test that a total question fills port, month, year and sentido slots."""
+    intent = route_question("Quantas toneladas foram exportadas pelo porto de Santos em janeiro de 2025?")
+    assert intent["name"] == "total"
+    assert intent["confidence"] == 1.0
+    sql = build_template_sql(intent, OFFICIAL)
+    assert "c.ano = 2025" in sql
+    assert "c.mes = 1" in sql
+    assert "c.sentido = 'Embarcados'" in sql
+    assert "LIKE '%santos%'" in sql
+
+
+def test_port_alias_and_commodity():
+    """Test that port aliases expand to several ports and commodities map to SH4 codes."""
+    intent = route_question("Quanto de soja foi exportado pelos Portos do Paraná em 2023?")
+    sql = build_template_sql(intent, OFFICIAL)
+    assert "'%paranagua%' OR LOWER(c.porto_atracacao) LIKE '%antonina%'" in sql
+    assert "c.cdmercadoria IN ('1201')" in sql
+
+
+def test_ranking_and_evolution():
+    """Test that ranking and evolução questions pick their templates."""
+    ranking = route_question("Quais são os 5 maiores portos em 2024?")
+    assert ranking["name"] == "ranking"
+    assert "LIMIT 5" in build_template_sql(ranking, OFFICIAL)
+
+    evolution = route_question("Qual foi a evolução mensal da carga em 2023 e 2024?")
+    assert evolution["name"] == "evolucao"
+    sql = build_template_sql(evolution, OFFICIAL)
+    assert "c.ano >= 2023" in sql and "c.ano <= 2024" in sql
+
+
+def test_unknown_filters_lower_confidence():
+    """Test that unexplained words (e.g. navigation type) keep the question on the LLM path."""
+    assert route_question("Qual a carga de cabotagem em Santos em 2024?")["confidence"] < 1.0
+    assert route_question("Compare a importação e exportação em 2024")["confidence"] < 1.0
+    assert route_question("Qual a movimentação de Santos?") is None
+
+
+def test_deterministic_answer():
+    """Test that template results are formatted without an LLM."""
+    intent = route_question("Quanto foi importado em março de 2024?")
+    answer = format_template_answer(intent, [{"ano": 2024, "peso_total_toneladas": 1234567.4}])
+    assert answer.startswith("Foram importadas **1.234.567 toneladas** em março de 2024")
@@ -0,0 +1,108 @@
+"""
+Tests for the question -> SQL cache.
+"""
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessage, HumanMessage
+
+from src.agent import nodes
+from src.agent.question_cache import QuestionCache, normalize_question, question_signature
+
+
+SQL = "SELECT SUM(vlpesocargabruta_oficial) FROM t WHERE ano = 2024 LIMIT 1000"
+
+
+@pytest.fixture
+def cache():
+    return QuestionCache(max_size=10, similarity_threshold=0.85)
+
+
+def test_normalize_accents_months_and_punctuation():
+    """Test that accents, months and punctuation are normalized."""
+    assert normalize_question("Quanto foi exportado em Março de 2024?") == \
+        "quanto foi exportacao em mes_3 de 2024"
+
+
+def test_normalize_port_alias():
+    """Test that port aliases map to the canonical port."""
+    assert "itaguai" in normalize_question("carga no porto de Sepetiba em 2024")
+    assert normalize_question("carga de São Francisco em 2024") == "carga de sao francisco do sul em 2024"
+    assert normalize_question("carga de São Francisco do Sul em 2024") == "carga de sao francisco do sul em 2024"
+    assert normalize_question("carga de Sepetibano") == "carga de sepetibano"
+
+
+def test_normalize_month_abbreviations():
+    """Test that abbreviated month names become month tokens."""
+    assert normalize_question("mar de 2024") == "mes_3 de 2024"
+    assert normalize_question("mai, set e out") == "mes_5 mes_9 e mes_10"
+
+
+def test_exact_hit_after_normalization(cache):
+    """Test that equivalent spellings hit the same entry."""
+    cache.store("quanto foi exportado em 2024", "v1", SQL)
+    hit = cache.lookup("Quanto foi EXPORTADO em 2024?", "v1")
+    assert hit is not None
+    assert hit["sql"] == SQL
+    assert hit["match"] == "exact"
+
+
+def test_schema_version_isolates_entries(cache):
+    """Test that a different schema version misses."""
+    cache.store("quanto foi exportado em 2024", "v1", SQL)
+    assert cache.lookup("quanto foi exportado em 2024", "v2") is None
+
+
+def test_similar_question_hit(cache):
+    """Test that a paraphrase with the same entities hits."""
+    cache.store(
+        "Quantas toneladas foram exportadas pelo porto de Santos em janeiro de 2025?", "v1", SQL
+    )
+    hit = cache.lookup("quantas toneladas o porto de santos exportou em janeiro de 2025", "v1")
+    assert hit is not None
+    assert hit["match"] == "similar"
+
+
+def test_different_entities_never_match(cache):
+    """Test that different years or ports do not share an entry."""
+    cache.store("quanto foi exportado em 2024", "v1", SQL)
+    assert cache.lookup("quanto foi exportado em 2023", "v1") is None
+    cache.store("quanto santos exportou em 2024", "v1", SQL)
+    assert cache.lookup("quanto paranagua exportou em 2024", "v1") is None
+
+
+def test_signature_ignores_generic_words():
+    """Test that the signature keeps only entities."""
+    signature = question_signature(normalize_question("Qual o total de carga de soja em 2024?"))
+    assert signature == ("2024", "soja")
+
+
+def test_answers_only_returned_when_enabled():
+    """Test that answers are cached only when configured."""
+    without_answers = QuestionCache()
+    without_answers.store("quanto foi exportado em 2024", "v1", SQL, "Resposta")
+    assert without_answers.lookup("quanto foi exportado em 2024", "v1")["answer"] is None
+
+    with_answers = QuestionCache(cache_answers=True)
+    with_answers.store("quanto foi exportado em 2024", "v1", SQL, "Resposta")
+    assert with_answers.lookup("quanto foi exportado em 2024", "v1")["answer"] == "Resposta"
+
+
+def test_follow_up_turn_misses_cache(cache, monkeypatch):
+    """Test that the cache node only answers first turns, like the store."""
+    monkeypatch.setattr(nodes, "get_question_cache", lambda: cache)
+    monkeypatch.setattr(nodes, "route_to_aggregate", lambda sql, backend: None)
+    monkeypatch.setattr(nodes, "_get_backend", lambda: None)
+    cache.store("quanto foi exportado em 2024", "v1", SQL)
+
+    first = {"question": "Quanto foi exportado em 2024?", "schema_version": "v1",
+             "messages": [HumanMessage(content="Quanto foi exportado em 2024?")]}
+    assert asyncio.run(nodes.check_question_cache_node(first))["question_cache_hit"] is True
+
+    follow_up = {"question": "Quanto foi exportado em 2024?", "schema_version": "v1", "messages": [
+        HumanMessage(content="E em Santos?"),
+        AIMessage(content="Santos movimentou 10 t."),
+        HumanMessage(content="Quanto foi exportado em 2024?"),
+    ]}
+    update = asyncio.run(nodes.check_question_cache_node(follow_up))
+    assert update == {"question_cache_hit": False, "sql_source": "llm"}
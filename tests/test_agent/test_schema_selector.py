@@ -0,0 +1,78 @@
+"""
+Tests for question-aware schema pruning.
+"""
+from src.agent.schema_selector import SchemaSelector, render_schema, tokenize
+
+
+def _record(tabela, coluna, categoria, descricao, tags=None):
+    return {
+        "tabela": tabela,
+        "coluna": coluna,
+        "categoria": categoria,
+        "descricao": descricao,
+        "tags": tags or [],
+        "line": f"- {coluna}: {descricao}",
+    }
+
+
+RECORDS = [
+    _record("v_carga_metodologia_oficial", "ano", "Temporal", "Ano da operação"),
+    _record("v_carga_metodologia_oficial", "mes", "Temporal", "Mês da operação"),
+    _record("v_carga_metodologia_oficial", "sentido", "Operação", "Embarcados ou Desembarcados"),
+    _record("v_carga_metodologia_oficial", "vlpesocargabruta_oficial", "Métricas", "Peso bruto em toneladas"),
+    _record("v_carga_metodologia_oficial", "isValidoMetodologiaANTAQ", "Validação", "Flag oficial"),
+    _record("v_carga_metodologia_oficial", "porto_atracacao", "Localização", "Nome do porto de atracação"),
+    _record("v_carga_metodologia_oficial", "uf", "Localização", "Unidade Federativa do porto", ["estado"]),
+    _record("v_carga_metodologia_oficial", "cdmercadoria", "Mercadoria", "Código da mercadoria", ["produto"]),
+    _record("v_carga_metodologia_oficial", "teu", "Métricas", "Quantidade de TEU de contêineres"),
+    _record("v_atracacao_validada", "tempo_atracado", "Tempo", "Horas do navio atracado no berço"),
+]
+
+
+def test_tokenize_splits_identifiers_and_stems():
+    """Test that camelCase/snake_case names and plural forms share tokens."""
+    assert {"valid", "metod", "antaq"} <= tokenize("isValidoMetodologiaANTAQ")
+    assert tokenize("exportações") == tokenize("exportacao")
+
+
+def test_core_columns_always_selected():
+    """Test that the core set is kept even for unrelated questions."""
+    selection = SchemaSelector(RECORDS).select("olá")
+    columns = {c.split(".")[1] for c in selection["columns"]}
+    assert {"ano", "mes", "sentido", "vlpesocargabruta_oficial", "isValidoMetodologiaANTAQ"} <= columns
+    assert "teu" not in columns
+    assert "v_atracacao_validada" not in selection["schema"]
+
+
+def test_relevant_columns_added_and_savings_reported():
+    """Test that matching columns are added and the token saving is reported."""
+    selector = SchemaSelector(RECORDS)
+    selection = selector.select("Quais estados mais exportaram contêineres em 2024?")
+    columns = {c.split(".")[1] for c in selection["columns"]}
+    assert {"uf", "teu"} <= columns
+    assert "tempo_atracado" not in columns
+    assert selection["full_tokens"] == selector.full_tokens
+    assert selection["saved_tokens"] == selection["full_tokens"] - selection["prompt_tokens"] > 0
+
+
+def test_token_budget_limits_optional_columns():
+    """Test that optional columns are dropped once the budget is exhausted."""
+    selection = SchemaSelector(RECORDS).select("estados e produtos com contêineres", token_budget=1)
+    columns = {c.split(".")[1] for c in selection["columns"]}
+    assert "uf" in columns
+    assert not {"cdmercadoria", "teu"} & columns
+
+
+def test_bare_port_name_keeps_port_column():
+    """Test that questions naming a port without the word "porto" keep the port column."""
+    selector = SchemaSelector(RECORDS)
+    for question in ("Quanto Santos movimentou em 2024?", "carga de Paranaguá em março"):
+        columns = {c.split(".")[1] for c in selector.select(question)["columns"]}
+        assert {"porto_atracacao", "uf"} <= columns
+
+
+def test_full_schema_matches_render():
+    """Test that the unpruned schema keeps the table/category layout."""
+    schema = render_schema(RECORDS)
+    assert schema.startswith("\n## Tabela: v_atracacao_validada\n")
+    assert "\n### Temporal\n\n- ano: Ano da operação\n- mes: Mês da operação" in schema
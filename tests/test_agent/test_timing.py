@@ -0,0 +1,45 @@
+"""
+Tests for per-node timing of the agent graph.
+"""
+import asyncio
+
+from src.agent.timing import build_timing_report, merge_node_timings, timed_node
+
+
+def _timing(start, end):
+    return {"start": start, "end": end, "duration_ms": (end - start) * 1000, "calls": 1}
+
+
+def test_reducer_resets_on_none_and_accumulates_retries():
+    """Test that None resets timings and repeated nodes accumulate."""
+    timings = merge_node_timings({"old": _timing(0, 1)}, None)
+    assert timings == {}
+
+    timings = merge_node_timings(timings, {"generate_sql": _timing(0.0, 0.5)})
+    timings = merge_node_timings(timings, {"generate_sql": _timing(1.0, 1.5)})
+    assert timings["generate_sql"]["calls"] == 2
+    assert timings["generate_sql"]["duration_ms"] == 1000
+    assert timings["generate_sql"]["end"] == 1.5
+
+
+def test_timed_node_reports_duration():
+    """Test that the wrapper keeps the node update and adds its timing."""
+    async def node(state):
+        return {"final_answer": "ok"}
+
+    update = asyncio.run(timed_node("answer", node)({}))
+    assert update["final_answer"] == "ok"
+    assert update["node_timings"]["answer"]["duration_ms"] >= 0
+
+
+def test_report_shows_parallel_saving():
+    """Test that overlapping branches yield wall time below the serial sum."""
+    report = build_timing_report({
+        "setup_schema": _timing(0.0, 1.0),
+        "retrieve_examples": _timing(0.0, 0.8),
+        "check_question_cache": _timing(1.0, 1.1),
+    })
+    assert [n["node"] for n in report["nodes"]][-1] == "check_question_cache"
+    assert round(report["serial_ms"]) == 1900
+    assert round(report["wall_ms"]) == 1100
+    assert round(report["parallel_saving_ms"]) == 800
@@ -0,0 +1,33 @@
+"""
+Tests for the shared BigQuery client registry.
+"""
+import threading
+
+import pytest
+
+pytest.importorskip("google.cloud.bigquery")
+from google.auth.credentials import AnonymousCredentials
+
+from src.bigquery.client_registry import ClientRegistry
+
+
+def test_one_pooled_client_per_project_location_and_credentials():
+    """Test that callers share one client per key, even when asking concurrently."""
+    registry = ClientRegistry(pool_size=4, warm_tokens=False)
+    credentials = AnonymousCredentials()
+    clients = []
+
+    def get():
+        clients.append(registry.get_client("proj", "US", credentials))
+
+    threads = [threading.Thread(target=get) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len({id(client) for client in clients}) == 1
+    adapter = clients[0]._http.get_adapter("https://bigquery.googleapis.com")
+    assert adapter._pool_maxsize == 4
+    assert registry.get_client("proj", "EU", credentials) is not clients[0]
+    registry.close()
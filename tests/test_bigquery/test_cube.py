@@ -0,0 +1,75 @@
+"""
+Tests for the monthly cargo cube.
+"""
+import os
+
+import pytest
+
+pytest.importorskip("duckdb")
+pytest.importorskip("sqlglot")
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+from src.bigquery.cube import CargoCube, build_cube_from_replica
+
+
+ROWS = [
+    # porto, uf, sentido, cdmercadoria, destino, tipo_operacao, peso, valido
+    ("Santos", "SP", "Embarcados", "1201", "CNSHA", "Longo Curso Exportação", 100.0, 1),
+    ("Santos", "SP", "Embarcados", "1201", "CNSHA", "Longo Curso Exportação", 50.0, 1),
+    ("Santos", "SP", "Embarcados", "2601", None, "Longo Curso Exportação", 30.0, 1),
+    ("Santos", "SP", "Desembarcados", "3102", "BRSSZ", "Cabotagem", 20.0, 1),
+    ("Santos", "SP", "Embarcados", "1201", "CNSHA", "Outros", 999.0, 1),
+    ("Santos", "SP", "Embarcados", "1201", "CNSHA", "Longo Curso Exportação", 999.0, 0),
+    ("Itaqui", "MA", "Embarcados", "2601", "NLRTM", "Longo Curso Exportação", 70.0, 1),
+]
+
+
+def _write_month(data_dir, ano, mes, rows):
+    partition = os.path.join(data_dir, "v_carga_metodologia_oficial", f"ano={ano}", f"mes={mes}")
+    os.makedirs(partition)
+    pq.write_table(pa.table({
+        "porto_atracacao": [r[0] for r in rows],
+        "uf": [r[1] for r in rows],
+        "sentido": [r[2] for r in rows],
+        "cdmercadoria": [r[3] for r in rows],
+        "destino": [r[4] for r in rows],
+        "tipo_de_navegacao_da_atracacao": ["Longo Curso"] * len(rows),
+        "tipo_operacao_da_carga": [r[5] for r in rows],
+        "vlpesocargabruta_oficial": [r[6] for r in rows],
+        "isValidoMetodologiaANTAQ": [r[7] for r in rows],
+    }), os.path.join(partition, "part-0.parquet"))
+
+
+@pytest.fixture
+def cube(tmp_path):
+    _write_month(str(tmp_path), 2024, 3, ROWS)
+    _write_month(str(tmp_path), 2023, 3, ROWS[:1])
+    assert build_cube_from_replica(str(tmp_path)) == 2
+    return CargoCube(str(tmp_path))
+
+
+def test_port_overview_from_cube(cube):
+    """Test that the overview sections match the official filters of the live queries."""
+    sections = cube.overview("santos", 2024, 3)
+    totals = dict(zip(sections["resultado_atual"]["sentido"], sections["resultado_atual"]["carga_total"]))
+    assert totals == {"Embarcados": 180.0, "Desembarcados": 20.0}
+    assert sections["mercadorias_exp"]["cdmercadoria"].tolist() == ["1201", "2601"]
+    assert sections["destinos"]["destino"].tolist() == ["CNSHA", "Não informado"]
+    assert sections["uf"] == "SP"
+    assert sections["resultado_anterior"]["carga_total"].sum() == 100.0
+
+
+def test_brasil_overview_and_missing_month(cube):
+    """Test that Brasil aggregates every port and unbuilt months fall back (None)."""
+    sections = cube.overview("Brasil", 2024, 3)
+    assert sections["uf"] == "BR"
+    assert sections["resultado_atual"]["carga_total"].sum() == 270.0
+    assert cube.overview("Brasil", 2024, 4) is None
+
+
+def test_missing_prior_year_month_falls_back(tmp_path):
+    """Test that a month without its prior-year month in the cube falls back (None)."""
+    _write_month(str(tmp_path), 2024, 3, ROWS)
+    assert build_cube_from_replica(str(tmp_path)) == 1
+    assert CargoCube(str(tmp_path)).overview("santos", 2024, 3) is None
@@ -0,0 +1,123 @@
+"""
+Tests for the in-memory reference table cache.
+"""
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+
+from src.bigquery.backend import QueryBackend
+from src.bigquery.dimension_cache import DimensionCache
+from src.bigquery.referential_helper import ReferentialHelper, resolve_mercadoria_names
+
+
+TABLES = {
+    "mercadoria_carga": [
+        {"cd_mercadoria": "1201", "nomenclatura_simplificada": "Soja"},
+        {"cd_mercadoria": "2601", "nomenclatura_simplificada": "Minério de ferro"},
+    ],
+    "instalacao_destino": [
+        {"origem": None, "destino": "ARROS", "cidade": "Rosario", "uf": None, "pais": "Argentina"},
+    ],
+    "instalacao_origem": [
+        {"origem": "BRITQ", "cidade": "São Luís", "uf": "MA", "pais": "Brasil"},
+    ],
+}
+
+
+class FakeBackend(QueryBackend):
+    """Serves whole reference tables and counts queries."""
+
+    dialect = "duckdb"
+
+    def __init__(self):
+        self.queries = []
+
+    def query(self, sql, job_config=None, use_cache=True, result_format="rows"):
+        self.queries.append(sql)
+        table = next(name for name in TABLES if f".{name}`" in sql)
+        return pa.Table.from_pylist(TABLES[table])
+
+    def dry_run(self, sql):
+        return {}
+
+    def get_schema(self, table_name):
+        return {}
+
+    def list_tables(self):
+        return list(TABLES)
+
+
+@pytest.fixture
+def helper(monkeypatch, tmp_path):
+    monkeypatch.setenv("DIMENSION_CACHE_DIR", str(tmp_path))
+    monkeypatch.setattr(ReferentialHelper, "_data_version", lambda self: self.version)
+    helper = ReferentialHelper(FakeBackend())
+    helper.version = "2025-08"
+    return helper
+
+
+def test_lookups_load_each_table_once(helper):
+    """Test that names, destinations and unknown codes are answered from one load per table."""
+    assert helper.batch_get_mercadoria_nomes(["1201", "2601", "9999"]) == {
+        "1201": "Soja", "2601": "Minério de ferro", "9999": "9999"
+    }
+    assert helper.get_mercadoria_nome("1201") == "Soja"
+    assert helper.enrich_destino_with_info("arros") == "Rosario - Argentina"
+    assert helper.enrich_destino_with_info("BRITQ") == "São Luís, MA - Brasil"
+    assert helper.enrich_destino_with_info("CLXYZ") == "Chile"
+    assert helper.enrich_destino_with_info("CLXYZ") == "Chile"
+    assert len(helper.backend.queries) == 3
+
+
+def test_snapshot_survives_restart_and_version_change_reloads(helper, tmp_path):
+    """Test that a new process reads the disk snapshot and a new data version reloads."""
+    helper.get_mercadoria_nome("1201")
+    cache = DimensionCache(lambda: "2025-08", snapshot_dir=str(tmp_path))
+    assert cache.lookup("mercadoria_carga", lambda: pytest.fail("should use the snapshot"))["1201"] == "Soja"
+
+    helper.version = "2025-09"
+    helper.get_mercadoria_nome("1201")
+    assert len(helper.backend.queries) == 2
+
+
+@pytest.mark.parametrize("cache_enabled", ["true", "false"])
+def test_batch_enrich_destinos_in_one_pass(helper, monkeypatch, cache_enabled):
+    """Test that a list of destinations is resolved with one load per location table."""
+    monkeypatch.setenv("DIMENSION_CACHE_ENABLED", cache_enabled)
+    helper = ReferentialHelper(FakeBackend())
+    helper.version = "2025-08"
+
+    names = helper.batch_enrich_destinos(["CNSHA", "ARROS", "BRITQ", "CLXYZ", "XXQQQ", "Não informado", "ARROS"])
+    assert names == {
+        "CNSHA": "Xangai - China",
+        "ARROS": "Rosario - Argentina",
+        "BRITQ": "São Luís, MA - Brasil",
+        "CLXYZ": "Chile",
+        "XXQQQ": "XXQQQ",
+        "Não informado": "Não informado",
+    }
+    assert helper.batch_enrich_origens(["BRITQ"]) == {"BRITQ": "São Luís, MA - Brasil"}
+    assert len(helper.backend.queries) == (2 if cache_enabled == "true" else 3)
+
+
+def test_resolve_mercadoria_names_column_priority():
+    """Test that names come from the name columns, then the shortest description, then the group."""
+    pd = pytest.importorskip("pandas")
+    frame = pd.DataFrame({
+        "cd_mercadoria": ["1201", "2601", "3000", "4000", "1201", None, " 5000 "],
+        "nomenclatura_simplificada": ["Soja", "12", "nan", None, "Outra", "Sem código", None],
+        "descricao": [None, "Minério de ferro", None, "12.3", None, None, None],
+        "observacao": [None, "Minério", "Milho em grão", "xx", None, None, None],
+        "complemento": [None, None, "Milho", None, None, None, "5000"],
+        "tipo_container": [None, None, "A", "Conteiner", None, None, None],
+        "string_field_3": ["G", "G", "G", "Grupo", None, None, None],
+    })
+
+    assert resolve_mercadoria_names(frame, "cd_mercadoria") == {
+        "1201": "Soja",
+        "2601": "Minério de ferro",
+        "3000": "Milho",
+        "4000": "Grupo",
+        "5000": "5000",
+    }
+    assert resolve_mercadoria_names(frame, "string_field_0") == {}
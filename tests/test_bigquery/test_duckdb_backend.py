@@ -0,0 +1,94 @@
+"""
+Tests for the DuckDB backend over a local Parquet replica.
+"""
+import asyncio
+import os
+
+import pytest
+
+pytest.importorskip("duckdb")
+pytest.importorskip("sqlglot")
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+from src.bigquery.duckdb_backend import DuckDBBackend
+from src.utils.validation import SQLValidator
+
+
+DATASET = "antaqdados.br_antaq_estatistico_aquaviario"
+
+
+@pytest.fixture
+def backend(tmp_path):
+    for ano, mes, pesos in ((2023, 1, [10.0, 5.0]), (2024, 1, [20.0, 1.0]), (2024, 2, [7.0, 3.0])):
+        partition = tmp_path / "v_carga_metodologia_oficial" / f"ano={ano}" / f"mes={mes}"
+        os.makedirs(partition)
+        pq.write_table(pa.table({
+            "porto_atracacao": ["Santos", "Paranaguá"],
+            "sentido": ["Embarcados", "Desembarcados"],
+            "cdmercadoria": ["1201", "2601"],
+            "vlpesocargabruta_oficial": pesos,
+        }), partition / "part-0.parquet")
+    pq.write_table(pa.table({
+        "cd_mercadoria": ["1201", "2601"],
+        "nomemercadoria": ["Soja", "Minério de ferro"],
+    }), tmp_path / "mercadoria_carga.parquet")
+
+    db = DuckDBBackend(str(tmp_path))
+    yield db
+    db.close()
+
+
+def test_runs_bigquery_sql_on_local_partitions(backend):
+    """Test that qualified BigQuery SQL runs against the hive-partitioned replica."""
+    rows = backend.query(f"""
+        SELECT c.porto_atracacao, SAFE_DIVIDE(SUM(c.vlpesocargabruta_oficial), 1) AS total
+        FROM `{DATASET}.v_carga_metodologia_oficial` c
+        WHERE c.ano = 2024 AND LOWER(c.porto_atracacao) LIKE '%santos%'
+        GROUP BY c.porto_atracacao
+    """)
+    assert rows == [{"porto_atracacao": "Santos", "total": 27.0}]
+    assert sorted(backend.list_tables()) == ["mercadoria_carga", "v_carga_metodologia_oficial"]
+
+
+def test_runs_validated_port_filters(backend):
+    """Test that the validator's accent-insensitive port filter runs on DuckDB."""
+    validated = SQLValidator().validate(f"""
+        SELECT SUM(c.vlpesocargabruta_oficial) AS total
+        FROM `{DATASET}.v_carga_metodologia_oficial` c
+        WHERE c.ano = 2024 AND LOWER(c.porto_atracacao) LIKE '%paranaguá%'
+    """)
+    assert "NORMALIZE" in validated["sanitized_query"]
+    assert "STRIP_ACCENTS" in backend.translate(validated["sanitized_query"])
+    assert backend.query(validated["sanitized_query"]) == [{"total": 4.0}]
+
+
+def test_arrow_results_and_query_parameters(backend):
+    """Test that arrow results work and BigQuery @parameters are bound."""
+    job_config = {"query_parameters": [{"name": "cd", "parameter_value": "2601"}]}
+    rows = backend.query(
+        f"SELECT nomemercadoria FROM `{DATASET}.mercadoria_carga` WHERE cd_mercadoria = @cd",
+        job_config=job_config
+    )
+    assert rows == [{"nomemercadoria": "Minério de ferro"}]
+
+    table = asyncio.run(backend.aquery_arrow(
+        f"SELECT ano, mes FROM `{DATASET}.v_carga_metodologia_oficial` GROUP BY ano, mes ORDER BY ano, mes"
+    ))
+    assert table.num_rows == 3
+
+
+def test_dry_run_and_schema(backend):
+    """Test that dry runs report referenced tables and invalid SQL fails."""
+    estimate = backend.dry_run(f"""
+        WITH t AS (SELECT * FROM `{DATASET}.v_carga_metodologia_oficial`)
+        SELECT COUNT(*) FROM t
+    """)
+    assert estimate["total_bytes_processed"] == 0
+    assert estimate["referenced_tables"] == [f"{DATASET}.v_carga_metodologia_oficial"]
+
+    with pytest.raises(Exception):
+        backend.dry_run(f"SELECT coluna_inexistente FROM `{DATASET}.mercadoria_carga`")
+
+    columns = {c["name"] for c in backend.get_schema("v_carga_metodologia_oficial")["columns"]}
+    assert {"ano", "mes", "vlpesocargabruta_oficial"} <= columns
@@ -0,0 +1,103 @@
+"""
+Tests for the data freshness service.
+"""
+import json
+from datetime import datetime, timezone
+
+from src.bigquery.freshness import DataVersionTracker, FreshnessService
+
+
+class FakeBackend:
+    """Backend that records the queries it runs."""
+
+    def __init__(self, data_dir=None, periodo=202508):
+        self.data_dir = data_dir
+        self.periodo = periodo
+        self.queries = []
+
+    def query(self, sql, job_config=None, use_cache=True, result_format="rows"):
+        self.queries.append(sql)
+        return [{"periodo": self.periodo}]
+
+
+def test_latest_period_from_version_query_is_cached():
+    """Test that the latest period comes from one MAX query, reused by later calls."""
+    backend = FakeBackend()
+    service = FreshnessService(backend, check_interval_seconds=3600)
+    assert service.latest_period() == {"ano": 2025, "mes": 8, "mes_nome": "Agosto", "versao": "2025-08"}
+    assert service.data_version() == "2025-08"
+    assert len(backend.queries) == 1
+    assert "GROUP BY" not in backend.queries[0]
+
+
+def test_replica_version_from_manifest(tmp_path):
+    """Test that the local replica version is read from the manifest without queries."""
+    manifest = {"tables": {"v_carga_metodologia_oficial": {
+        "partitions": {"2025-07": {}, "2025-09": {}}, "synced_at": 1700000000.5,
+    }}}
+    (tmp_path / "_manifest.json").write_text(json.dumps(manifest))
+    backend = FakeBackend(str(tmp_path))
+    service = FreshnessService(backend)
+    assert service.data_version() == "2025-09+1700000000"
+    assert service.latest_period()["mes_nome"] == "Setembro"
+    assert backend.queries == []
+
+
+class FakeTable:
+    def __init__(self, table_type="TABLE", view_query=None, modified=None):
+        self.table_type = table_type
+        self.view_query = view_query
+        self.modified = modified
+
+
+class FakeBigQueryClient:
+    """google.cloud.bigquery.Client with table metadata and the version query."""
+
+    def __init__(self, modified=1700000000, metadata=True):
+        self.modified = modified
+        self.metadata = metadata
+        self.queries = []
+
+    def get_table(self, table):
+        if not self.metadata:
+            raise RuntimeError("403 bigquery.tables.get denied")
+        if table.endswith("v_carga_metodologia_oficial"):
+            return FakeTable("VIEW", "SELECT * FROM carga c JOIN `p.d.atracacao` a USING (id)")
+        return FakeTable(modified=datetime.fromtimestamp(self.modified, timezone.utc))
+
+    def query(self, sql):
+        self.queries.append(sql)
+        return self
+
+    def result(self):
+        return [{"periodo": 202508}]
+
+
+def test_version_query_only_runs_when_base_tables_change(monkeypatch):
+    """Test that checks read base table metadata and query the view only after a modification."""
+    monkeypatch.delenv("DATA_WATERMARK_TABLE", raising=False)
+    monkeypatch.delenv("DATA_SOURCE_TABLES", raising=False)
+    client = FakeBigQueryClient()
+    tracker = DataVersionTracker(client)
+
+    assert tracker.refresh() == "2025-08+1700000000"
+    assert tracker._source_tables == [
+        "antaqdados.br_antaq_estatistico_aquaviario.carga", "p.d.atracacao"
+    ]
+    assert tracker.refresh() == "2025-08+1700000000"
+    assert len(client.queries) == 1
+
+    client.modified = 1700000600
+    assert tracker.refresh() == "2025-08+1700000600"
+    assert len(client.queries) == 2
+
+
+def test_version_query_without_table_metadata(monkeypatch):
+    """Test that the MAX query is the fallback when table metadata cannot be read."""
+    monkeypatch.delenv("DATA_WATERMARK_TABLE", raising=False)
+    client = FakeBigQueryClient(metadata=False)
+    tracker = DataVersionTracker(client)
+
+    assert tracker.refresh() == "2025-08"
+    assert tracker.refresh() == "2025-08"
+    assert len(client.queries) == 2
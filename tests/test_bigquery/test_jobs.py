@@ -0,0 +1,133 @@
+"""
+Tests for the async BigQuery job engine (deadlines and cancellation).
+"""
+import asyncio
+import itertools
+
+import pytest
+
+from src.bigquery.jobs import BigQueryJobEngine, QueryCancelledError, QueryTimeoutError
+
+
+class FakeJob:
+    _ids = itertools.count(1)
+
+    def __init__(self, polls_until_done, rows):
+        self.job_id = f"job_{next(self._ids)}"
+        self.polls_until_done = polls_until_done
+        self.rows = rows
+        self.state = "RUNNING"
+        self.error_result = None
+        self.cancelled = False
+
+    def reload(self):
+        if self.cancelled:
+            self.state = "DONE"
+            self.error_result = {"reason": "stopped", "message": "Job execution was cancelled"}
+            return
+        self.polls_until_done -= 1
+        if self.polls_until_done <= 0:
+            self.state = "DONE"
+
+    def result(self, timeout=None):
+        return self.rows
+
+    def cancel(self):
+        self.cancelled = True
+        return True
+
+
+class FakeClient:
+    def __init__(self, polls_until_done=2, rows=None):
+        self.polls_until_done = polls_until_done
+        self.rows = rows if rows is not None else [{"ano": 2024, "total": 1.0}]
+        self.jobs = []
+
+    def query(self, sql, job_config=None):
+        job = FakeJob(self.polls_until_done, self.rows)
+        self.jobs.append(job)
+        return job
+
+
+def _engine(client, **kwargs):
+    return BigQueryJobEngine(client, max_workers=2, poll_interval=0.001, max_poll_interval=0.005, **kwargs)
+
+
+def test_run_polls_until_done_and_returns_rows():
+    """Test that a finished job returns its rows as dictionaries."""
+    client = FakeClient(polls_until_done=3)
+    rows = asyncio.run(_engine(client).run("SELECT 1"))
+    assert rows == [{"ano": 2024, "total": 1.0}]
+    assert not client.jobs[0].cancelled
+
+
+def test_deadline_cancels_job():
+    """Test that a job past its deadline is cancelled on BigQuery."""
+    client = FakeClient(polls_until_done=10 ** 6)
+    with pytest.raises(QueryTimeoutError):
+        asyncio.run(_engine(client).run("SELECT 1", timeout=0.02))
+    assert client.jobs[0].cancelled
+
+
+def test_newer_query_with_same_key_supersedes():
+    """Test that a newer query on the same thread cancels the previous job."""
+    client = FakeClient(polls_until_done=10 ** 6)
+    engine = _engine(client)
+
+    async def scenario():
+        first = asyncio.create_task(engine.run("SELECT 1", key="thread-1"))
+        await asyncio.sleep(0.01)
+        client.polls_until_done = 1
+        second = await engine.run("SELECT 2", key="thread-1")
+        with pytest.raises(QueryCancelledError):
+            await first
+        return second
+
+    assert asyncio.run(scenario()) == client.rows
+    assert client.jobs[0].cancelled and not client.jobs[1].cancelled
+
+
+def test_cancelled_caller_cancels_job():
+    """Test that cancelling the awaiting task cancels the BigQuery job."""
+    client = FakeClient(polls_until_done=10 ** 6)
+    engine = _engine(client)
+
+    async def scenario():
+        task = asyncio.create_task(engine.run("SELECT 1"))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+    engine.shutdown(wait=True)
+    assert client.jobs[0].cancelled
+
+
+class FakeRowIterator:
+    def __init__(self, total_rows):
+        self.total_rows = total_rows
+        self.storage_api = None
+
+    def to_arrow(self, create_bqstorage_client=True, bqstorage_client=None):
+        self.storage_api = bqstorage_client
+        return "arrow-table"
+
+
+class FakeRegistry:
+    def get_storage_client(self, client):
+        return "read-client"
+
+
+def test_arrow_uses_storage_api_only_for_large_results(monkeypatch):
+    """Test that the shared Storage Read client is used only above the row threshold."""
+    import src.bigquery.client_registry as client_registry
+    monkeypatch.setattr(client_registry, "get_client_registry", lambda: FakeRegistry())
+
+    engine = _engine(FakeClient(), storage_api_min_rows=1000)
+    for total_rows, expected in ((999, None), (1000, "read-client")):
+        job = FakeJob(1, None)
+        iterator = FakeRowIterator(total_rows)
+        job.result = lambda timeout=None, it=iterator: it
+        assert engine.to_arrow(job) == "arrow-table"
+        assert iterator.storage_api == expected
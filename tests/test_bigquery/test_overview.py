@@ -0,0 +1,60 @@
+"""
+Tests for the single-scan overview query.
+"""
+import pytest
+
+pytest.importorskip("duckdb")
+pytest.importorskip("sqlglot")
+pytest.importorskip("pyarrow")
+
+from src.bigquery.cube import build_cube_from_replica, CargoCube
+from src.bigquery.duckdb_backend import DuckDBBackend
+from src.bigquery.overview import query_overview_sections
+from tests.test_bigquery.test_cube import ROWS, _write_month
+
+
+@pytest.fixture
+def replica(tmp_path):
+    _write_month(str(tmp_path), 2024, 3, ROWS)
+    _write_month(str(tmp_path), 2023, 3, ROWS[:1])
+    backend = DuckDBBackend(str(tmp_path))
+    yield str(tmp_path), backend
+    backend.close()
+
+
+@pytest.mark.parametrize("porto", ["Santos", "Brasil"])
+def test_single_scan_matches_cube(replica, porto):
+    """Test that the combined query returns the same sections as the cube."""
+    data_dir, backend = replica
+    live = query_overview_sections(backend, porto, 2024, 3)
+    build_cube_from_replica(data_dir)
+    cube = CargoCube(data_dir).overview(porto, 2024, 3)
+
+    assert live["uf"] == cube["uf"]
+    for name in ("resultado_atual", "resultado_anterior"):
+        assert dict(zip(live[name]["sentido"], live[name]["carga_total"])) == \
+            dict(zip(cube[name]["sentido"], cube[name]["carga_total"]))
+    for name, column in (("mercadorias_exp", "cdmercadoria"), ("mercadorias_imp", "cdmercadoria"), ("destinos", "destino")):
+        assert live[name][column].tolist() == cube[name][column].tolist()
+        assert live[name]["carga_total"].tolist() == cube[name]["carga_total"].tolist()
+
+
+def test_overview_cache_shares_fetch_and_invalidates_on_new_version(tmp_path):
+    """Test that one fetch serves every session until the data version changes."""
+    from src.bigquery.overview import OverviewCache
+
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return {"total_atual": len(calls)}
+
+    cache = OverviewCache(max_size=4, disk_dir=str(tmp_path))
+    assert cache.get_or_fetch("Santos", 2025, 8, "2025-08", fetch) == {"total_atual": 1}
+    assert cache.get_or_fetch("Santos", 2025, 8, "2025-08", fetch) == {"total_atual": 1}
+    # A fresh process reads the disk tier
+    assert OverviewCache(disk_dir=str(tmp_path)).get("Santos", 2025, 8, "2025-08") == {"total_atual": 1}
+
+    assert cache.get_or_fetch("Santos", 2025, 8, "2025-09", fetch) == {"total_atual": 2}
+    assert cache.get_or_fetch("Santos", 2025, 8, "2025-09", lambda: None) == {"total_atual": 2}
+    assert len(calls) == 2
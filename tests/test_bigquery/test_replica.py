@@ -0,0 +1,109 @@
+"""
+Tests for the incremental Parquet replica sync.
+"""
+import re
+from datetime import date
+
+import pytest
+
+pa = pytest.importorskip("pyarrow")
+pq = pytest.importorskip("pyarrow.parquet")
+
+from src.bigquery.replica import ReplicaSync, is_final_month
+
+
+class FakeSource:
+    """Answers the replica SQL from in-memory rows."""
+
+    def __init__(self, carga, mercadorias):
+        self.carga = carga
+        self.mercadorias = mercadorias
+        self.exports = []
+
+    def query_arrow(self, sql, use_cache=True):
+        if "v_carga_metodologia_oficial" in sql:
+            if "GROUP BY" in sql:
+                after = int(re.search(r"> (\d+)", sql).group(1))
+                months = sorted({(r["ano"], r["mes"]) for r in self.carga if r["ano"] * 100 + r["mes"] > after})
+                return pa.Table.from_pylist([
+                    {
+                        "ano": ano, "mes": mes,
+                        "row_count": len(rows),
+                        "checksum": hash(tuple(sorted(r["peso"] for r in rows))),
+                    }
+                    for ano, mes in months
+                    for rows in [[r for r in self.carga if (r["ano"], r["mes"]) == (ano, mes)]]
+                ])
+            ano, mes = map(int, re.search(r"ano = (\d+) AND mes = (\d+)", sql).groups())
+            self.exports.append((ano, mes))
+            return pa.Table.from_pylist([r for r in self.carga if (r["ano"], r["mes"]) == (ano, mes)])
+        if "COUNT(*)" in sql:
+            return pa.Table.from_pylist([{"row_count": len(self.mercadorias), "checksum": 1}])
+        self.exports.append("mercadoria_carga")
+        return pa.Table.from_pylist(self.mercadorias)
+
+
+def _sync(source, tmp_path):
+    return ReplicaSync(source, str(tmp_path), reference_tables=["mercadoria_carga"])
+
+
+def test_initial_and_incremental_sync(tmp_path):
+    """Test that later runs only export new or changed months after the watermark."""
+    carga = [
+        {"ano": 2020, "mes": 1, "peso": 10.0},
+        {"ano": 2020, "mes": 2, "peso": 5.0},
+        {"ano": 2020, "mes": 2, "peso": 7.0},
+    ]
+    source = FakeSource(carga, [{"cd_mercadoria": "1201"}])
+
+    summary = _sync(source, tmp_path).run()
+    assert summary["partitions"]["written"] == 2
+    assert summary["reference_tables"] == ["mercadoria_carga"]
+    part = pq.ParquetFile(tmp_path / "v_carga_metodologia_oficial" / "ano=2020" / "mes=2" / "part-0.parquet")
+    assert part.schema_arrow.names == ["peso"]
+    assert part.metadata.num_rows == 2
+
+    # New month plus a (late) revision of an already final month: the watermark
+    # keeps the final month from being re-read unless a full sync is requested
+    source.exports.clear()
+    carga.append({"ano": 2020, "mes": 3, "peso": 1.0})
+    carga[0]["peso"] = 11.0
+    summary = _sync(source, tmp_path).run()
+    assert source.exports == [(2020, 3)]
+    assert summary["partitions"] == {"written": 1, "unchanged": 0, "deleted": 0}
+
+    source.exports.clear()
+    summary = _sync(source, tmp_path).run(full=True)
+    assert source.exports == [(2020, 1)]
+    assert summary["partitions"]["unchanged"] == 2
+
+
+def test_interrupted_sync_resumes(tmp_path):
+    """Test that a failed run keeps finished partitions and does not advance the watermark."""
+    carga = [{"ano": 2020, "mes": m, "peso": float(m)} for m in (1, 2, 3)]
+    source = FakeSource(carga, [])
+    original = source.query_arrow
+
+    def failing(sql, use_cache=True):
+        if "mes = 3" in sql:
+            raise RuntimeError("connection reset")
+        return original(sql, use_cache)
+
+    source.query_arrow = failing
+    summary = _sync(source, tmp_path).run()
+    assert summary["errors"]
+    sync = _sync(source, tmp_path)
+    assert "watermark" not in sync.manifest["tables"]["v_carga_metodologia_oficial"]
+    assert sorted(sync.manifest["tables"]["v_carga_metodologia_oficial"]["partitions"]) == ["2020-01", "2020-02"]
+
+    source.query_arrow = original
+    source.exports.clear()
+    summary = sync.run()
+    assert source.exports == [(2020, 3)]
+    assert not summary["errors"]
+
+
+def test_final_month_uses_publication_lag():
+    """Test that a month is final only after the publication lag."""
+    assert not is_final_month(2024, 12, 45, today=date(2025, 2, 14))
+    assert is_final_month(2024, 12, 45, today=date(2025, 2, 15))
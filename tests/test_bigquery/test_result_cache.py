@@ -0,0 +1,54 @@
+"""
+Tests for the SQL result cache.
+"""
+from src.bigquery.result_cache import ResultCache, canonicalize_sql
+
+
+ROWS = [{"porto_atracacao": "Santos", "carga_total": 1.0}]
+
+
+def test_canonicalize_whitespace_case_and_comments():
+    """Test that formatting differences produce the same canonical SQL."""
+    a = "SELECT  SUM(x) AS t -- total\nFROM `p.d.View` WHERE ano = 2024 ;"
+    b = "select sum(x) as t from `p.d.View` where ano=2024"
+    assert canonicalize_sql(a) == canonicalize_sql(b)
+
+
+def test_canonicalize_preserves_literals_and_identifiers():
+    """Test that string literals and quoted identifiers are untouched."""
+    a = "SELECT * FROM `p.d.View` WHERE porto LIKE '%Santos  SELECT%'"
+    b = "SELECT * FROM `p.d.view` WHERE porto LIKE '%santos select%'"
+    assert "'%Santos  SELECT%'" in canonicalize_sql(a)
+    assert canonicalize_sql(a) != canonicalize_sql(b)
+
+
+def test_fresh_hit_and_version_change():
+    """Test that a new data version marks entries stale."""
+    cache = ResultCache()
+    cache.set("SELECT 1", "2025-07", ROWS)
+    assert cache.get("select 1", "2025-07") == (ROWS, False)
+    assert cache.get("SELECT 1", "2025-08") == (ROWS, True)
+
+
+def test_version_change_without_swr_is_a_miss():
+    """Test that stale entries are dropped when stale-while-revalidate is off."""
+    cache = ResultCache(stale_while_revalidate=False)
+    cache.set("SELECT 1", "2025-07", ROWS)
+    assert cache.get("SELECT 1", "2025-08") is None
+    assert cache.get("SELECT 1", "2025-07") is None
+
+
+def test_disk_tier_survives_new_instance(tmp_path):
+    """Test that the disk tier is shared between cache instances."""
+    ResultCache(disk_dir=str(tmp_path)).set("SELECT 1", "2025-07", ROWS)
+    assert ResultCache(disk_dir=str(tmp_path)).get("SELECT 1", "2025-07") == (ROWS, False)
+
+
+def test_result_formats_are_cached_separately():
+    """Test that Arrow results do not collide with row results of the same SQL."""
+    cache = ResultCache()
+    table = object()
+    cache.set("SELECT 1", "2025-07", ROWS)
+    cache.set("SELECT 1", "2025-07", table, result_format="arrow")
+    assert cache.get("SELECT 1", "2025-07") == (ROWS, False)
+    assert cache.get("SELECT 1", "2025-07", result_format="arrow")[0] is table
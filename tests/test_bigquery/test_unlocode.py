@@ -0,0 +1,44 @@
+"""
+Tests for the offline UN/LOCODE index.
+"""
+from src.bigquery.unlocode import OVERRIDES_PATH, UnlocodeIndex, build_index
+
+
+def test_packaged_index_covers_foreign_ports():
+    """Test that ports without a Portuguese override resolve from the packaged index."""
+    index = UnlocodeIndex()
+    overrides = {code for code, *_ in (line.split("\t") for line in open(OVERRIDES_PATH, encoding="utf-8"))}
+    assert len(index) > 10000
+    for code, location in (
+        ("CNZJG", ("Zhangjiagang", "", "China")),
+        ("INVTZ", ("Visakhapatnam", "", "Índia")),
+    ):
+        assert code not in overrides
+        assert index.get(code) == location
+    assert index["CNSHA"] == ("Xangai", "", "China")
+
+
+def test_unlocode_index_rebuild_from_official_csv(tmp_path):
+    """Test that the index is rebuilt from the UNECE CSV with Portuguese overrides on top."""
+    csv_path = tmp_path / "CodeListPart1.csv"
+    csv_path.write_bytes("\n".join([
+        ',"CL","",".CHILE","","","","","","","",""',
+        ',"CL","SAI","San Antonio","San Antonio","VS","1-------","AI","0601","","3335S 07137W",""',
+        ',"CL","SCL","Santiago","Santiago","RM","--3-----","AI","0601","","",""',
+        ',"BR","SSZ","Santos","Santos","SP","1-------","AI","0601","","",""',
+        ',"CN","SHA","Shanghai","Shanghai","SH","1-------","AI","0601","","",""',
+        ',"DE","BRE","Bremen","Bremen","HB","1-------","AI","0601","","",""',
+        ',"US","HOU","Houston","Houston","TX","1-------","AI","0601","","",""',
+    ]).encode("latin-1"))
+    overrides = tmp_path / "overrides.tsv"
+    overrides.write_text("CNSHA\tXangai\t\t\nXXXZZ\tOutros\t\tDesconhecido\n", encoding="utf-8")
+
+    output = str(tmp_path / "index.tsv.gz")
+    assert build_index([str(csv_path)], output, str(overrides), ports_only=True) == 5
+    index = UnlocodeIndex(output)
+    assert index["clsai"] == ("San Antonio", "", "Chile")
+    assert index["USHOU"] == ("Houston", "TX", "Estados Unidos")
+    assert index["CNSHA"] == ("Xangai", "", "China")
+    assert index.get("XXXZZ") == ("Outros", "", "Desconhecido")
+    assert "CLSCL" not in index and "BRSSZ" not in index
+    assert index.country_name("de") == "Alemanha"
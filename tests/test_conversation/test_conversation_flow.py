@@ -21,6 +21,7 @@ async def test_followup_question():
     print("=" * 60)
 
     from src.agent.graph import query_agente
+    from src.agent.artifacts import resolve_query_results
 
     # Use same thread_id to simulate same conversation
     thread_id = "test_conversation_001"
@@ -36,7 +37,7 @@ async def test_followup_question():
 
     answer1 = result1.get("final_answer", "No answer")
     sql1 = result1.get("validated_sql", "")
-    results1 = result1.get("query_results", [])
+    results1 = resolve_query_results(result1) or []
 
     print(f"✓ Answer 1: {answer1[:200]}...")
     print(f"✓ SQL 1: {sql1[:100]}...")
@@ -57,7 +58,7 @@ async def test_followup_question():
 
     answer2 = result2.get("final_answer", "No answer")
     sql2 = result2.get("validated_sql", "")
-    results2 = result2.get("query_results", [])
+    results2 = resolve_query_results(result2) or []
 
     print(f"✓ Answer 2: {answer2[:200]}...")
     print(f"✓ SQL 2: {sql2[:100]}...")
@@ -123,8 +123,7 @@ def test_results_cache():
 
     # Add some results
     for i in range(15):
-        results = list(range(100))  # Mock 100 rows
-        save_result_to_cache(i, results, f"SELECT * FROM table_{i}")
+        save_result_to_cache(i, f"handle-{i}", 100, f"SELECT * FROM table_{i}")  # Mock 100 rows
 
     cache = get_results_cache()
 
@@ -167,28 +166,26 @@ def test_large_results_handling():
     from collections import defaultdict
     st.session_state = defaultdict(dict)
 
-    # Small result - should be cached
-    small_results = list(range(100))
-    save_result_to_cache(0, small_results, "SELECT * FROM small_table")
+    # Small result - should be displayable
+    save_result_to_cache(0, "small-handle", 100, "SELECT * FROM small_table")
 
-    # Large result - should NOT be fully cached
-    large_results = list(range(2000))
-    save_result_to_cache(1, large_results, "SELECT * FROM large_table")
+    # Large result - should NOT be displayed
+    save_result_to_cache(1, "large-handle", 2000, "SELECT * FROM large_table")
 
     small_cached = get_cached_result(0)
     large_cached = get_cached_result(1)
 
     print(f"Small result (100 rows):")
-    print(f"  - Cached data: {small_cached['results'] is not None}")
+    print(f"  - Handle stored: {small_cached['results_handle'] is not None}")
     print(f"  - Row count: {small_cached['row_count']}")
     print(f"  - Truncated: {small_cached.get('truncated', False)}")
 
     print(f"\nLarge result (2000 rows):")
-    print(f"  - Cached data: {large_cached['results'] is not None}")
+    print(f"  - Handle stored: {large_cached['results_handle'] is not None}")
     print(f"  - Row count: {large_cached['row_count']}")
     print(f"  - Truncated: {large_cached.get('truncated', False)}")
 
-    if small_cached['results'] is not None and large_cached['results'] is None:
+    if not small_cached.get('truncated') and large_cached.get('truncated'):
         print("\n✓ Large results handling working correctly!")
         return True
     else:
@@ -0,0 +1,88 @@
+"""
+Tests for the columnar QueryResult and the formatters that consume it.
+"""
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from src.utils.formatting import (
+    enrich_results_with_location_names, enrich_results_with_mercadoria_names, format_results_for_llm, result_rows
+)
+from src.utils.result import QueryResult
+
+
+ROWS = [
+    {"cdmercadoria": "1201", "total_toneladas": 300.0},
+    {"cdmercadoria": "2601", "total_toneladas": 200.0},
+    {"cdmercadoria": "1201", "total_toneladas": 100.0},
+    {"cdmercadoria": None, "total_toneladas": 50.0},
+]
+
+
+class FakeHelper:
+    def __init__(self):
+        self.calls = []
+
+    def batch_get_mercadoria_nomes(self, codigos):
+        self.calls.append(sorted(codigos))
+        return {"1201": "Soja", "2601": "Minério de ferro"}
+
+    def batch_enrich_destinos(self, destinos):
+        self.calls.append(sorted(destinos))
+        return {"CNSHA": "Xangai - China"}
+
+
+def test_map_column_calls_fn_once_per_distinct_value():
+    """Test that derived columns are computed per distinct value, not per row."""
+    seen = []
+    result = QueryResult.from_rows(ROWS).map_column(
+        "cdmercadoria", lambda code: seen.append(code) or (code or "-").upper(), "label"
+    )
+    assert sorted(seen, key=str) == sorted(["1201", "2601", None], key=str)
+    assert result.column("label") == ["1201", "2601", "1201", "-"]
+    assert result.column_names == ["cdmercadoria", "total_toneladas", "label"]
+
+
+def test_slices_and_labels_share_data():
+    """Test that head and labels do not copy rows and only shown rows are converted."""
+    result = QueryResult.from_rows(ROWS).with_labels({"total_toneladas": "Carga (t)", "missing": "x"})
+    head = result.head(2)
+    assert head.num_rows == 2 and result.num_rows == 4
+    assert head.to_arrow().column(0).chunks[0].buffers()[-1].address == \
+        result.to_arrow().column(0).chunks[0].buffers()[-1].address
+    assert result.to_arrow(use_labels=True).column_names == ["cdmercadoria", "Carga (t)"]
+    assert result_rows(result, limit=1) == ROWS[:1]
+
+
+def test_enrichment_is_columnar(monkeypatch):
+    """Test that mercadoria names are added as a column with one batched lookup."""
+    helper = FakeHelper()
+    monkeypatch.setattr("src.bigquery.referential_helper.get_referential_helper", lambda: helper)
+
+    enriched = enrich_results_with_mercadoria_names(QueryResult.from_rows(ROWS))
+
+    assert isinstance(enriched, QueryResult)
+    assert helper.calls == [["1201", "2601"]]
+    assert enriched.column("mercadoria_nome") == [
+        "Soja (1201)", "Minério de ferro (2601)", "Soja (1201)", None
+    ]
+
+
+def test_location_enrichment_is_batched(monkeypatch):
+    """Test that destino codes get a destino_nome column from one batched lookup."""
+    helper = FakeHelper()
+    monkeypatch.setattr("src.bigquery.referential_helper.get_referential_helper", lambda: helper)
+
+    rows = [{"destino": "CNSHA", "total": 2.0}, {"destino": "NLRTM", "total": 1.0}, {"destino": "CNSHA", "total": 1.0}]
+    enriched = enrich_results_with_location_names(QueryResult.from_rows(rows))
+
+    assert helper.calls == [["CNSHA", "NLRTM"]]
+    assert enriched.column("destino_nome") == ["Xangai - China (CNSHA)", "NLRTM", "Xangai - China (CNSHA)"]
+
+
+def test_format_for_llm_reports_total_rows():
+    """Test that the LLM summary counts all rows while showing only a few."""
+    result = QueryResult.from_rows([{"ano": 2000 + i % 30, "valor": float(i)} for i in range(150)])
+    text = format_results_for_llm(result, enrich=False)
+    assert text.startswith("Primeiros 100 de 150 resultados:")
+    assert text.endswith("... e mais 130 linhas")